@@ -0,0 +1,65 @@
+import asyncio
+import sys
+from typing import Optional
+from sqlalchemy import delete
+from sqlalchemy.future import select
+from app.database import async_session
+from app.models.outbox import PublishOutbox
+from app.models.post import Post
+from app.models.post_stats import PostStatsDaily
+from app.utils.analytics import PostEvent, accumulate, lateness_seconds
+
+BATCH_SIZE = 5000
+
+
+def post_events(row):
+    """
+    Events a post's current row implies, matching the live hooks. Every post
+    that went through the publish pipeline was counted as "queued" when its
+    outbox row was written; failed posts only come from the pipeline, even
+    those it rejected before writing one.
+    """
+    if row.scheduled_time is not None and row.created_at is not None:
+        yield PostEvent(row.user_id, row.account_id, "scheduled", row.created_at)
+    queued_at = row.queued_at or row.created_at
+    if (row.queued_at is not None or row.status in ("queued", "failed")) and queued_at is not None:
+        yield PostEvent(row.user_id, row.account_id, "queued", queued_at)
+    if row.status == "published" and row.published_time is not None:
+        yield PostEvent(row.user_id, row.account_id, "published", row.published_time, lateness_seconds(row.scheduled_time, row.published_time))
+    elif row.status == "failed" and (row.failed_at or row.created_at) is not None:
+        yield PostEvent(row.user_id, row.account_id, "failed", row.failed_at or row.created_at)
+
+
+async def backfill(user_id: Optional[int] = None) -> int:
+    """Rebuild post_stats_daily from posts (all users, or one) in a single transaction."""
+    query = (
+        select(
+            Post.user_id, Post.account_id, Post.status, Post.scheduled_time, Post.published_time, Post.created_at,
+            PublishOutbox.created_at.label("queued_at"), PublishOutbox.updated_at.label("failed_at"),
+        )
+        .outerjoin(PublishOutbox, PublishOutbox.post_id == Post.id)
+        .execution_options(yield_per=BATCH_SIZE)
+    )
+    wipe = delete(PostStatsDaily)
+    if user_id is not None:
+        query = query.filter(Post.user_id == user_id)
+        wipe = wipe.filter(PostStatsDaily.user_id == user_id)
+
+    async with async_session() as db:
+        deltas = {}
+        result = await db.stream(query)
+        async for partition in result.partitions():
+            accumulate(deltas, (event for row in partition for event in post_events(row)))
+        rows = [deltas[key] for key in sorted(deltas)]
+
+        await db.execute(wipe)
+        for start in range(0, len(rows), BATCH_SIZE):
+            await db.execute(PostStatsDaily.__table__.insert(), rows[start:start + BATCH_SIZE])
+        await db.commit()
+    return len(rows)
+
+
+if __name__ == "__main__":
+    target = int(sys.argv[1]) if len(sys.argv) > 1 else None
+    written = asyncio.run(backfill(target))
+    print(f"[INFO] Backfilled {written} post_stats_daily rows")
@@ -0,0 +1,791 @@
+"""
+Offline benchmark for the API (alone and during a login storm), the
+scheduler tick, the publish pipeline and
+WebSocket fan-out, plus micro-benchmarks of the analytics rollup, the auth
+token cache and the metrics middleware.
+
+    DATABASE_URL=sqlite+aiosqlite:///./bench.db SECRET_KEY=bench \\
+        python -m app.commad.benchmark --seed --posts 1000000 --out bench.json
+
+`--seed` drops and recreates every table, then loads synthetic users,
+accounts, posts, stats and follower graphs; later runs reuse that data.
+Requests go through the ASGI app in this process (no network, no server
+start-up), or to a running server with `--base-url`; `--suites` picks what
+runs. Results are written as
+JSON; `--compare old.json` prints the change per measurement and exits 1 if
+anything got slower than `--tolerance`.
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import time
+from datetime import datetime, timedelta, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+# Rate limits would turn a load test into a 429 test; keep the noise out of the timings
+os.environ.setdefault("RATE_LIMIT_ENABLED", "false")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+
+import httpx
+from sqlalchemy import delete, func
+from sqlalchemy.future import select
+from app.config import settings
+from app.database import Base, async_session, engine
+from app.models.account import Account, Platform
+from app.models.post import Post
+from app.models.user import User
+from app.utils.security import create_access_token, hash_password
+
+BENCH_PASSWORD = "bench-password"
+BENCH_DOMAIN = "bench.local"
+DUE_CONTENT = "bench due post"
+INSERT_CHUNK = 10000
+
+
+def percentile(samples: List[float], fraction: float) -> float:
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """Latency samples in seconds as milliseconds."""
+    return {
+        "p50_ms": round(percentile(samples, 0.50) * 1000, 3),
+        "p90_ms": round(percentile(samples, 0.90) * 1000, 3),
+        "p99_ms": round(percentile(samples, 0.99) * 1000, 3),
+        "max_ms": round(max(samples, default=0.0) * 1000, 3),
+    }
+
+
+# -----------------------------
+# Seeding
+# -----------------------------
+async def seed(users: int, posts: int, followers: int, seed_value: int = 1) -> Dict[str, Any]:
+    """Recreate the schema and load synthetic data; returns what was created."""
+    import app.models  # noqa: F401  registers every table
+    from app.commad.backfill_stats import backfill
+    from app.utils.followers import DIRECTIONS, build_follower_source, sync_graph
+
+    rng = random.Random(seed_value)
+    started = time.perf_counter()
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.drop_all)
+        await conn.run_sync(Base.metadata.create_all)
+
+    hashed = hash_password(BENCH_PASSWORD)
+    platforms = [Platform.twitter, Platform.instagram]
+    now = datetime.now(timezone.utc)
+    async with async_session() as db:
+        # Ids come from the database so Postgres sequences stay in step for later inserts
+        await db.execute(User.__table__.insert(), [
+            {"username": f"bench{i}", "email": f"bench{i}@{BENCH_DOMAIN}", "hashed_password": hashed}
+            for i in range(users)
+        ])
+        user_ids = list((await db.execute(select(User.id).order_by(User.id))).scalars().all())
+        await db.execute(Account.__table__.insert(), [
+            {"user_id": user_id, "platform": p, "username": f"bench{user_id}_{p.value}"}
+            for user_id in user_ids
+            for p in platforms
+        ])
+        account_ids: Dict[int, List[int]] = {}
+        for user_id, account_id in (await db.execute(select(Account.user_id, Account.id).order_by(Account.id))).all():
+            account_ids.setdefault(user_id, []).append(account_id)
+        await db.commit()
+
+        for start in range(0, posts, INSERT_CHUNK):
+            rows = []
+            for n in range(start, min(posts, start + INSERT_CHUNK)):
+                user_id = user_ids[n % users]
+                created = now - timedelta(seconds=rng.randint(60, 180 * 86400))
+                roll = rng.random()
+                row = {
+                    "content": f"bench post {n}",
+                    "user_id": user_id,
+                    "account_id": account_ids[user_id][n % len(platforms)],
+                    "created_at": created,
+                    "scheduled_time": None,
+                    "published_time": None,
+                }
+                if roll < 0.70:
+                    row.update(status="published", published_time=created)
+                elif roll < 0.95:
+                    row.update(status="scheduled", scheduled_time=now + timedelta(seconds=rng.randint(3600, 30 * 86400)))
+                else:
+                    row.update(status="failed")
+                rows.append(row)
+            await db.execute(Post.__table__.insert(), rows)
+            await db.commit()
+
+    stats_rows = await backfill()
+    source = build_follower_source("fake", fake_followers=followers, fake_following=max(1, followers // 10))
+    for account_id in (a for ids in account_ids.values() for a in ids):
+        for direction in DIRECTIONS:
+            await sync_graph(async_session, source, account_id, direction)
+    return {
+        "users": users,
+        "accounts": users * len(platforms),
+        "posts": posts,
+        "post_stats_rows": stats_rows,
+        "followers_per_account": followers,
+        "seconds": round(time.perf_counter() - started, 2),
+    }
+
+
+async def bench_users() -> List[int]:
+    """Seeded users only; users the register scenario left behind have no accounts or posts."""
+    async with async_session() as db:
+        result = await db.execute(select(User.id).filter(User.email.like(f"bench%@{BENCH_DOMAIN}")).order_by(User.id))
+        return list(result.scalars().all())
+
+
+async def delete_registered_users() -> int:
+    """Users the register scenario created; they share BENCH_DOMAIN so --seed never sees them as foreign."""
+    async with async_session() as db:
+        deleted = (await db.execute(delete(User).filter(User.email.like(f"reg%@{BENCH_DOMAIN}")))).rowcount
+        await db.commit()
+        return deleted
+
+
+async def foreign_users() -> int:
+    async with async_session() as db:
+        try:
+            return (await db.execute(select(func.count(User.id)).filter(User.email.not_like(f"%@{BENCH_DOMAIN}")))).scalar()
+        except Exception:
+            # No schema yet
+            return 0
+
+
+# -----------------------------
+# API routes
+# -----------------------------
+class Scenario:
+    """
+    One route under load: `build(n, user_id)` returns (method, url, request kwargs).
+    With `revalidate`, each user sends back the last ETag it got for the URL,
+    like a polling client with a browser cache.
+    """
+
+    def __init__(self, name: str, build: Callable[[int, int], tuple], auth: bool = True, stream: bool = False, revalidate: bool = False):
+        self.name = name
+        self.build = build
+        self.auth = auth
+        self.stream = stream
+        self.revalidate = revalidate
+
+
+def scenarios(run_id: str, emails: Dict[int, str]) -> List[Scenario]:
+    future = lambda: (datetime.now(timezone.utc) + timedelta(days=7)).isoformat()
+    return [
+        Scenario("GET /accounts/me", lambda n, u: ("GET", "/accounts/me", {})),
+        Scenario("GET /accounts/bootstrap", lambda n, u: ("GET", "/accounts/bootstrap", {})),
+        Scenario("GET /accounts/bootstrap (revalidate)", lambda n, u: ("GET", "/accounts/bootstrap", {}), revalidate=True),
+        Scenario("GET /accounts/tweets", lambda n, u: ("GET", "/accounts/tweets?count=20", {})),
+        Scenario("GET /accounts/tweets (revalidate)", lambda n, u: ("GET", "/accounts/tweets?count=20", {}), revalidate=True),
+        Scenario("GET /accounts/tweets?status=scheduled", lambda n, u: ("GET", "/accounts/tweets?count=20&status=scheduled", {})),
+        Scenario("GET /accounts/followers", lambda n, u: ("GET", "/accounts/followers?count=100", {})),
+        Scenario("GET /accounts/posts/export", lambda n, u: ("GET", "/accounts/posts/export?format=ndjson", {}), stream=True),
+        Scenario("GET /analytics/summary", lambda n, u: ("GET", "/analytics/summary", {})),
+        Scenario("GET /calendar/posts", lambda n, u: ("GET", "/calendar/posts?count=100", {})),
+        Scenario("GET /calendar/slots?bucket=hour", lambda n, u: ("GET", "/calendar/slots?bucket=hour", {})),
+        Scenario("GET /calendar/conflicts", lambda n, u: ("GET", "/calendar/conflicts", {})),
+        Scenario("POST /accounts/tweets", lambda n, u: ("POST", "/accounts/tweets", {"json": {"content": f"bench {run_id} {n}"}})),
+        Scenario("POST /accounts/schedule", lambda n, u: ("POST", "/accounts/schedule", {"json": {"content": f"bench {run_id} {n}", "scheduled_time": future()}})),
+        Scenario("POST /accounts/schedule/bulk", lambda n, u: ("POST", "/accounts/schedule/bulk", {"json": [
+            {"content": f"bench {run_id} {n}.{i}", "scheduled_time": future()} for i in range(100)
+        ]})),
+        Scenario("POST /auth/api/login", lambda n, u: ("POST", "/auth/api/login", {"json": {"email": emails[u], "password": BENCH_PASSWORD}}), auth=False),
+        # Registered users are deleted after the run (see delete_registered_users)
+        Scenario("POST /auth/api/register", lambda n, u: ("POST", "/auth/api/register", {"json": {
+            "username": f"reg{run_id}x{n}", "email": f"reg{run_id}x{n}@{BENCH_DOMAIN}", "password": BENCH_PASSWORD,
+        }}), auth=False),
+    ]
+
+
+async def run_scenario(client: httpx.AsyncClient, scenario: Scenario, tokens: Dict[int, str], concurrency: int, duration: float, warmup: float) -> Dict[str, Any]:
+    user_ids = list(tokens)
+    counter = iter(range(10**9))
+    latencies: List[float] = []
+    statuses: Dict[int, int] = {}
+    etags: Dict[tuple, str] = {}
+    received = [0]
+
+    async def one(record: bool):
+        n = next(counter)
+        user_id = user_ids[n % len(user_ids)]
+        method, url, kwargs = scenario.build(n, user_id)
+        headers = {"Authorization": f"Bearer {tokens[user_id]}"} if scenario.auth else {}
+        if (user_id, url) in etags:
+            headers["If-None-Match"] = etags[user_id, url]
+        started = time.perf_counter()
+        if scenario.stream:
+            async with client.stream(method, url, headers=headers, **kwargs) as response:
+                async for _ in response.aiter_raw():
+                    pass
+        else:
+            response = await client.request(method, url, headers=headers, **kwargs)
+        if scenario.revalidate and "etag" in response.headers:
+            etags[user_id, url] = response.headers["etag"]
+        if record:
+            latencies.append(time.perf_counter() - started)
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+            # Body bytes as sent, before httpx undoes any gzip
+            received[0] += response.num_bytes_downloaded
+
+    async def worker(until: float, record: bool):
+        while time.perf_counter() < until:
+            await one(record)
+
+    await asyncio.gather(*[worker(time.perf_counter() + warmup, False) for _ in range(concurrency)])
+    started = time.perf_counter()
+    await asyncio.gather(*[worker(started + duration, True) for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    errors = sum(count for status, count in statuses.items() if status >= 400)
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(k): v for k, v in sorted(statuses.items())},
+        "rps": round(len(latencies) / elapsed, 1),
+        "bytes_per_request": round(received[0] / len(latencies)) if latencies else 0,
+        **summarize(latencies),
+    }
+
+
+async def api_target(args, user_ids: List[int]):
+    """(transport, base_url, tokens, emails) for requests as the benchmark users."""
+    tokens = {u: create_access_token({"sub": str(u)}) for u in user_ids}
+    async with async_session() as db:
+        emails = dict((await db.execute(select(User.id, User.email).filter(User.id.in_(user_ids)))).all())
+    if args.base_url:
+        return None, args.base_url, tokens, emails
+    from app.main import app
+
+    return httpx.ASGITransport(app=app), "http://bench", tokens, emails
+
+
+async def bench_api(args, user_ids: List[int]) -> Dict[str, Any]:
+    transport, base_url, tokens, emails = await api_target(args, user_ids)
+    run_id = f"{int(time.time())}"
+    wanted = set(args.routes.split(",")) if args.routes else None
+    results = {}
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+            for scenario in scenarios(run_id, emails):
+                if wanted and not any(w in scenario.name for w in wanted):
+                    continue
+                results[scenario.name] = await run_scenario(client, scenario, tokens, args.concurrency, args.duration, args.warmup)
+                r = results[scenario.name]
+                print(f"  {scenario.name:<40} {r['rps']:>9.1f} req/s  p50 {r['p50_ms']:>8.2f} ms  p99 {r['p99_ms']:>8.2f} ms  {r['bytes_per_request']:>7} B  errors {r['errors']}", file=sys.stderr)
+    finally:
+        await delete_registered_users()
+    return results
+
+
+async def bench_login_storm(args, user_ids: List[int]) -> Dict[str, Any]:
+    """
+    `args.logins` clients logging in back to back while `args.concurrency`
+    others poll GET /accounts/me: p99 of both, with bcrypt on its worker pool
+    and, in-process only, inline on the event loop as before that pool.
+    """
+    from app.utils.security import password_pool
+
+    transport, base_url, tokens, emails = await api_target(args, user_ids)
+    by_name = {scenario.name: scenario for scenario in scenarios("storm", emails)}
+    login, reader = by_name["POST /auth/api/login"], by_name["GET /accounts/me"]
+
+    async def inline(fn, *fn_args):
+        return fn(*fn_args)
+
+    modes = ["pool"] if args.base_url else ["pool", "inline"]
+    results = {}
+    async with httpx.AsyncClient(transport=transport, base_url=base_url, timeout=60) as client:
+        for mode in modes:
+            if mode == "inline":
+                password_pool.run = inline
+            try:
+                logins, reads = await asyncio.gather(
+                    run_scenario(client, login, tokens, args.logins, args.duration, args.warmup),
+                    run_scenario(client, reader, tokens, args.concurrency, args.duration, args.warmup),
+                )
+            finally:
+                # Drops the instance attribute, back to PasswordHasherPool.run
+                vars(password_pool).pop("run", None)
+            results[mode] = {"login": logins, "accounts_me": reads}
+            print(
+                f"  bcrypt {mode:<6} {args.logins} logins: p99 {logins['p99_ms']:>8.2f} ms ({logins['rps']:.1f}/s, errors {logins['errors']})"
+                f"  GET /accounts/me alongside: p99 {reads['p99_ms']:>8.2f} ms ({reads['rps']:.1f}/s)",
+                file=sys.stderr,
+            )
+    return results
+
+
+# -----------------------------
+# Scheduler
+# -----------------------------
+async def insert_due(depth: int, user_ids: List[int]) -> None:
+    """Add `depth` posts that are already due, spread over the benchmark users."""
+    due = datetime.now(timezone.utc) - timedelta(seconds=30)
+    async with async_session() as db:
+        accounts = dict((await db.execute(select(Account.user_id, func.min(Account.id)).filter(Account.user_id.in_(user_ids)).group_by(Account.user_id))).all())
+        for start in range(0, depth, INSERT_CHUNK):
+            await db.execute(Post.__table__.insert(), [
+                {"content": DUE_CONTENT, "status": "scheduled", "scheduled_time": due,
+                 "user_id": user_ids[n % len(user_ids)], "account_id": accounts[user_ids[n % len(user_ids)]]}
+                for n in range(start, min(depth, start + INSERT_CHUNK))
+            ])
+        await db.commit()
+
+
+async def count_due(*statuses: str) -> int:
+    async with async_session() as db:
+        return (await db.execute(
+            select(func.count(Post.id)).filter(Post.content == DUE_CONTENT, Post.status.in_(statuses))
+        )).scalar()
+
+
+async def clear_due() -> None:
+    from app.models.outbox import PublishOutbox
+
+    async with async_session() as db:
+        due_posts = select(Post.id).filter(Post.content == DUE_CONTENT)
+        # SQLite does not enforce the cascade unless foreign keys are switched on
+        await db.execute(delete(PublishOutbox).filter(PublishOutbox.post_id.in_(due_posts)))
+        await db.execute(delete(Post).filter(Post.content == DUE_CONTENT))
+        await db.commit()
+
+
+async def bench_scheduler(depths: List[int], user_ids: List[int]) -> List[Dict[str, Any]]:
+    """Time one publish_scheduled_posts run with `depth` posts due."""
+    from app.routers.schedule import publish_scheduled_posts
+
+    results = []
+    for depth in depths:
+        await insert_due(depth, user_ids)
+
+        started = time.perf_counter()
+        await publish_scheduled_posts()
+        elapsed = time.perf_counter() - started
+
+        published = await count_due("published", "queued", "failed")
+        await clear_due()
+        results.append({
+            "due": depth,
+            "claimed": published,
+            "seconds": round(elapsed, 4),
+            "posts_per_second": round(published / elapsed, 1) if elapsed else None,
+        })
+        print(f"  tick with {depth:>7} due: {elapsed * 1000:>9.1f} ms, {published} claimed", file=sys.stderr)
+    return results
+
+
+# -----------------------------
+# Publish pipeline
+# -----------------------------
+async def bench_pipeline(depths: List[int], user_ids: List[int], latency: float, timeout: float = 600) -> List[Dict[str, Any]]:
+    """
+    Time from a dispatcher tick with `depth` posts due until the publish
+    pipeline has written every outcome, with fake platform clients taking
+    `latency` seconds per call. Workers, queues and leases come from the
+    settings; the rate limits are lifted so the result is the pipeline's own
+    throughput rather than the configured budget.
+    """
+    from app.routers import schedule
+    from app.utils.publisher import PublishPipeline, build_platform_clients
+
+    unlimited = 10**9
+    pipeline = PublishPipeline(
+        async_session,
+        build_platform_clients("fake", latency=latency),
+        workers_per_platform=settings.PUBLISH_WORKERS_PER_PLATFORM,
+        queue_size=settings.PUBLISH_QUEUE_SIZE,
+        account_rate_per_minute=unlimited,
+        platform_rate_per_minute=unlimited,
+        lease_seconds=settings.PUBLISH_LEASE_SECONDS,
+        call_timeout=settings.PUBLISH_CALL_TIMEOUT_SECONDS,
+        poll_interval=0.05,
+        on_published=schedule._on_pipeline_published,
+        on_failed=schedule._on_pipeline_failed,
+    )
+    enabled = settings.PUBLISH_PIPELINE_ENABLED
+    settings.PUBLISH_PIPELINE_ENABLED = True
+    pipeline.start()
+    results = []
+    try:
+        for depth in depths:
+            await insert_due(depth, user_ids)
+            started = time.perf_counter()
+            done = 0
+            while done < depth and time.perf_counter() - started < timeout:
+                # A tick claims at most PUBLISH_MAX_BATCHES_PER_TICK batches
+                if await count_due("scheduled"):
+                    await schedule.publish_scheduled_posts()
+                pipeline.wake()
+                await asyncio.sleep(0.02)
+                done = await count_due("published", "failed")
+            elapsed = time.perf_counter() - started
+            failed = await count_due("failed")
+            await clear_due()
+            results.append({
+                "due": depth,
+                "published": done - failed,
+                "failed": failed,
+                "latency_ms": latency * 1000,
+                "workers_per_platform": settings.PUBLISH_WORKERS_PER_PLATFORM,
+                "seconds": round(elapsed, 4),
+                "posts_per_second": round(done / elapsed, 1) if elapsed else None,
+            })
+            print(f"  pipeline with {depth:>7} due: {elapsed:>8.2f} s, {results[-1]['posts_per_second']} posts/s, {failed} failed", file=sys.stderr)
+    finally:
+        await pipeline.stop()
+        settings.PUBLISH_PIPELINE_ENABLED = enabled
+    return results
+
+
+# -----------------------------
+# WebSocket fan-out
+# -----------------------------
+class _BenchSocket:
+    """Stands in for a Starlette WebSocket: records when the awaited message arrives."""
+
+    class _State:
+        pass
+
+    def __init__(self, waiter: Dict[str, Any]):
+        self.state = self._State()
+        self.waiter = waiter
+
+    async def accept(self):
+        pass
+
+    async def close(self, code: int = 1000, reason: Optional[str] = None):
+        pass
+
+    async def send_text(self, message: str):
+        waiter = self.waiter
+        if waiter["marker"] in message:
+            waiter["remaining"] -= 1
+            if waiter["remaining"] == 0:
+                waiter["done"].set()
+
+
+async def bench_websocket(client_counts: List[int], rounds: int) -> List[Dict[str, Any]]:
+    """
+    Time from ConnectionManager.broadcast until all N sockets got the message,
+    through the real queues and sender tasks (in-memory backplane, no network).
+    """
+    from app.routers.schedule import manager
+
+    await manager.start()
+    results = []
+    for count in client_counts:
+        waiter = {"marker": "", "remaining": 0, "done": asyncio.Event()}
+        sockets = []
+        for n in range(count):
+            socket = _BenchSocket(waiter)
+            # Spread sockets over users the way real sessions are (a few tabs each)
+            await manager.connect(socket, create_access_token({"sub": str(10**6 + n // 3)}))
+            sockets.append(socket)
+
+        samples = []
+        for r in range(rounds):
+            waiter.update(marker=f"bench-fanout-{count}-{r}", remaining=count, done=asyncio.Event())
+            started = time.perf_counter()
+            await manager.broadcast(json.dumps({"type": "bench", "marker": waiter["marker"]}))
+            await asyncio.wait_for(waiter["done"].wait(), 60)
+            samples.append(time.perf_counter() - started)
+            # Let the senders go idle so rounds do not overlap
+            await asyncio.sleep(0)
+
+        for socket in sockets:
+            manager.disconnect(socket)
+        results.append({"clients": count, "rounds": rounds, **summarize(samples)})
+        print(f"  fan-out to {count:>6} sockets: p50 {results[-1]['p50_ms']:.2f} ms  p99 {results[-1]['p99_ms']:.2f} ms", file=sys.stderr)
+    return results
+
+
+# -----------------------------
+# Micro-benchmarks
+# -----------------------------
+def bench_tokens(count: int, rounds: int) -> Dict[str, Any]:
+    """Per-call cost of checking a bearer token: jwt.decode every time vs a TokenCache hit."""
+    from app.utils.security import decode_access_token
+    from app.utils.token_cache import TokenCache
+
+    tokens = [create_access_token({"sub": str(n)}) for n in range(count)]
+    cache = TokenCache(maxsize=count, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+    for token in tokens:
+        cache.verify(token, decode_access_token)
+
+    def per_call(check: Callable[[str], Any]) -> float:
+        started = time.perf_counter()
+        for _ in range(rounds):
+            for token in tokens:
+                check(token)
+        return (time.perf_counter() - started) / (rounds * count)
+
+    decode = per_call(decode_access_token)
+    cached = per_call(lambda token: cache.verify(token, decode_access_token))
+    result = {
+        "tokens": count,
+        "calls": rounds * count,
+        "decode_us": round(decode * 1e6, 2),
+        "cache_hit_us": round(cached * 1e6, 2),
+        "speedup": round(decode / cached, 1) if cached else None,
+    }
+    print(f"  token check: decode {result['decode_us']:.2f} us, cache hit {result['cache_hit_us']:.2f} us", file=sys.stderr)
+    return result
+
+
+async def bench_rollup(user_ids: List[int], days: int, rounds: int) -> Dict[str, Any]:
+    """
+    One user's published posts per day over `days` days, read from
+    post_stats_daily (as /analytics/daily does) vs a live GROUP BY on posts.
+    """
+    from app.utils.analytics import daily_series
+
+    until = datetime.now(timezone.utc).date()
+    since = until - timedelta(days=days - 1)
+    window_start = datetime.combine(since, datetime.min.time(), tzinfo=timezone.utc)
+    window_end = datetime.combine(until + timedelta(days=1), datetime.min.time(), tzinfo=timezone.utc)
+    day = func.date(Post.published_time).label("day")
+    samples: Dict[str, List[float]] = {"rollup": [], "live": []}
+    async with async_session() as db:
+        for r in range(rounds):
+            user_id = user_ids[r % len(user_ids)]
+            started = time.perf_counter()
+            await daily_series(db, user_id, since, until, status="published")
+            samples["rollup"].append(time.perf_counter() - started)
+
+            started = time.perf_counter()
+            (await db.execute(
+                select(day, func.count(Post.id))
+                .filter(Post.user_id == user_id, Post.status == "published")
+                .filter(Post.published_time >= window_start, Post.published_time < window_end)
+                .group_by(day)
+                .order_by(day)
+            )).all()
+            samples["live"].append(time.perf_counter() - started)
+    result = {"days": days, "rounds": rounds, **{source: summarize(times) for source, times in samples.items()}}
+    print(f"  {days}-day series: rollup p50 {result['rollup']['p50_ms']:.2f} ms, live GROUP BY p50 {result['live']['p50_ms']:.2f} ms", file=sys.stderr)
+    return result
+
+
+async def bench_middleware(requests: int, repeats: int = 3) -> Dict[str, Any]:
+    """
+    Cost MetricsMiddleware adds per request: a one-route FastAPI app called
+    directly as ASGI (no client, no network), with and without it. The best of
+    `repeats` runs is kept for each.
+    """
+    from fastapi import FastAPI
+    from app.utils.metrics import MetricsMiddleware
+
+    def build(metrics: bool) -> FastAPI:
+        app = FastAPI()
+
+        @app.get("/ping")
+        async def ping():
+            return {"ok": True}
+
+        if metrics:
+            app.add_middleware(MetricsMiddleware)
+        return app
+
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET",
+        "scheme": "http", "path": "/ping", "raw_path": b"/ping", "root_path": "", "query_string": b"",
+        "headers": [(b"host", b"bench")], "client": ("127.0.0.1", 1), "server": ("bench", 80),
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    async def per_request(app: FastAPI) -> float:
+        started = time.perf_counter()
+        for _ in range(requests):
+            await app(dict(scope), receive, send)
+        return (time.perf_counter() - started) / requests
+
+    apps = {"off": build(False), "on": build(True)}
+    for app in apps.values():
+        # Builds the middleware stack and the labelled metric children
+        await app(dict(scope), receive, send)
+    best = {name: float("inf") for name in apps}
+    for _ in range(repeats):
+        for name, app in apps.items():
+            best[name] = min(best[name], await per_request(app))
+    result = {
+        "requests": requests,
+        "off_us": round(best["off"] * 1e6, 2),
+        "on_us": round(best["on"] * 1e6, 2),
+        "overhead_us": round((best["on"] - best["off"]) * 1e6, 2),
+    }
+    print(f"  MetricsMiddleware: {result['off_us']:.1f} -> {result['on_us']:.1f} us per request ({result['overhead_us']:+.1f} us)", file=sys.stderr)
+    return result
+
+
+# -----------------------------
+# Comparing runs
+# -----------------------------
+def compare(old: Dict[str, Any], new: Dict[str, Any], tolerance: float) -> List[str]:
+    """Print old -> new per measurement; returns the ones that regressed beyond `tolerance`."""
+    regressions = []
+
+    def check(label: str, before: Optional[float], after: Optional[float], lower_is_better: bool = True):
+        if not before or after is None:
+            return
+        change = (after - before) / before
+        worse = change > tolerance if lower_is_better else change < -tolerance
+        print(f"  {label:<60} {before:>10.2f} -> {after:>10.2f}  {change:+7.1%}{'  REGRESSION' if worse else ''}", file=sys.stderr)
+        if worse:
+            regressions.append(label)
+
+    for route, result in new.get("api", {}).items():
+        before = old.get("api", {}).get(route)
+        if before:
+            check(f"{route} p99 ms", before["p99_ms"], result["p99_ms"])
+            check(f"{route} req/s", before["rps"], result["rps"], lower_is_better=False)
+            check(f"{route} bytes", before.get("bytes_per_request"), result["bytes_per_request"])
+    old_ticks = {r["due"]: r for r in old.get("scheduler", [])}
+    for result in new.get("scheduler", []):
+        if result["due"] in old_ticks:
+            check(f"scheduler tick, {result['due']} due ms", old_ticks[result["due"]]["seconds"] * 1000, result["seconds"] * 1000)
+    for mode, result in new.get("login_storm", {}).items():
+        before = old.get("login_storm", {}).get(mode)
+        if before:
+            check(f"login storm, bcrypt {mode}: login p99 ms", before["login"]["p99_ms"], result["login"]["p99_ms"])
+            check(f"login storm, bcrypt {mode}: /accounts/me p99 ms", before["accounts_me"]["p99_ms"], result["accounts_me"]["p99_ms"])
+    old_pipeline = {r["due"]: r for r in old.get("pipeline", [])}
+    for result in new.get("pipeline", []):
+        if result["due"] in old_pipeline:
+            check(f"pipeline, {result['due']} due posts/s", old_pipeline[result["due"]]["posts_per_second"], result["posts_per_second"], lower_is_better=False)
+    old_fanout = {r["clients"]: r for r in old.get("websocket", [])}
+    for result in new.get("websocket", []):
+        if result["clients"] in old_fanout:
+            check(f"fan-out to {result['clients']} sockets p99 ms", old_fanout[result["clients"]]["p99_ms"], result["p99_ms"])
+    if "rollup" in new and "rollup" in old:
+        check("rollup daily series p50 ms", old["rollup"]["rollup"]["p50_ms"], new["rollup"]["rollup"]["p50_ms"])
+    if "tokens" in new and "tokens" in old:
+        check("token cache hit us", old["tokens"]["cache_hit_us"], new["tokens"]["cache_hit_us"])
+    if "middleware" in new and "middleware" in old:
+        check("metrics middleware on us", old["middleware"]["on_us"], new["middleware"]["on_us"])
+    return regressions
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def int_list(value: str) -> List[int]:
+    return [int(v) for v in value.split(",") if v]
+
+
+async def main(args) -> Dict[str, Any]:
+    report: Dict[str, Any] = {
+        "meta": {
+            "revision": git_revision(),
+            "started_at": datetime.now(timezone.utc).isoformat(),
+            "python": platform.python_version(),
+            "database": engine.url.get_backend_name(),
+            "target": args.base_url or "in-process",
+            "concurrency": args.concurrency,
+            "duration_seconds": args.duration,
+        }
+    }
+    try:
+        if args.seed:
+            if await foreign_users() and not args.force:
+                raise SystemExit("The database has non-benchmark users; refusing to drop it without --force")
+            print(f"Seeding {args.users} users and {args.posts} posts...", file=sys.stderr)
+            report["seed"] = await seed(args.users, args.posts, args.followers)
+        user_ids = await bench_users()
+        if not user_ids:
+            raise SystemExit("No benchmark data; run with --seed first")
+        async with async_session() as db:
+            report["meta"]["posts"] = (await db.execute(select(func.count(Post.id)))).scalar()
+        report["meta"]["users"] = len(user_ids)
+
+        suites = set(args.suites.split(","))
+        if "api" in suites:
+            print("API routes:", file=sys.stderr)
+            report["api"] = await bench_api(args, user_ids)
+        if "login_storm" in suites:
+            print("Login storm:", file=sys.stderr)
+            report["login_storm"] = await bench_login_storm(args, user_ids)
+        if "scheduler" in suites:
+            print("Scheduler:", file=sys.stderr)
+            report["scheduler"] = await bench_scheduler(int_list(args.due), user_ids)
+        if "pipeline" in suites:
+            print("Publish pipeline:", file=sys.stderr)
+            report["pipeline"] = await bench_pipeline(int_list(args.pipeline_due), user_ids, args.platform_latency_ms / 1000)
+        if "websocket" in suites:
+            print("WebSocket:", file=sys.stderr)
+            report["websocket"] = await bench_websocket(int_list(args.clients), args.rounds)
+        if "rollup" in suites:
+            print("Analytics rollup:", file=sys.stderr)
+            report["rollup"] = await bench_rollup(user_ids, args.days, args.rounds)
+        if "tokens" in suites:
+            print("Token cache:", file=sys.stderr)
+            report["tokens"] = bench_tokens(min(len(user_ids), settings.AUTH_CACHE_SIZE), args.token_rounds)
+        if "middleware" in suites:
+            print("Metrics middleware:", file=sys.stderr)
+            report["middleware"] = await bench_middleware(args.middleware_requests)
+    finally:
+        await engine.dispose()
+    return report
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--seed", action="store_true", help="drop all tables and load synthetic data first")
+    parser.add_argument("--force", action="store_true", help="allow --seed on a database with other users")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--posts", type=int, default=100000)
+    parser.add_argument("--followers", type=int, default=settings.FAKE_FOLLOWER_COUNT, help="follower ids per seeded account")
+    parser.add_argument("--suites", default="api,login_storm,scheduler,pipeline,websocket,rollup,tokens,middleware")
+    parser.add_argument("--routes", default="", help="comma separated substrings of route names to run")
+    parser.add_argument("--base-url", default="", help="load a running server instead of the in-process app")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--duration", type=float, default=5.0, help="seconds measured per route")
+    parser.add_argument("--warmup", type=float, default=1.0)
+    parser.add_argument("--logins", type=int, default=32, help="concurrent login clients in the login_storm suite")
+    parser.add_argument("--due", default="100,1000,10000", help="due posts per scheduler tick")
+    parser.add_argument("--pipeline-due", default="100,1000", help="due posts pushed through the publish pipeline")
+    parser.add_argument("--platform-latency-ms", type=float, default=settings.FAKE_PLATFORM_LATENCY_MS, help="fake platform call time in the pipeline suite")
+    parser.add_argument("--clients", default="10,100,1000,5000", help="WebSocket sockets per fan-out")
+    parser.add_argument("--rounds", type=int, default=50, help="fan-outs per socket count; queries per source in the rollup suite")
+    parser.add_argument("--days", type=int, default=45, help="days in the rollup suite's series")
+    parser.add_argument("--token-rounds", type=int, default=100, help="passes over the token set in the token suite")
+    parser.add_argument("--middleware-requests", type=int, default=20000)
+    parser.add_argument("--out", default="", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--compare", default="", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="allowed slowdown before --compare fails")
+    return parser.parse_args(argv)
+
+
+if __name__ == "__main__":
+    args = parse_args()
+    report = asyncio.run(main(args))
+    output = json.dumps(report, indent=2, default=str)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(output + "\n")
+    else:
+        print(output)
+    if args.compare:
+        with open(args.compare) as f:
+            regressions = compare(json.load(f), report, args.tolerance)
+        if regressions:
+            print(f"{len(regressions)} measurement(s) regressed by more than {args.tolerance:.0%}", file=sys.stderr)
+            sys.exit(1)
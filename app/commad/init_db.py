@@ -1,6 +1,6 @@
 import asyncio
 from app.database import engine, Base
-from app.models import post, user, account
+from app.models import post, user, account, outbox, post_stats, follower_graph, media, recurring_post, user_version
 
 async def init_models():
     async with engine.begin() as conn:
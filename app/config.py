@@ -1,4 +1,5 @@
 from pathlib import Path
+from typing import Dict, List
 from pydantic_settings import BaseSettings
 
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -10,16 +11,192 @@ class Settings(BaseSettings):
     ENV: str = "development"
     DEBUG: bool = True
 
+    # Platform API calls per linked account; also caps login and registration attempts per client
     RATE_LIMIT_PER_MINUTE: int = 10
-    
+
+    # HTTP rate limiting: memory (per process) | redis (shared by all workers)
+    RATE_LIMIT_ENABLED: bool = True
+    RATE_LIMIT_BACKEND: str = "memory"
+    # Requests per minute per signed-in user, and per client IP for anonymous requests
+    RATE_LIMIT_USER_PER_MINUTE: int = 600
+    RATE_LIMIT_IP_PER_MINUTE: int = 300
+    # Tighter per-client budgets for single routes, e.g. {"POST /accounts/tweets": 60}
+    RATE_LIMIT_ROUTES: Dict[str, int] = {}
+    RATE_LIMIT_EXEMPT_PREFIXES: List[str] = ["/static", "/metrics"]
+    RATE_LIMIT_MAX_KEYS: int = 100000
+    # Requests served at once per process; 0 uses the DB pool size (pool_size + max_overflow)
+    ADMISSION_MAX_CONCURRENT: int = 0
+    # How long a request may wait for a slot before it gets a 503
+    ADMISSION_QUEUE_TIMEOUT_SECONDS: float = 0.25
+    # Streaming transfers that hold no DB connection and take no slot
+    ADMISSION_UNMETERED_PREFIXES: List[str] = ["/media"]
+
     # Database
     DATABASE_URL: str
+    # Optional read replica used by read-only endpoints such as /accounts/tweets
+    DATABASE_READ_URL: str | None = None
+    DB_ECHO: bool = False
+    DB_POOL_SIZE: int = 10
+    DB_MAX_OVERFLOW: int = 10
+    DB_POOL_TIMEOUT: float = 10.0
+    DB_POOL_RECYCLE: int = 1800
+    DB_POOL_PRE_PING: bool = True
+    # Total connections the server allows this app; 0 disables the per-worker split
+    DB_MAX_CONNECTIONS: int = 0
+    # Same variable uvicorn reads for its default worker count
+    WEB_CONCURRENCY: int = 1
+    # asyncpg prepared statement cache; set 0 behind pgbouncer in transaction mode
+    DB_STATEMENT_CACHE_SIZE: int = 100
+    DB_STATEMENT_TIMEOUT_MS: int = 0
+
+    # Scheduler
+    PUBLISH_BATCH_SIZE: int = 500
+    PUBLISH_MAX_BATCHES_PER_TICK: int = 20
+    # Which process runs publish_posts_job: auto | postgres | redis | file | memory (tests only)
+    SCHEDULER_LOCK_BACKEND: str = "auto"
+    # Where the file backend keeps its lock; defaults to the system temp dir
+    SCHEDULER_LOCK_DIR: str = ""
+    SCHEDULER_LEASE_SECONDS: int = 30
+    # The due timer publishes on time; this interval poll is only a safety reconcile
+    SCHEDULER_RECONCILE_SECONDS: int = 60
+    SCHEDULER_TIMER_CAPACITY: int = 1000
+    # Recurring posts: occurrences kept as scheduled rows per rule, and the shortest allowed interval
+    RECURRENCE_AHEAD: int = 3
+    RECURRENCE_MIN_INTERVAL_SECONDS: int = 3600
+
+    # Outbound publish pipeline (outbox + per-platform workers); off keeps the offline demo flow
+    PUBLISH_PIPELINE_ENABLED: bool = False
+    # fake (simulated platforms) | live (tweepy for twitter, fake for the rest)
+    PUBLISH_PLATFORM_CLIENT: str = "fake"
+    PUBLISH_WORKERS_PER_PLATFORM: int = 8
+    PUBLISH_QUEUE_SIZE: int = 200
+    PUBLISH_POLL_SECONDS: float = 5.0
+    # In-flight rows not finished within the lease are picked up again
+    PUBLISH_LEASE_SECONDS: int = 300
+    PUBLISH_CALL_TIMEOUT_SECONDS: float = 30.0
+    PUBLISH_MAX_ATTEMPTS: int = 5
+    PUBLISH_RETRY_BASE_SECONDS: float = 2.0
+    PUBLISH_RETRY_MAX_SECONDS: float = 300.0
+    # Per-account calls are limited by RATE_LIMIT_PER_MINUTE; this caps a whole platform
+    PLATFORM_RATE_LIMIT_PER_MINUTE: int = 3000
+    # Where those budgets are kept: memory (per process) | redis (shared by API and Celery workers)
+    PUBLISH_RATE_LIMIT_BACKEND: str = "memory"
+    FAKE_PLATFORM_LATENCY_MS: int = 200
+    FAKE_PLATFORM_FAILURE_RATE: float = 0.0
+
+    # Background tasks: inprocess (bounded workers in the API) | celery (app.worker)
+    TASK_BACKEND: str = "inprocess"
+    # Run in-process tasks inline when enqueued (tests, local scripts)
+    TASK_ALWAYS_EAGER: bool = False
+    TASK_WORKERS: int = 2
+    TASK_QUEUE_SIZE: int = 1000
+    # Defaults to REDIS_URL
+    CELERY_BROKER_URL: str = ""
+    CELERY_CONCURRENCY: int = 2
+    CELERY_PREFETCH_MULTIPLIER: int = 1
+    # Prometheus port of the Celery worker; 0 disables it
+    CELERY_METRICS_PORT: int = 9100
+    # Minimum gap between due-timer ticks while a queued publish task may still be pending
+    SCHEDULER_MIN_TICK_SECONDS: float = 0.5
+
+    # Follower graph sync: fake (simulated graphs) | live (tweepy for twitter, fake for the rest)
+    FOLLOWER_SOURCE: str = "fake"
+    FOLLOWER_SYNC_INTERVAL_SECONDS: int = 3600
+    # How often the leader queues a sync of the stalest accounts, and how many per run
+    FOLLOWER_SYNC_TICK_SECONDS: int = 60
+    FOLLOWER_SYNC_BATCH: int = 20
+    FOLLOWER_PAGE_SIZE: int = 1000
+    FOLLOWER_MAX_IDS: int = 5000000
+    FAKE_FOLLOWER_COUNT: int = 1000
+    FAKE_FOLLOWING_COUNT: int = 100
+    FAKE_FOLLOWER_CHURN: float = 0.01
+
+    # Media uploads, stored content-addressed under MEDIA_ROOT
+    MEDIA_ROOT: str = str(BASE_DIR / "uploads")
+    MEDIA_MAX_BYTES: int = 1024 * 1024 * 1024
+    # Upload bytes are hashed and written to disk in blocks of this size
+    MEDIA_WRITE_BUFFER_BYTES: int = 1024 * 1024
+    # Let nginx send files (X-Accel-Redirect to MEDIA_ACCEL_PREFIX) instead of the app
+    MEDIA_ACCEL_REDIRECT: bool = False
+    MEDIA_ACCEL_PREFIX: str = "/protected-media/"
+    MEDIA_THUMBNAIL_WIDTH: int = 320
+    MEDIA_PROCESS_TIMEOUT_SECONDS: int = 120
+    FFMPEG_BINARY: str = "ffmpeg"
+
+    # Bulk post endpoints
+    BULK_MAX_ITEMS: int = 10000
+    BULK_INSERT_CHUNK_SIZE: int = 1000
+    # Rows fetched per round trip when streaming /accounts/posts/export
+    EXPORT_BATCH_SIZE: int = 1000
+    # Content calendar: widest window per request, and posts allowed per account in one slot by platform
+    CALENDAR_MAX_DAYS: int = 92
+    CALENDAR_SLOT_LIMITS: Dict[str, int] = {"twitter": 5, "instagram": 2, "tiktok": 3}
+
+    # Conditional GETs (ETag / 304) on per-user read endpoints, keyed by the user's data version
+    HTTP_CACHE_ENABLED: bool = True
+    HTTP_CACHE_PATHS: List[str] = [
+        "/accounts/me",
+        "/accounts/bootstrap",
+        "/accounts/tweets",
+        "/accounts/followers",
+        "/accounts/following",
+        "/accounts/followers/changes",
+        "/analytics/daily",
+        "/analytics/summary",
+        "/calendar/posts",
+        "/calendar/slots",
+        "/calendar/conflicts",
+        "/recurring",
+    ]
+    # Copies of those responses: off | memory (per process) | redis (shared by all workers)
+    HTTP_CACHE_BACKEND: str = "memory"
+    HTTP_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+    HTTP_CACHE_TTL_SECONDS: int = 300
+    # Change when a deploy alters what those endpoints return without an APP_VERSION bump
+    HTTP_CACHE_SALT: str = ""
+    # Gzip JSON and text responses of at least this many bytes; 0 disables compression
+    GZIP_MIN_SIZE: int = 1024
+    GZIP_LEVEL: int = 6
+
+    # Per-route latency and DB query metrics (the /metrics endpoint is always served)
+    METRICS_ENABLED: bool = True
+
+    # Logging: json | text; LOG_LEVELS sets levels per logger, e.g. {"app.utils.leader": "WARNING"}
+    LOG_LEVEL: str = "INFO"
+    LOG_FORMAT: str = "json"
+    LOG_LEVELS: Dict[str, str] = {"sqlalchemy.engine": "WARNING", "apscheduler": "WARNING"}
+    # Fraction of high-volume events that are logged, by event name
+    LOG_SAMPLE_RATES: Dict[str, float] = {"post.published": 0.01, "post.scheduled": 0.1}
+    # Records waiting for the log writer thread; more are dropped (and counted)
+    LOG_QUEUE_SIZE: int = 10000
+
+    # Redis
+    REDIS_URL: str = "redis://redis:6379/0"
+
+    # WebSocket fan-out: memory (single process) | redis (pub/sub across processes)
+    WS_BACKPLANE: str = "memory"
+    WS_SEND_QUEUE_SIZE: int = 64
+    WS_SEND_TIMEOUT_SECONDS: float = 5.0
+    # Events kept per user for replay to reconnecting clients
+    WS_EVENT_BUFFER_SIZE: int = 200
 
-  
     # JWT
     SECRET_KEY: str
     ALGORITHM: str = "HS256"
     ACCESS_TOKEN_EXPIRE_MINUTES: int = 60
+    # Verified-token cache used by get_current_user and the WebSocket handshake
+    AUTH_CACHE_SIZE: int = 10000
+    AUTH_CACHE_TTL_SECONDS: int = 300
+
+    # Linked-account cache: memory (per process) | redis (adds a shared tier)
+    ACCOUNT_CACHE_BACKEND: str = "memory"
+    ACCOUNT_CACHE_SIZE: int = 10000
+    ACCOUNT_CACHE_TTL_SECONDS: int = 300
+
+    # Password hashing (bcrypt cost and the worker pool that runs it)
+    BCRYPT_ROUNDS: int = 12
+    PASSWORD_HASH_WORKERS: int = 4
+    PASSWORD_HASH_MAX_PENDING: int = 64
     
     # API keys 
     INSTAGRAM_CLIENT_ID: str | None = None
@@ -1,10 +1,128 @@
+import time
+from contextvars import ContextVar
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool
 from app.config import settings
+from app.utils.metrics import instrument_engine, register_stats
 
 Base = declarative_base()
 
-engine = create_async_engine(settings.DATABASE_URL, echo=settings.DEBUG)
+
+class PoolStats:
+    """Checkout counters and wait times for one engine's connection pool."""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.checkins = 0
+        self.connects = 0
+        self.timeouts = 0
+        self.wait_count = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+        self.engine = None
+
+    def record_wait(self, seconds: float):
+        self.wait_count += 1
+        self.wait_seconds_total += seconds
+        self.wait_seconds_max = max(self.wait_seconds_max, seconds)
+
+    def snapshot(self):
+        stats = {
+            "checkouts": self.checkouts,
+            "checkins": self.checkins,
+            "connects": self.connects,
+            "timeouts": self.timeouts,
+            "wait_count": self.wait_count,
+            "wait_seconds_total": self.wait_seconds_total,
+            "wait_seconds_max": self.wait_seconds_max,
+        }
+        pool = self.engine.sync_engine.pool if self.engine is not None else None
+        if isinstance(pool, AsyncAdaptedQueuePool):
+            stats.update(size=pool.size(), checked_out=pool.checkedout(), overflow=pool.overflow())
+        return stats
+
+
+def timed_pool_class(stats: PoolStats):
+    """Queue pool that records how long each checkout waits for a connection."""
+
+    class TimedQueuePool(AsyncAdaptedQueuePool):
+        def _do_get(self):
+            start = time.perf_counter()
+            try:
+                return super()._do_get()
+            except PoolTimeoutError:
+                stats.timeouts += 1
+                raise
+            finally:
+                stats.record_wait(time.perf_counter() - start)
+
+    return TimedQueuePool
+
+
+def pool_budget():
+    """
+    Per-worker pool_size/max_overflow. With DB_MAX_CONNECTIONS set, the server's
+    connection budget is split across WEB_CONCURRENCY uvicorn workers.
+    """
+    pool_size, max_overflow = settings.DB_POOL_SIZE, settings.DB_MAX_OVERFLOW
+    if settings.DB_MAX_CONNECTIONS:
+        per_worker = max(1, settings.DB_MAX_CONNECTIONS // max(1, settings.WEB_CONCURRENCY))
+        pool_size = min(pool_size, per_worker)
+        max_overflow = max(0, min(max_overflow, per_worker - pool_size))
+    return pool_size, max_overflow
+
+
+def engine_options(url: str, stats: PoolStats):
+    """Engine keyword arguments for the configured database profile."""
+    options = {"echo": settings.DB_ECHO}
+    parsed = make_url(url)
+    if parsed.get_backend_name() == "sqlite":
+        # SQLite keeps SQLAlchemy's default (static/queue) pool for the file or memory DB
+        return options
+
+    pool_size, max_overflow = pool_budget()
+    options.update(
+        poolclass=timed_pool_class(stats),
+        pool_size=pool_size,
+        max_overflow=max_overflow,
+        pool_timeout=settings.DB_POOL_TIMEOUT,
+        pool_recycle=settings.DB_POOL_RECYCLE,
+        pool_pre_ping=settings.DB_POOL_PRE_PING,
+    )
+    if parsed.get_driver_name() == "asyncpg":
+        connect_args = {"prepared_statement_cache_size": settings.DB_STATEMENT_CACHE_SIZE}
+        if settings.DB_STATEMENT_TIMEOUT_MS:
+            connect_args["server_settings"] = {"statement_timeout": str(settings.DB_STATEMENT_TIMEOUT_MS)}
+        options["connect_args"] = connect_args
+    return options
+
+
+def build_engine(url: str, stats: PoolStats):
+    new_engine = create_async_engine(url, **engine_options(url, stats))
+    stats.engine = new_engine
+
+    @event.listens_for(new_engine.sync_engine, "checkout")
+    def _on_checkout(*args):
+        stats.checkouts += 1
+
+    @event.listens_for(new_engine.sync_engine, "checkin")
+    def _on_checkin(*args):
+        stats.checkins += 1
+
+    @event.listens_for(new_engine.sync_engine, "connect")
+    def _on_connect(*args):
+        stats.connects += 1
+
+    return new_engine
+
+
+pool_stats = {"primary": PoolStats()}
+engine = build_engine(settings.DATABASE_URL, pool_stats["primary"])
+instrument_engine(engine, "primary")
 
 async_session = sessionmaker(
     bind=engine,
@@ -12,6 +130,49 @@ async_session = sessionmaker(
     class_=AsyncSession
 )
 
+# Optional read replica for read-only endpoints; falls back to the primary
+if settings.DATABASE_READ_URL:
+    pool_stats["replica"] = PoolStats()
+    read_engine = build_engine(settings.DATABASE_READ_URL, pool_stats["replica"])
+    instrument_engine(read_engine, "replica")
+    async_read_session = sessionmaker(
+        bind=read_engine,
+        expire_on_commit=False,
+        class_=AsyncSession
+    )
+else:
+    read_engine = engine
+    async_read_session = async_session
+
+# Set while serving a response that must not be older than the primary, e.g.
+# a revalidation tagged with the user's version (see HttpCacheMiddleware)
+read_from_primary: ContextVar[bool] = ContextVar("read_from_primary", default=False)
+
+register_stats(
+    "db_pool",
+    "SQLAlchemy connection pool",
+    lambda: {name: stats.snapshot() for name, stats in pool_stats.items()},
+    counters=("checkouts", "checkins", "connects", "timeouts", "wait_count", "wait_seconds_total"),
+    label="engine",
+)
+
+def dialect_insert(db: AsyncSession, model):
+    """INSERT construct with the backend's ON CONFLICT support (Postgres or SQLite)."""
+    if db.bind.dialect.name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    else:
+        from sqlalchemy.dialects.sqlite import insert
+    return insert(model)
+
 async def get_db():
     async with async_session() as session:
         yield session
+
+async def get_read_db():
+    """
+    Session for read-only endpoints; routed to DATABASE_READ_URL when
+    configured, unless the request has read_from_primary set.
+    """
+    session_factory = async_session if read_from_primary.get() else async_read_session
+    async with session_factory() as session:
+        yield session
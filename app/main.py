@@ -1,21 +1,85 @@
 import os
 from fastapi import FastAPI
-from app.routers import auth, accounts, bot_interface, schedule
+from app.routers import auth, accounts, analytics, bot_interface, calendar, media, recurring, schedule
 from app.config import settings
+from app.database import pool_budget
+from app.utils.http_cache import CompressionMiddleware, HttpCache, HttpCacheMiddleware, build_response_cache
+from app.utils.log import RequestIdMiddleware, configure_logging
+from app.utils.metrics import MetricsMiddleware, metrics_endpoint, register_stats
+from app.utils.rate_limit import AdmissionController, RateLimiter, RateLimitMiddleware, build_rate_limit_backend
+from app.utils.security import verify_access_token
+from app.utils.user_version import read_user_version
+from fastapi.responses import JSONResponse, ORJSONResponse
 from fastapi.staticfiles import StaticFiles
 from starlette.middleware.sessions import SessionMiddleware
 import uvicorn
 
-app = FastAPI(title=settings.PROJECT_NAME, version=settings.APP_VERSION)
+try:
+    import orjson  # noqa: F401  serializes JSON responses several times faster
+    default_response_class = ORJSONResponse
+except ImportError:
+    default_response_class = JSONResponse
+
+configure_logging()
+
+app = FastAPI(title=settings.PROJECT_NAME, version=settings.APP_VERSION, default_response_class=default_response_class)
 
 # Use correct static path
 app.mount("/static", StaticFiles(directory="static"), name="static")
 app.add_middleware(SessionMiddleware, secret_key="super-secret-session-key")
+if settings.HTTP_CACHE_ENABLED:
+    http_cache = HttpCache(
+        read_user_version,
+        verify_access_token,
+        settings.HTTP_CACHE_PATHS,
+        cache=build_response_cache(settings.HTTP_CACHE_BACKEND, settings.REDIS_URL, settings.HTTP_CACHE_MAX_BYTES, settings.HTTP_CACHE_TTL_SECONDS),
+        salt=f"{settings.APP_VERSION}|{settings.HTTP_CACHE_SALT}",
+    )
+    register_stats("http_cache", "Conditional GETs answered from the user's version", http_cache.stats, counters=("not_modified", "hits", "misses", "errors"))
+    # Inside rate limiting and admission, so polls still count against budgets
+    app.add_middleware(HttpCacheMiddleware, http_cache=http_cache)
+if settings.RATE_LIMIT_ENABLED:
+    rate_limiter = RateLimiter(
+        build_rate_limit_backend(settings.RATE_LIMIT_BACKEND, settings.REDIS_URL, settings.RATE_LIMIT_MAX_KEYS),
+        user_per_minute=settings.RATE_LIMIT_USER_PER_MINUTE,
+        ip_per_minute=settings.RATE_LIMIT_IP_PER_MINUTE,
+        routes={
+            "POST /auth/api/login": settings.RATE_LIMIT_PER_MINUTE,
+            "POST /auth/api/register": settings.RATE_LIMIT_PER_MINUTE,
+            **settings.RATE_LIMIT_ROUTES,
+        },
+        verify_token=verify_access_token,
+    )
+    admission = AdmissionController(
+        settings.ADMISSION_MAX_CONCURRENT or sum(pool_budget()),
+        settings.ADMISSION_QUEUE_TIMEOUT_SECONDS,
+    )
+    register_stats("rate_limit", "HTTP requests checked against per-client budgets", rate_limiter.stats, counters=("allowed", "limited", "backend_errors"))
+    register_stats("admission", "HTTP requests admitted or shed by concurrency control", admission.stats, counters=("admitted", "rejected"))
+    # Inside the metrics middleware, so 429s and 503s show up per route
+    app.add_middleware(
+        RateLimitMiddleware,
+        limiter=rate_limiter,
+        admission=admission,
+        exempt_prefixes=settings.RATE_LIMIT_EXEMPT_PREFIXES,
+        unmetered_prefixes=settings.ADMISSION_UNMETERED_PREFIXES,
+    )
+if settings.GZIP_MIN_SIZE:
+    app.add_middleware(CompressionMiddleware, minimum_size=settings.GZIP_MIN_SIZE, compresslevel=settings.GZIP_LEVEL)
+if settings.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+# Outermost, so every log line of a request (metrics included) carries its id
+app.add_middleware(RequestIdMiddleware)
 app.include_router(auth.router, prefix="/auth", tags=["auth"])
 app.include_router(accounts.router, prefix="/accounts", tags=["Accounts"])
+app.include_router(analytics.router, prefix="/analytics", tags=["Analytics"])
+app.include_router(calendar.router, prefix="/calendar", tags=["Calendar"])
+app.include_router(recurring.router, prefix="/recurring", tags=["Recurring"])
+app.include_router(media.router, prefix="/media", tags=["Media"])
 app.include_router(bot_interface.router, tags=["Home"])
 # Include the WebSocket router
 app.include_router(schedule.router, tags=["WebSocket"])
+app.add_route("/metrics", metrics_endpoint, include_in_schema=False)
 
 if __name__ == "__main__":
     uvicorn.run("main:app", host="0.0.0.0", port=8001, reload=True)
@@ -3,5 +3,11 @@ from .user import User
 from .account import Account
 # also import Post if you have it
 from .post import Post  
+from .outbox import PublishOutbox
+from .post_stats import PostStatsDaily
+from .follower_graph import FollowerGraph
+from .media import MediaAsset, UserMedia
+from .recurring_post import RecurringPost
+from .user_version import UserVersion
 
-__all__ = ["User", "Account", "Post"]
+__all__ = ["User", "Account", "Post", "PublishOutbox", "PostStatsDaily", "FollowerGraph", "MediaAsset", "UserMedia", "RecurringPost", "UserVersion"]
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Enum
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Enum, Index
 from sqlalchemy.orm import relationship
 from app.database import Base
 import enum
@@ -26,3 +26,8 @@ class Account(Base):
     # Relationships
     owner = relationship("User", back_populates="accounts")
     posts = relationship("Post", back_populates="account", cascade="all, delete")
+
+    __table_args__ = (
+        # Duplicate check on link and the delete lookup probe this index only.
+        Index("ix_accounts_user_platform_username", "user_id", "platform", "username"),
+    )
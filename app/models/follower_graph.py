@@ -0,0 +1,27 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, LargeBinary, UniqueConstraint
+from app.database import Base
+
+class FollowerGraph(Base):
+    """
+    Latest snapshot of one account's followers or following: the platform
+    user ids as a sorted, packed int64 array (8 bytes per edge instead of a
+    row each), plus the ids gained and lost since the previous sync.
+    """
+    __tablename__ = "follower_graphs"
+
+    id = Column(Integer, primary_key=True, index=True)
+    # followers | following
+    direction = Column(String, nullable=False)
+    id_count = Column(Integer, nullable=False, default=0)
+    ids = Column(LargeBinary, nullable=False)
+    gained = Column(LargeBinary, nullable=False)
+    lost = Column(LargeBinary, nullable=False)
+    synced_at = Column(DateTime(timezone=True), nullable=False)
+    previous_synced_at = Column(DateTime(timezone=True), nullable=True)
+
+    # FK → Account
+    account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        UniqueConstraint("account_id", "direction", name="uq_follower_graphs_account_direction"),
+    )
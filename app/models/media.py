@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, BigInteger, String, ForeignKey, DateTime, func, Text, UniqueConstraint
+from app.database import Base
+
+class MediaAsset(Base):
+    """
+    One stored file per distinct content. Uploads with the same sha256 reuse
+    the asset, whichever user or post they come from.
+    """
+    __tablename__ = "media_assets"
+
+    id = Column(Integer, primary_key=True, index=True)
+    sha256 = Column(String(64), nullable=False, unique=True)
+    size = Column(BigInteger, nullable=False)
+    content_type = Column(String, nullable=False)
+    # Paths relative to MEDIA_ROOT
+    storage_key = Column(String, nullable=False)
+    thumbnail_key = Column(String, nullable=True)
+    # processing -> ready | failed (thumbnailing failed; the file itself is fine)
+    status = Column(String, nullable=False, default="processing")
+    last_error = Column(Text, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class UserMedia(Base):
+    """A user's handle on an asset; its id is the media id clients see."""
+    __tablename__ = "user_media"
+
+    id = Column(Integer, primary_key=True, index=True)
+    filename = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # FK → User & MediaAsset
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    asset_id = Column(Integer, ForeignKey("media_assets.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        # One handle per user and content; also serves the per-user listing
+        UniqueConstraint("user_id", "asset_id", name="uq_user_media_user_asset"),
+    )
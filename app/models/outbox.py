@@ -0,0 +1,36 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Text, Index, text
+from app.database import Base
+
+class PublishOutbox(Base):
+    """
+    One row per post handed to the publish pipeline. Rows move
+    pending -> in_flight -> done, or to dead once retries are exhausted.
+    """
+    __tablename__ = "publish_outbox"
+
+    id = Column(Integer, primary_key=True, index=True)
+    platform = Column(String, nullable=False)
+    # Sent to the platform client so retries never create a second post
+    idempotency_key = Column(String, nullable=False, unique=True)
+    status = Column(String, nullable=False, default="pending")
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(DateTime(timezone=True), nullable=False)
+    last_error = Column(Text, nullable=True)
+    external_id = Column(String, nullable=True)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+
+    # FK → Post & Account
+    post_id = Column(Integer, ForeignKey("posts.id", ondelete="CASCADE"), nullable=False)
+    account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        # Workers only ever look for claimable rows, oldest due first.
+        Index(
+            "ix_publish_outbox_claimable",
+            "status",
+            "next_attempt_at",
+            postgresql_where=text("status IN ('pending', 'in_flight')"),
+            sqlite_where=text("status IN ('pending', 'in_flight')"),
+        ),
+    )
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Text
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Text, Index, text
 from sqlalchemy.orm import relationship
 from app.database import Base
 
@@ -16,7 +16,40 @@ class Post(Base):
     # FK → User & Account
     user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"))
     account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"))
+    # Set on occurrences materialized from a RecurringPost
+    recurrence_id = Column(Integer, ForeignKey("recurring_posts.id", ondelete="SET NULL"), nullable=True)
 
     # Relationships
     owner = relationship("User", back_populates="posts")
     account = relationship("Account", back_populates="posts")
+
+    __table_args__ = (
+        # Partial index that only holds the scheduling queue, so the dispatcher
+        # walks due rows in scheduled_time order instead of scanning the table.
+        Index(
+            "ix_posts_status_scheduled_time",
+            "status",
+            "scheduled_time",
+            postgresql_where=text("status = 'scheduled'"),
+            sqlite_where=text("status = 'scheduled'"),
+        ),
+        # A user's upcoming posts (dashboard bootstrap), again only the scheduling queue.
+        Index(
+            "ix_posts_user_scheduled_time",
+            "user_id",
+            "scheduled_time",
+            postgresql_where=text("status = 'scheduled'"),
+            sqlite_where=text("status = 'scheduled'"),
+        ),
+        # Content calendar: an account's posts in a scheduled_time window, any status.
+        Index("ix_posts_account_scheduled_time", account_id, scheduled_time),
+        # Occurrences of a recurring post still waiting to go out.
+        Index(
+            "ix_posts_recurrence_pending",
+            "recurrence_id",
+            postgresql_where=text("status = 'scheduled'"),
+            sqlite_where=text("status = 'scheduled'"),
+        ),
+        # Keyset pagination of a user's timeline: (created_at, id) descending.
+        Index("ix_posts_user_created_id", user_id, created_at.desc(), id.desc()),
+    )
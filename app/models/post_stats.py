@@ -0,0 +1,26 @@
+from sqlalchemy import Column, Integer, String, Date, Float, UniqueConstraint
+from app.database import Base
+
+class PostStatsDaily(Base):
+    """
+    Pre-aggregated post counters: how many of a user's posts on an account
+    entered `status` on `day` (UTC), plus publish lateness for scheduled posts.
+    Maintained in the same transaction as the post changes.
+    """
+    __tablename__ = "post_stats_daily"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, nullable=False)
+    # 0 for posts without an account, so the unique key never holds NULL
+    account_id = Column(Integer, nullable=False, default=0)
+    day = Column(Date, nullable=False)
+    status = Column(String, nullable=False)
+    post_count = Column(Integer, nullable=False, default=0)
+    lateness_count = Column(Integer, nullable=False, default=0)
+    lateness_sum_seconds = Column(Float, nullable=False, default=0.0)
+    lateness_max_seconds = Column(Float, nullable=False, default=0.0)
+
+    __table_args__ = (
+        # Upsert target, and the (user_id, day) range scan behind the endpoints
+        UniqueConstraint("user_id", "day", "account_id", "status", name="uq_post_stats_daily_key"),
+    )
@@ -0,0 +1,32 @@
+from sqlalchemy import Column, Integer, String, ForeignKey, DateTime, func, Text, Index, JSON
+from app.database import Base
+
+class RecurringPost(Base):
+    """
+    A post template repeated by an RRULE or cron rule. Only the next few
+    occurrences exist as scheduled rows in posts (recurrence_id); the rest are
+    expanded lazily as those go out, from `next_time`, the first occurrence
+    not materialized yet. Status moves active <-> paused, or to finished once
+    the rule runs out.
+    """
+    __tablename__ = "recurring_posts"
+
+    id = Column(Integer, primary_key=True, index=True)
+    content = Column(Text, nullable=False)
+    media_url = Column(String, nullable=True)
+    rule = Column(String, nullable=False)
+    timezone = Column(String, nullable=False, default="UTC")
+    starts_at = Column(DateTime(timezone=True), nullable=False)
+    next_time = Column(DateTime(timezone=True), nullable=True)
+    # Skipped occurrences as UTC ISO 8601 strings
+    exdates = Column(JSON, nullable=False, default=list)
+    status = Column(String, nullable=False, default="active")
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # FK → User & Account
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), nullable=False)
+    account_id = Column(Integer, ForeignKey("accounts.id", ondelete="CASCADE"), nullable=False)
+
+    __table_args__ = (
+        Index("ix_recurring_posts_user_id", "user_id"),
+    )
@@ -0,0 +1,13 @@
+from sqlalchemy import BigInteger, Column, ForeignKey, Integer
+from app.database import Base
+
+class UserVersion(Base):
+    """
+    Per-user counter behind the HTTP validators (ETag / 304). Bumped in the
+    same transaction as every write to what the user's cached endpoints
+    return, so it changes exactly when the write commits.
+    """
+    __tablename__ = "user_versions"
+
+    user_id = Column(Integer, ForeignKey("users.id", ondelete="CASCADE"), primary_key=True)
+    version = Column(BigInteger, nullable=False, default=0)
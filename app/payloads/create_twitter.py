@@ -1,8 +1,11 @@
 from pydantic import BaseModel
 from datetime import datetime
+from typing import List, Optional
 
 class TweetCreate(BaseModel):
     content: str  
+    # From POST /media
+    media_id: Optional[int] = None
 
 class TweetWithMedia(BaseModel):
     content: str
@@ -10,4 +13,33 @@ class TweetWithMedia(BaseModel):
     
 class ScheduleTweetRequest(BaseModel):
     content: str
-    scheduled_time: datetime
\ No newline at end of file
+    scheduled_time: datetime
+    media_id: Optional[int] = None
+
+
+class BulkTweetItem(BaseModel):
+    content: str
+    account_id: Optional[int] = None
+
+
+class BulkScheduleItem(BaseModel):
+    content: str
+    scheduled_time: datetime
+    account_id: Optional[int] = None
+
+
+class RecurringPostRequest(BaseModel):
+    content: str
+    # RRULE ("FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=0") or cron ("0 9 * * 1")
+    rule: str
+    # First possible occurrence; defaults to now
+    starts_at: Optional[datetime] = None
+    # IANA zone the rule's wall times are in
+    timezone: str = "UTC"
+    account_id: Optional[int] = None
+    media_id: Optional[int] = None
+    exdates: List[datetime] = []
+
+
+class SkipOccurrenceRequest(BaseModel):
+    at: datetime
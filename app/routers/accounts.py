@@ -1,25 +1,94 @@
-from datetime import datetime, timezone
+import base64
+import csv
+import io
+import json
+import logging
+import zlib
+from datetime import datetime, timedelta, timezone
 from app.models.account import Account, Platform
+from app.models.media import UserMedia
 from app.models.post import Post
 from app.payloads.account_create import AccountCreate
-from app.payloads.create_twitter import ScheduleTweetRequest, TweetCreate, TweetWithMedia
+from app.payloads.create_twitter import BulkScheduleItem, BulkTweetItem, ScheduleTweetRequest, TweetCreate, TweetWithMedia
 from app.payloads.register_request import RegisterRequest
 from app.routers.dependencies import get_current_user
-from fastapi import APIRouter, Depends, HTTPException, status, Request
+from app.routers.schedule import backplane, manager, notify_scheduled, task_backend, wake_publish_pipeline
+from app.utils.account_cache import AccountCache, AccountSnapshot
+from app.utils.metrics import register_stats
+from app.utils.analytics import PostEvent, forget_account_stats, record_post_events, status_totals
+from app.utils.followers import graph_counts, read_first_pages, read_page
+from app.utils.publisher import enqueue_posts
+from app.utils.user_version import bump_user_versions
+from fastapi import APIRouter, Depends, HTTPException, status, Request, Query, Response
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy import and_, insert, literal, or_
 from sqlalchemy.future import select
-from app.database import get_db
+from app.database import async_read_session, async_session, get_db, get_read_db
 from app.models.user import User
 from fastapi.templating import Jinja2Templates
-from typing import List
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, Type
+from pydantic import BaseModel, TypeAdapter, ValidationError
 import tweepy
 from app.config import settings
 from typing import Dict
 import secrets
-from fastapi.responses import RedirectResponse
+from fastapi.responses import RedirectResponse, StreamingResponse
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# -----------------------------
+# Linked-account cache
+# -----------------------------
+async def load_accounts(user_id: int) -> List[AccountSnapshot]:
+    # Primary, not the replica: a reload right after a write must see it
+    async with async_session() as db:
+        result = await db.execute(
+            select(Account.id, Account.user_id, Account.platform, Account.username, Account.created_at)
+            .filter(Account.user_id == user_id)
+            .order_by(Account.id)
+        )
+        return [AccountSnapshot.from_account(row) for row in result]
+
+account_cache = AccountCache(
+    load_accounts,
+    maxsize=settings.ACCOUNT_CACHE_SIZE,
+    ttl=settings.ACCOUNT_CACHE_TTL_SECONDS,
+    redis_url=settings.REDIS_URL if settings.ACCOUNT_CACHE_BACKEND == "redis" else None,
+)
+register_stats(
+    "account_cache",
+    "Linked-account cache",
+    account_cache.stats,
+    counters=("hits", "redis_hits", "misses", "invalidations"),
+)
+
+ACCOUNTS_TOPIC = "accounts.invalidate"
+
+async def invalidate_accounts(user_id: int):
+    """
+    Drop a user's cached accounts here, in Redis and in every other process.
+    Runs after the commit: if the backplane is down, other processes keep
+    their copy until it expires (ACCOUNT_CACHE_TTL_SECONDS).
+    """
+    await account_cache.invalidate(user_id)
+    try:
+        await backplane.publish(ACCOUNTS_TOPIC, {"user_id": user_id})
+    except Exception as e:
+        logger.error("Failed to broadcast account invalidation for user_id=%s: %s", user_id, e)
+
+async def _on_accounts_invalidated(payload: dict):
+    account_cache.drop_local(payload["user_id"])
+
+@router.on_event("startup")
+async def subscribe_account_invalidation():
+    await backplane.subscribe(ACCOUNTS_TOPIC, _on_accounts_invalidated)
+
+async def linked_accounts(current_user: int = Depends(get_current_user)) -> List[AccountSnapshot]:
+    """The current user's accounts, ordered by id; resolved once per request."""
+    return await account_cache.get(current_user)
+
 # -----------------------------
 # Simulated Twitter Authorization
 # -----------------------------
@@ -36,11 +105,13 @@ async def twitter_authorize(current_user: int = Depends(get_current_user)):
 
 
 @router.get("/callback")
-async def twitter_callback(token: str, current_user: int = Depends(get_current_user), db: AsyncSession = Depends(get_db)):
-    result = await db.execute(
-        select(Account).filter(Account.user_id == current_user, Account.platform == Platform.twitter)
-    )
-    existing_account = result.scalars().first()
+async def twitter_callback(
+    token: str,
+    current_user: int = Depends(get_current_user),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+    db: AsyncSession = Depends(get_db),
+):
+    existing_account = next((acc for acc in accounts if acc.platform == Platform.twitter), None)
     if existing_account:
         return {"msg": "Twitter account already linked", "account_id": existing_account.id}
 
@@ -53,11 +124,14 @@ async def twitter_callback(token: str, current_user: int = Depends(get_current_u
         user_id=current_user
     )
     db.add(new_account)
+    await bump_user_versions(db, [current_user])
     await db.commit()
     await db.refresh(new_account)
+    await invalidate_accounts(current_user)
 
     # Remove token after use
     demo_request_tokens.pop(current_user, None)
+    await manager.emit(current_user, "account.linked", account={"id": new_account.id, "username": new_account.username, "platform": Platform.twitter.value})
 
     return {"msg": "Twitter account linked successfully", "account_id": new_account.id}
 
@@ -65,25 +139,101 @@ async def twitter_callback(token: str, current_user: int = Depends(get_current_u
 # Fetch User Info
 # -----------------------------
 @router.get("/me")
-async def twitter_me(db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
-    result = await db.execute(select(Account).filter(Account.user_id == current_user))
-    accounts = result.scalars().all()
-
+async def twitter_me(
+    db: AsyncSession = Depends(get_read_db),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
     if not accounts:
         raise HTTPException(status_code=200, detail="No accounts linked")
 
+    # Counts from the last follower sync; None until the first one finishes
+    counts = await graph_counts(db, [acc.id for acc in accounts])
     return [
         {
             "username": acc.username,
-            "platform": acc.platform.value if hasattr(acc.platform, "value") else acc.platform,
+            "platform": acc.platform.value,
             "name": "Demo User",
-            "followers_count": 100,
-            "following_count": 50
+            "followers_count": counts.get((acc.id, "followers")),
+            "following_count": counts.get((acc.id, "following"))
         }
         for acc in accounts
     ]
 
 
+# -----------------------------
+# Dashboard bootstrap
+# -----------------------------
+def _post_json(p) -> Dict[str, Any]:
+    return {"id": p.id, "text": p.content, "created_at": p.created_at, "status": p.status, "scheduled_time": p.scheduled_time}
+
+
+@router.get("/bootstrap")
+async def dashboard_bootstrap(
+    count: int = Query(20, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: int = Depends(get_current_user),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    """
+    Everything the dashboard renders on load in one response: linked accounts
+    with follower counts, recent and upcoming posts, 30-day status totals, the
+    first page of followers/following and the WebSocket `seq` to connect from.
+    One request and one connection instead of a request per panel; the queries
+    share the session one after another (a session runs one at a time).
+    Revalidation (ETag / 304) is handled by HttpCacheMiddleware.
+    """
+    account_ids = [acc.id for acc in accounts]
+    counts = await graph_counts(db, account_ids) if accounts else {}
+    recent = (await db.execute(
+        select(Post.id, Post.content, Post.created_at, Post.status, Post.scheduled_time)
+        .filter(Post.user_id == current_user)
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(count + 1)
+    )).all()
+    upcoming = (await db.execute(
+        select(Post.id, Post.content, Post.created_at, Post.status, Post.scheduled_time)
+        .filter(Post.user_id == current_user, Post.status == "scheduled")
+        .order_by(Post.scheduled_time, Post.id)
+        .limit(count)
+    )).all()
+    today = datetime.now(timezone.utc).date()
+    totals = await status_totals(db, current_user, today - timedelta(days=29), today)
+    graphs = await read_first_pages(db, account_ids[0], count) if accounts else {}
+    seq = await manager.event_log.current_seq(current_user)
+
+    next_cursor = None
+    if len(recent) > count:
+        recent = recent[:count]
+        next_cursor = encode_cursor(recent[-1].created_at, recent[-1].id)
+    return {
+        "seq": seq,
+        "accounts": [
+            {
+                "id": acc.id,
+                "username": acc.username,
+                "platform": acc.platform.value,
+                "name": "Demo User",
+                "followers_count": counts.get((acc.id, "followers")),
+                "following_count": counts.get((acc.id, "following")),
+            }
+            for acc in accounts
+        ],
+        "posts": [_post_json(p) for p in recent],
+        "next_cursor": next_cursor,
+        "scheduled": [_post_json(p) for p in upcoming],
+        "totals": totals,
+        **{
+            direction: {
+                "account_id": account_ids[0] if accounts else None,
+                "total": graphs[direction]["total"] if direction in graphs else 0,
+                "synced_at": graphs[direction]["synced_at"] if direction in graphs else None,
+                "ids": graphs[direction]["ids"] if direction in graphs else [],
+            }
+            for direction in ("followers", "following")
+        },
+    }
+
+
 @router.delete("/{platform}/{username}")
 async def delete_account_by_platform(
     platform: str,
@@ -104,56 +254,349 @@ async def delete_account_by_platform(
         raise HTTPException(status_code=404, detail="Account not found")
     
     await db.delete(account)
+    await forget_account_stats(db, current_user, account.id)
+    await bump_user_versions(db, [current_user])
     await db.commit()
+    await invalidate_accounts(current_user)
+    await manager.emit(current_user, "account.unlinked", account={"id": account.id, "username": username, "platform": platform.lower()})
     
     return {"msg": f"Account '{username}' on {platform} disconnected successfully"}
 
 # -----------------------------
 # Fetch Followers / Following
 # -----------------------------
+def _graph_account(accounts: List[AccountSnapshot], account_id: Optional[int]) -> AccountSnapshot:
+    account = next((a for a in accounts if a.id == account_id), None) if account_id is not None else (accounts[0] if accounts else None)
+    if account is None:
+        raise HTTPException(status_code=404, detail="No linked account found")
+    return account
+
+
+async def graph_page(response: Response, db: AsyncSession, accounts: List[AccountSnapshot], account_id: Optional[int], direction: str, offset: int, count: int):
+    """
+    Platform user ids from the last sync, in ascending order. Totals and the
+    snapshot time are returned in `X-Total-Count` and `X-Synced-At`; an account
+    that was never synced returns an empty page.
+    """
+    account = _graph_account(accounts, account_id)
+    page = await read_page(db, account.id, direction, offset, count)
+    if page is None:
+        response.headers["X-Total-Count"] = "0"
+        return []
+    response.headers["X-Total-Count"] = str(page["total"])
+    response.headers["X-Synced-At"] = page["synced_at"].isoformat()
+    return [{"id": platform_id} for platform_id in page["ids"]]
+
+
 @router.get("/followers")
-async def twitter_followers(db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
-    followers = [{"username": f"follower_{i}", "name": f"Follower {i}"} for i in range(1, 6)]
-    return followers
+async def twitter_followers(
+    response: Response,
+    account_id: Optional[int] = None,
+    offset: int = Query(0, ge=0),
+    count: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    return await graph_page(response, db, accounts, account_id, "followers", offset, count)
 
 @router.get("/following")
-async def twitter_following(db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
-    following = [{"username": f"following_{i}", "name": f"Following {i}"} for i in range(1, 6)]
-    return following
+async def twitter_following(
+    response: Response,
+    account_id: Optional[int] = None,
+    offset: int = Query(0, ge=0),
+    count: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    return await graph_page(response, db, accounts, account_id, "following", offset, count)
+
+@router.get("/followers/changes")
+async def follower_changes(
+    direction: str = Query("followers", pattern="^(followers|following)$"),
+    account_id: Optional[int] = None,
+    count: int = Query(100, ge=1, le=1000),
+    db: AsyncSession = Depends(get_read_db),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    """Ids gained and lost between the last two syncs (first `count` of each)."""
+    account = _graph_account(accounts, account_id)
+    gained = await read_page(db, account.id, direction, 0, count, column="gained")
+    if gained is None:
+        raise HTTPException(status_code=404, detail="Not synced yet")
+    lost = await read_page(db, account.id, direction, 0, count, column="lost")
+    return {
+        "account_id": account.id,
+        "direction": direction,
+        "synced_at": gained["synced_at"],
+        "previous_synced_at": gained["previous_synced_at"],
+        "gained_count": gained["total"],
+        "lost_count": lost["total"],
+        "gained": gained["ids"],
+        "lost": lost["ids"],
+    }
+
+@router.post("/followers/sync", status_code=status.HTTP_202_ACCEPTED)
+async def request_follower_sync(accounts: List[AccountSnapshot] = Depends(linked_accounts)):
+    """Queue a follower/following sync of all linked accounts; a `followers.synced` event follows."""
+    if not accounts:
+        raise HTTPException(status_code=404, detail="No linked account found")
+    if not await task_backend.enqueue("sync_followers", kwargs={"account_ids": [a.id for a in accounts]}):
+        raise HTTPException(status_code=503, detail="Sync queue is full, try again later")
+    return {"msg": "Follower sync queued", "account_ids": [a.id for a in accounts]}
 
 # -----------------------------
 # User Timeline / Posts
 # -----------------------------
+def encode_cursor(created_at: datetime, post_id: int) -> str:
+    raw = f"{created_at.isoformat()}|{post_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, post_id = base64.urlsafe_b64decode(padded).decode().split("|")
+        return datetime.fromisoformat(created_at), int(post_id)
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def bind_datetime(db: AsyncSession, value: datetime):
+    """
+    Comparable form of a datetime for this database. SQLite compares DATETIME
+    as text and server_default rows carry no fractional seconds, so whole-second
+    values are bound in that same format.
+    """
+    if db.bind.dialect.name != "sqlite":
+        return value
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc).replace(tzinfo=None)
+    if value.microsecond == 0:
+        return literal(value.strftime("%Y-%m-%d %H:%M:%S"))
+    return value
+
+
 @router.get("/tweets")
-async def get_user_tweets(count: int = 5, db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
-    result = await db.execute(select(Post).filter(Post.user_id == current_user).order_by(Post.created_at.desc()))
-    posts = result.scalars().all()
+async def get_user_tweets(
+    response: Response,
+    count: int = Query(5, ge=1, le=100),
+    cursor: Optional[str] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    account_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: int = Depends(get_current_user)
+):
+    """
+    Newest posts first, paginated by keyset on (created_at, id) so the LIMIT is
+    served from ix_posts_user_created_id regardless of history size. When more
+    rows exist, the cursor for the next page is returned in `X-Next-Cursor`.
+    """
+    query = (
+        select(Post.id, Post.content, Post.created_at, Post.status, Post.scheduled_time)
+        .filter(Post.user_id == current_user)
+        .order_by(Post.created_at.desc(), Post.id.desc())
+        .limit(count + 1)
+    )
+    if status_filter:
+        query = query.filter(Post.status == status_filter)
+    if account_id is not None:
+        query = query.filter(Post.account_id == account_id)
+    if cursor:
+        created_at, post_id = decode_cursor(cursor)
+        created_at = bind_datetime(db, created_at)
+        query = query.filter(
+            or_(
+                Post.created_at < created_at,
+                and_(Post.created_at == created_at, Post.id < post_id),
+            )
+        )
+
+    rows = (await db.execute(query)).all()
+    if len(rows) > count:
+        rows = rows[:count]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].created_at, rows[-1].id)
+
     return [
-        {"id": p.id, "text": p.content, "created_at": p.created_at, "status": p.status}
-        for p in posts[:count]
+        {"id": p.id, "text": p.content, "created_at": p.created_at, "status": p.status, "scheduled_time": p.scheduled_time}
+        for p in rows
     ]
 
+# -----------------------------
+# Export post history
+# -----------------------------
+EXPORT_COLUMNS = ["id", "account_id", "platform", "username", "content", "status", "scheduled_time", "published_time", "created_at"]
+
+
+def _export_value(value):
+    if isinstance(value, Platform):
+        return value.value
+    if isinstance(value, datetime):
+        return value.isoformat()
+    return value
+
+
+async def iter_export(
+    user_id: int,
+    export_format: str,
+    compress: bool,
+    account_id: Optional[int],
+    status_filter: Optional[str],
+    since: Optional[datetime],
+    until: Optional[datetime],
+) -> AsyncIterator[bytes]:
+    """
+    Streams the export in chunks of EXPORT_BATCH_SIZE rows from a server-side
+    cursor. Runs in its own session because request dependencies are closed
+    before a streaming body starts; memory stays flat whatever the row count.
+    """
+    compressor = zlib.compressobj(wbits=31) if compress else None  # gzip container
+
+    def encode(text: str) -> bytes:
+        data = text.encode()
+        return compressor.compress(data) if compressor else data
+
+    if export_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(EXPORT_COLUMNS)
+        yield encode(buffer.getvalue())
+
+    async with async_read_session() as db:
+        query = (
+            select(
+                Post.id, Post.account_id, Account.platform, Account.username, Post.content,
+                Post.status, Post.scheduled_time, Post.published_time, Post.created_at,
+            )
+            .outerjoin(Account, Account.id == Post.account_id)
+            .filter(Post.user_id == user_id)
+            .order_by(Post.created_at, Post.id)
+            .execution_options(yield_per=settings.EXPORT_BATCH_SIZE)
+        )
+        if account_id is not None:
+            query = query.filter(Post.account_id == account_id)
+        if status_filter:
+            query = query.filter(Post.status == status_filter)
+        if since is not None:
+            query = query.filter(Post.created_at >= bind_datetime(db, since))
+        if until is not None:
+            query = query.filter(Post.created_at < bind_datetime(db, until))
+
+        result = await db.stream(query)
+        async for rows in result.partitions():
+            values = [[_export_value(value) for value in row] for row in rows]
+            if export_format == "csv":
+                buffer = io.StringIO()
+                csv.writer(buffer).writerows(values)
+                chunk = buffer.getvalue()
+            else:
+                chunk = "".join(json.dumps(dict(zip(EXPORT_COLUMNS, row))) + "\n" for row in values)
+            data = encode(chunk)
+            if data:
+                yield data
+
+    if compressor:
+        yield compressor.flush()
+
+
+@router.get("/posts/export")
+async def export_posts(
+    export_format: str = Query("ndjson", alias="format", pattern="^(csv|ndjson)$"),
+    account_id: Optional[int] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    gzip: bool = False,
+    current_user: int = Depends(get_current_user),
+):
+    """
+    Full post history as CSV or NDJSON, oldest first, streamed as it is read.
+    `since`/`until` bound created_at; `gzip=true` compresses on the fly.
+    """
+    filename = f"posts.{export_format}"
+    media_type = "text/csv" if export_format == "csv" else "application/x-ndjson"
+    if gzip:
+        filename += ".gz"
+        media_type = "application/gzip"
+    return StreamingResponse(
+        iter_export(current_user, export_format, gzip, account_id, status_filter, since, until),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
 # -----------------------------
 # Post Tweet (Offline / DB)
 # -----------------------------
+async def media_url_for(db: AsyncSession, user_id: int, media_id: Optional[int]) -> Optional[str]:
+    """URL stored on the post for an uploaded media id the user owns."""
+    if media_id is None:
+        return None
+    owned = (await db.execute(
+        select(UserMedia.id).filter(UserMedia.id == media_id, UserMedia.user_id == user_id)
+    )).scalar()
+    if owned is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    return f"/media/{media_id}"
+
 @router.post("/tweets")
-async def create_tweet(content: TweetCreate, db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
-    result = await db.execute(
-        select(Account).filter(Account.user_id == current_user)
-    )
-    account = result.scalars().first()
+async def create_tweet(
+    content: TweetCreate,
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(get_current_user),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    account = accounts[0] if accounts else None
     if not account:
         raise HTTPException(status_code=404, detail="No linked account found")
+    media_url = await media_url_for(db, current_user, content.media_id)
+    if settings.PUBLISH_PIPELINE_ENABLED:
+        # Hand the post to the publish pipeline instead of calling the platform here
+        new_post = Post(
+            content=content.content,
+            media_url=media_url,
+            status="queued",
+            user_id=current_user,
+            account_id=account.id
+        )
+        db.add(new_post)
+        await db.flush()
+        now = datetime.now(timezone.utc)
+        await enqueue_posts(db, [(new_post.id, account.id)], now)
+        await record_post_events(db, [PostEvent(current_user, account.id, "queued", now)])
+        await bump_user_versions(db, [current_user])
+        await db.commit()
+        await db.refresh(new_post)
+        await wake_publish_pipeline()
+        await manager.emit(current_user, "post.queued", posts=[{
+            "id": new_post.id,
+            "text": new_post.content,
+            "status": new_post.status,
+            "created_at": new_post.created_at,
+        }])
+        return {
+            "msg": f"Post queued for publishing on {account.platform.value.capitalize()}",
+            "post_id": new_post.id
+        }
+
     new_post = Post(
         content=content.content,
+        media_url=media_url,
         status="published",
         published_time=datetime.utcnow(),
         user_id=current_user,
         account_id=account.id
     )
     db.add(new_post)
+    await record_post_events(db, [PostEvent(current_user, account.id, "published", new_post.published_time)])
+    await bump_user_versions(db, [current_user])
     await db.commit()
     await db.refresh(new_post)
+    await manager.emit(current_user, "post.published", posts=[{
+        "id": new_post.id,
+        "text": new_post.content,
+        "status": new_post.status,
+        "created_at": new_post.created_at,
+        "published_time": new_post.published_time,
+    }])
 
     return {
         "msg": f"Post published successfully on {account.platform.value.capitalize()} (offline demo)",
@@ -168,12 +611,10 @@ async def create_tweet(content: TweetCreate, db: AsyncSession = Depends(get_db),
 async def schedule_post(
     request: ScheduleTweetRequest,
     db: AsyncSession = Depends(get_db),
-    current_user: int = Depends(get_current_user)
+    current_user: int = Depends(get_current_user),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
 ):
-    result = await db.execute(
-        select(Account).filter(Account.user_id == current_user)
-    )
-    account = result.scalars().first()
+    account = accounts[0] if accounts else None
     if not account:
         raise HTTPException(status_code=404, detail="No linked account found")
 
@@ -183,16 +624,31 @@ async def schedule_post(
 
     new_post = Post(
         content=request.content,
+        media_url=await media_url_for(db, current_user, request.media_id),
         scheduled_time=request.scheduled_time,
         status="scheduled",
         user_id=current_user,
         account_id=account.id
     )
     db.add(new_post)
+    await record_post_events(db, [PostEvent(current_user, account.id, "scheduled", now)])
+    await bump_user_versions(db, [current_user])
     await db.commit()
     await db.refresh(new_post)
+    await notify_scheduled(new_post.scheduled_time)
+    await manager.emit(current_user, "post.scheduled", posts=[{
+        "id": new_post.id,
+        "text": new_post.content,
+        "status": new_post.status,
+        "created_at": new_post.created_at,
+        "scheduled_time": new_post.scheduled_time,
+    }])
 
-    print(f"[INFO] {now.isoformat()} - Scheduled post id={new_post.id} for user_id={current_user} on {account.platform.value} at {request.scheduled_time.isoformat()}")
+    logger.info(
+        "Scheduled post id=%s for user_id=%s on %s at %s",
+        new_post.id, current_user, account.platform.value, request.scheduled_time.isoformat(),
+        extra={"event": "post.scheduled", "post_id": new_post.id, "user_id": current_user},
+    )
 
     return {
         "msg": f"Post scheduled successfully on {account.platform.value.capitalize()} (offline demo)",
@@ -201,6 +657,175 @@ async def schedule_post(
     }
 
 
+# -----------------------------
+# Bulk Tweets / Schedules
+# -----------------------------
+async def iter_bulk_items(request: Request) -> AsyncIterator[Any]:
+    """
+    Yields raw items from a JSON array, a {"items": [...]} object, or a streamed
+    NDJSON body (Content-Type: application/x-ndjson, one item per line).
+    """
+    if "ndjson" in request.headers.get("content-type", ""):
+        buffer = b""
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            for line in lines:
+                if line.strip():
+                    yield line
+        if buffer.strip():
+            yield buffer
+        return
+
+    try:
+        body = await request.json()
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    items = body.get("items") if isinstance(body, dict) else body
+    if not isinstance(items, list):
+        raise HTTPException(status_code=400, detail="Body must be a JSON array or NDJSON")
+    if len(items) > settings.BULK_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BULK_MAX_ITEMS} items per request")
+    for item in items:
+        yield item
+
+
+async def bulk_create_posts(
+    request: Request,
+    db: AsyncSession,
+    current_user: int,
+    item_model: Type[BaseModel],
+    build_row: Callable[[Any, AccountSnapshot], Dict[str, Any]],
+    on_insert: Optional[Callable[[List[Dict[str, Any]]], Awaitable[None]]] = None,
+):
+    """
+    Validates every item in one pass against the user's accounts (loaded once)
+    and inserts valid rows with one multi-row INSERT ... RETURNING per chunk,
+    committing once. Each chunk is added to the stats rollup and passed to
+    `on_insert` before the commit.
+    Returns per-item results in request order.
+    """
+    adapter = TypeAdapter(item_model)
+    now = datetime.now(timezone.utc)
+    accounts = {acc.id: acc for acc in await account_cache.get(current_user)}
+    if not accounts:
+        raise HTTPException(status_code=404, detail="No linked account found")
+    default_account = next(iter(accounts.values()))
+
+    results: List[Dict[str, Any]] = []
+    created: List[Dict[str, Any]] = []
+    pending: List[tuple] = []
+
+    async def flush():
+        rows = [row for _, row in pending]
+        inserted = await db.execute(
+            insert(Post).returning(Post.id, sort_by_parameter_order=True),
+            rows,
+        )
+        chunk = []
+        for (index, row), post_id in zip(pending, inserted.scalars().all()):
+            results[index].update(status="ok", post_id=post_id)
+            chunk.append({"id": post_id, **row})
+        await record_post_events(db, [PostEvent(current_user, row["account_id"], row["status"], now) for row in chunk])
+        if on_insert is not None:
+            await on_insert(chunk)
+        created.extend(chunk)
+        pending.clear()
+
+    index = 0
+    async for raw in iter_bulk_items(request):
+        if index >= settings.BULK_MAX_ITEMS:
+            results.append({"index": index, "status": "error", "error": f"At most {settings.BULK_MAX_ITEMS} items per request"})
+            break
+        results.append({"index": index})
+        try:
+            item = adapter.validate_json(raw) if isinstance(raw, bytes) else adapter.validate_python(raw)
+            account = accounts.get(item.account_id) if item.account_id is not None else default_account
+            if account is None:
+                raise ValueError(f"Account {item.account_id} is not linked to this user")
+            pending.append((index, build_row(item, account)))
+        except (ValidationError, ValueError) as e:
+            error = e.errors(include_url=False) if isinstance(e, ValidationError) else str(e)
+            results[index].update(status="error", error=error)
+        index += 1
+        if len(pending) >= settings.BULK_INSERT_CHUNK_SIZE:
+            await flush()
+
+    if pending:
+        await flush()
+    if created:
+        await bump_user_versions(db, [current_user])
+    await db.commit()
+
+    failed = sum(1 for r in results if r["status"] == "error")
+    return created, {"created": len(created), "failed": failed, "results": results}
+
+
+@router.post("/tweets/bulk")
+async def create_tweets_bulk(request: Request, db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
+    now = datetime.now(timezone.utc)
+    pipeline = settings.PUBLISH_PIPELINE_ENABLED
+
+    def build_row(item: BulkTweetItem, account: AccountSnapshot):
+        row = {
+            "content": item.content,
+            "status": "queued" if pipeline else "published",
+            "user_id": current_user,
+            "account_id": account.id,
+        }
+        if not pipeline:
+            row["published_time"] = now
+        return row
+
+    async def enqueue(chunk: List[Dict[str, Any]]):
+        await enqueue_posts(db, [(p["id"], p["account_id"]) for p in chunk], now)
+
+    created, response = await bulk_create_posts(
+        request, db, current_user, BulkTweetItem, build_row, on_insert=enqueue if pipeline else None
+    )
+    if created and pipeline:
+        await wake_publish_pipeline()
+        await manager.emit(current_user, "post.queued", posts=[
+            {"id": p["id"], "status": p["status"]} for p in created
+        ])
+    elif created:
+        await manager.emit(current_user, "post.published", posts=[
+            {"id": p["id"], "status": p["status"], "published_time": p["published_time"]} for p in created
+        ])
+    return response
+
+
+@router.post("/schedule/bulk")
+async def schedule_posts_bulk(request: Request, db: AsyncSession = Depends(get_db), current_user: int = Depends(get_current_user)):
+    now = datetime.now(timezone.utc)
+
+    def build_row(item: BulkScheduleItem, account: AccountSnapshot):
+        scheduled_time = item.scheduled_time
+        if scheduled_time.tzinfo is None:
+            scheduled_time = scheduled_time.replace(tzinfo=timezone.utc)
+        if scheduled_time <= now:
+            raise ValueError("scheduled_time must be in the future")
+        return {
+            "content": item.content,
+            "scheduled_time": scheduled_time,
+            "status": "scheduled",
+            "user_id": current_user,
+            "account_id": account.id,
+        }
+
+    created, response = await bulk_create_posts(request, db, current_user, BulkScheduleItem, build_row)
+    if created:
+        await notify_scheduled(min(p["scheduled_time"] for p in created))
+        await manager.emit(current_user, "post.scheduled", posts=[
+            {"id": p["id"], "status": p["status"], "scheduled_time": p["scheduled_time"]} for p in created
+        ])
+    logger.info(
+        "Bulk scheduled %d posts for user_id=%s (%d failed)", response["created"], current_user, response["failed"],
+        extra={"user_id": current_user},
+    )
+    return response
+
+
 @router.post("/add-platform", response_model=dict)
 async def add_platform_account(
     data: AccountCreate,
@@ -208,13 +833,14 @@ async def add_platform_account(
     current_user: int = Depends(get_current_user), 
 ):
 
+    # Served from ix_accounts_user_platform_username alone
     result = await db.execute(
-        select(Account)
+        select(Account.id)
         .filter(Account.user_id == current_user)
         .filter(Account.platform == data.platform)
         .filter(Account.username == data.username)
     )
-    existing_account = result.scalars().first()
+    existing_account = result.scalar()
     if existing_account:
         raise HTTPException(
             status_code=400,
@@ -227,6 +853,9 @@ async def add_platform_account(
         user_id=current_user
     )
     db.add(new_account)
+    await bump_user_versions(db, [current_user])
     await db.commit()
     await db.refresh(new_account)
+    await invalidate_accounts(current_user)
+    await manager.emit(current_user, "account.linked", account={"id": new_account.id, "username": new_account.username, "platform": data.platform.value})
     return {"msg": "Account linked successfully", "account_id": new_account.id}
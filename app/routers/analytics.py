@@ -0,0 +1,59 @@
+from datetime import date, datetime, timedelta, timezone
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import get_read_db
+from app.routers.dependencies import get_current_user
+from app.utils.analytics import daily_series, status_totals
+
+router = APIRouter()
+
+
+def _date_range(since: Optional[date], until: Optional[date], default_days: int = 30):
+    until = until or datetime.now(timezone.utc).date()
+    since = since or until - timedelta(days=default_days - 1)
+    if since > until:
+        raise HTTPException(status_code=400, detail="since must not be after until")
+    if (until - since).days >= 366:
+        raise HTTPException(status_code=400, detail="Date range is limited to 366 days")
+    return since, until
+
+
+# -----------------------------
+# Daily time series
+# -----------------------------
+@router.get("/daily")
+async def posts_per_day(
+    since: Optional[date] = None,
+    until: Optional[date] = None,
+    account_id: Optional[int] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: int = Depends(get_current_user),
+):
+    """
+    Posts that entered each status per UTC day (default: the last 30 days),
+    with publish lateness for scheduled posts. Served from post_stats_daily,
+    so the cost grows with the number of days, not posts.
+    """
+    since, until = _date_range(since, until)
+    return await daily_series(db, current_user, since, until, account_id, status_filter)
+
+
+# -----------------------------
+# Period summary
+# -----------------------------
+@router.get("/summary")
+async def posts_summary(
+    days: int = Query(30, ge=1, le=366),
+    account_id: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: int = Depends(get_current_user),
+):
+    """Totals per status over the last `days` days, e.g. scheduled vs published."""
+    since, until = _date_range(None, None, days)
+    return {
+        "since": since,
+        "until": until,
+        "statuses": await status_totals(db, current_user, since, until, account_id),
+    }
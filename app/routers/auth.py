@@ -4,8 +4,10 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from app.database import get_db
 from app.models.user import User
+from app.routers.dependencies import oauth2_scheme
+from app.routers.schedule import revoke_token
 from fastapi.templating import Jinja2Templates
-from app.utils.security import hash_password, validate_email, verify_password, create_access_token
+from app.utils.security import hash_password_async, validate_email, verify_and_update_password, create_access_token
 from fastapi.responses import RedirectResponse, JSONResponse
 from starlette.status import HTTP_302_FOUND
 
@@ -43,7 +45,7 @@ async def register_action(
     new_user = User(
         username=username,
         email=email,
-        hashed_password=hash_password(password)
+        hashed_password=await hash_password_async(password)
     )
     db.add(new_user)
     await db.commit()
@@ -69,12 +71,21 @@ async def login_action(
 
     if not email or not validate_email(email):
         return JSONResponse({"detail": "Invalid email"}, status_code=400)
+    if not password:
+        return JSONResponse({"detail": "Invalid credentials"}, status_code=401)
 
     result = await db.execute(select(User).filter(User.email == email))
     user = result.scalars().first()
+    if not user:
+        return JSONResponse({"detail": "Invalid credentials"}, status_code=401)
 
-    if not user or not verify_password(password, user.hashed_password):
+    verified, new_hash = await verify_and_update_password(password, user.hashed_password)
+    if not verified:
         return JSONResponse({"detail": "Invalid credentials"}, status_code=401)
+    if new_hash:
+        # BCRYPT_ROUNDS changed since this hash was made
+        user.hashed_password = new_hash
+        await db.commit()
 
     token = create_access_token(data={"sub": str(user.id), "name": user.username})
 
@@ -93,6 +104,17 @@ async def login_action(
 
 
 @router.get("/logout")
-def logout_user(request: Request):
+async def logout_user(request: Request):
+    authorization = request.headers.get("Authorization", "")
+    if authorization.lower().startswith("bearer "):
+        await revoke_token(authorization[7:])
     request.session.clear()
     return RedirectResponse("/auth/login", status_code=HTTP_302_FOUND)
+
+
+@router.post("/api/logout")
+async def logout_action(request: Request, token: str = Depends(oauth2_scheme)):
+    """Revoke the bearer token so cached verifications stop accepting it."""
+    await revoke_token(token)
+    request.session.clear()
+    return JSONResponse({"msg": "Logged out successfully"})
@@ -0,0 +1,213 @@
+from datetime import datetime, timedelta, timezone
+from typing import List, Optional, Tuple
+from fastapi import APIRouter, Depends, HTTPException, Query, Response
+from sqlalchemy import and_, func, or_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.config import settings
+from app.database import get_read_db
+from app.models.post import Post
+from app.routers.accounts import decode_cursor, encode_cursor, linked_accounts
+from app.utils.account_cache import AccountSnapshot
+
+router = APIRouter()
+
+# Slot label formats per bucket: (SQLite strftime, Postgres to_char), both UTC
+BUCKETS = {
+    "day": ("%Y-%m-%d", "YYYY-MM-DD"),
+    "hour": ("%Y-%m-%dT%H:00", 'YYYY-MM-DD"T"HH24:00'),
+}
+# Posts still waiting to go out; only these can crowd a slot
+PENDING_STATUSES = ("scheduled", "queued")
+
+
+def _utc(value: datetime) -> datetime:
+    """
+    Aware UTC, bound as is: scheduled times are written by the ORM, so on
+    SQLite they share its text format (fractional seconds included).
+    """
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def _window(start: Optional[datetime], end: Optional[datetime]) -> Tuple[datetime, datetime]:
+    """
+    [start, end) in UTC; naive values are UTC. `end` defaults to 7 days after
+    `start`. Without a start the window is today and the next 7 days in whole
+    UTC days, so it only moves with the date, as these responses' ETags do.
+    """
+    if start is None:
+        start = datetime.now(timezone.utc).replace(hour=0, minute=0, second=0, microsecond=0)
+        default_length = timedelta(days=8)
+    else:
+        start = _utc(start)
+        default_length = timedelta(days=7)
+    end = _utc(end) if end else start + default_length
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    if end - start > timedelta(days=settings.CALENDAR_MAX_DAYS):
+        raise HTTPException(status_code=400, detail=f"Window is limited to {settings.CALENDAR_MAX_DAYS} days")
+    return start, end
+
+
+def _account_ids(accounts: List[AccountSnapshot], account_id: Optional[int]) -> List[int]:
+    if account_id is None:
+        return [a.id for a in accounts]
+    if not any(a.id == account_id for a in accounts):
+        raise HTTPException(status_code=404, detail="No linked account found")
+    return [account_id]
+
+
+def _in_window(account_ids: List[int], start: datetime, end: datetime):
+    """Range condition served from ix_posts_account_scheduled_time."""
+    return and_(
+        Post.account_id.in_(account_ids),
+        Post.scheduled_time >= start,
+        Post.scheduled_time < end,
+    )
+
+
+def _slot(db: AsyncSession, bucket: str):
+    sqlite_format, postgres_format = BUCKETS[bucket]
+    if db.bind.dialect.name == "postgresql":
+        return func.to_char(func.timezone("UTC", Post.scheduled_time), postgres_format)
+    return func.strftime(sqlite_format, Post.scheduled_time)
+
+
+# -----------------------------
+# Posts in a window
+# -----------------------------
+@router.get("/posts")
+async def calendar_posts(
+    response: Response,
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    account_id: Optional[int] = None,
+    status_filter: Optional[str] = Query(None, alias="status"),
+    count: int = Query(100, ge=1, le=1000),
+    cursor: Optional[str] = None,
+    db: AsyncSession = Depends(get_read_db),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    """
+    Posts scheduled in [start, end) (default: today and the next 7 days), earliest
+    first, for one account or all of the user's. Paginated by keyset on
+    (scheduled_time, id); the next cursor is returned in `X-Next-Cursor`.
+    """
+    start, end = _window(start, end)
+    account_ids = _account_ids(accounts, account_id)
+    if not account_ids:
+        return []
+    query = (
+        select(Post.id, Post.account_id, Post.content, Post.status, Post.scheduled_time, Post.published_time)
+        .filter(_in_window(account_ids, start, end))
+        .order_by(Post.scheduled_time, Post.id)
+        .limit(count + 1)
+    )
+    if status_filter:
+        query = query.filter(Post.status == status_filter)
+    if cursor:
+        scheduled_time, post_id = decode_cursor(cursor)
+        scheduled_time = _utc(scheduled_time)
+        query = query.filter(
+            or_(
+                Post.scheduled_time > scheduled_time,
+                and_(Post.scheduled_time == scheduled_time, Post.id > post_id),
+            )
+        )
+
+    rows = (await db.execute(query)).all()
+    if len(rows) > count:
+        rows = rows[:count]
+        response.headers["X-Next-Cursor"] = encode_cursor(rows[-1].scheduled_time, rows[-1].id)
+    return [
+        {
+            "id": p.id,
+            "account_id": p.account_id,
+            "text": p.content,
+            "status": p.status,
+            "scheduled_time": p.scheduled_time,
+            "published_time": p.published_time,
+        }
+        for p in rows
+    ]
+
+
+# -----------------------------
+# Slot counts
+# -----------------------------
+@router.get("/slots")
+async def calendar_slots(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    account_id: Optional[int] = None,
+    bucket: str = Query("day", pattern="^(day|hour)$"),
+    status_filter: Optional[str] = Query(None, alias="status"),
+    db: AsyncSession = Depends(get_read_db),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    """
+    Posts per account per UTC day or hour in [start, end), counted from the
+    index alone. Empty slots are left out.
+    """
+    start, end = _window(start, end)
+    account_ids = _account_ids(accounts, account_id)
+    if not account_ids:
+        return []
+    slot = _slot(db, bucket).label("slot")
+    query = (
+        select(slot, Post.account_id, func.count().label("posts"))
+        .filter(_in_window(account_ids, start, end))
+        .group_by(slot, Post.account_id)
+        .order_by(slot, Post.account_id)
+    )
+    if status_filter:
+        query = query.filter(Post.status == status_filter)
+    return [{"slot": row.slot, "account_id": row.account_id, "posts": row.posts} for row in await db.execute(query)]
+
+
+# -----------------------------
+# Conflicts
+# -----------------------------
+@router.get("/conflicts")
+async def calendar_conflicts(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    account_id: Optional[int] = None,
+    bucket: str = Query("hour", pattern="^(day|hour)$"),
+    db: AsyncSession = Depends(get_read_db),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    """
+    Slots where an account has more pending posts than its platform allows
+    (CALENDAR_SLOT_LIMITS), so they can be spread out before they go out.
+    """
+    start, end = _window(start, end)
+    account_ids = _account_ids(accounts, account_id)
+    limits = {a.id: settings.CALENDAR_SLOT_LIMITS.get(a.platform.value) for a in accounts if a.id in account_ids}
+    account_ids = [a for a in account_ids if limits[a] is not None]
+    if not account_ids:
+        return []
+    slot = _slot(db, bucket).label("slot")
+    # Only slots over the smallest limit come back; the exact limit is applied per account below
+    query = (
+        select(slot, Post.account_id, func.count().label("posts"))
+        .filter(_in_window(account_ids, start, end))
+        .filter(Post.status.in_(PENDING_STATUSES))
+        .group_by(slot, Post.account_id)
+        .having(func.count() > min(limits[a] for a in account_ids))
+        .order_by(slot, Post.account_id)
+    )
+    platforms = {a.id: a.platform.value for a in accounts}
+    return [
+        {
+            "slot": row.slot,
+            "account_id": row.account_id,
+            "platform": platforms[row.account_id],
+            "posts": row.posts,
+            "limit": limits[row.account_id],
+        }
+        for row in await db.execute(query)
+        if row.posts > limits[row.account_id]
+    ]
@@ -1,4 +1,4 @@
-from app.utils.security import decode_access_token
+from app.utils.security import verify_access_token
 from fastapi import Depends, HTTPException, status, Request
 from fastapi.security import OAuth2PasswordBearer
 from typing import Optional
@@ -33,10 +33,10 @@ oauth2_scheme = CustomOAuth2PasswordBearer(tokenUrl="token")
 def get_current_user(token: str = Depends(oauth2_scheme)):
     """
     FastAPI dependency to get the current user from a JWT token.
-    Raises custom 401 if token is invalid or expired.
+    Raises custom 401 if token is invalid, expired or revoked.
     """
     try:
-        payload = decode_access_token(token)
+        payload = verify_access_token(token)
         user_id: Optional[str] = payload.get("sub")
         if user_id is None:
             raise auth_error("Invalid authentication token: missing subject (sub).")
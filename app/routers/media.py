@@ -0,0 +1,210 @@
+import logging
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response, status
+from fastapi.responses import FileResponse
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.config import settings
+from app.database import async_session, dialect_insert, get_db, get_read_db
+from app.models.media import MediaAsset, UserMedia
+from app.routers.dependencies import get_current_user
+from app.routers.schedule import manager, task_backend
+from app.utils.media_store import (
+    ALLOWED_MEDIA_PREFIXES,
+    LocalMediaStore,
+    MediaProcessingError,
+    MediaTooLarge,
+    sniff_content_type,
+)
+from app.utils.tasks import task
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+media_store = LocalMediaStore(settings.MEDIA_ROOT, buffer_size=settings.MEDIA_WRITE_BUFFER_BYTES)
+
+# Bytes read before the media type is checked
+SNIFF_BYTES = 4096
+
+
+def media_json(media: UserMedia, asset: MediaAsset, deduplicated: Optional[bool] = None):
+    data = {
+        "media_id": media.id,
+        "filename": media.filename,
+        "sha256": asset.sha256,
+        "size": asset.size,
+        "content_type": asset.content_type,
+        "status": asset.status,
+        "url": f"/media/{media.id}",
+        "thumbnail_url": f"/media/{media.id}/thumbnail" if asset.thumbnail_key else None,
+        "created_at": media.created_at,
+    }
+    if deduplicated is not None:
+        data["deduplicated"] = deduplicated
+    return data
+
+
+# -----------------------------
+# Background processing
+# -----------------------------
+@task("process_media", queue="media")
+async def process_media(asset_id: int, user_id: Optional[int] = None):
+    """Thumbnail a new asset with ffmpeg and mark it ready (or failed)."""
+    async with async_session() as db:
+        asset = await db.get(MediaAsset, asset_id)
+        if asset is None or asset.status != "processing":
+            return
+        try:
+            asset.thumbnail_key = await media_store.make_thumbnail(
+                asset.storage_key,
+                ffmpeg=settings.FFMPEG_BINARY,
+                width=settings.MEDIA_THUMBNAIL_WIDTH,
+                timeout=settings.MEDIA_PROCESS_TIMEOUT_SECONDS,
+            )
+            asset.status = "ready"
+        except MediaProcessingError as e:
+            logger.error("Media asset id=%s could not be processed: %s", asset_id, e)
+            asset.status = "failed"
+            asset.last_error = str(e)
+        await db.commit()
+        result = {"asset_id": asset.id, "status": asset.status, "has_thumbnail": asset.thumbnail_key is not None}
+    if user_id is not None:
+        await manager.emit(user_id, "media.processed", media=result)
+
+
+# -----------------------------
+# Upload
+# -----------------------------
+@router.post("", status_code=status.HTTP_201_CREATED)
+async def upload_media(
+    request: Request,
+    filename: Optional[str] = Query(None, max_length=255),
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(get_current_user),
+):
+    """
+    Upload one image or video as the raw request body (send the file itself,
+    e.g. `fetch("/media?filename=a.mp4", {method: "POST", body: file})`;
+    chunked transfer encoding works). The body is streamed to disk and hashed
+    on the way, so memory use does not depend on file size. Identical content
+    is stored once for all users; thumbnails are made in the background.
+    """
+    declared_length = request.headers.get("content-length")
+    if declared_length and declared_length.isdigit() and int(declared_length) > settings.MEDIA_MAX_BYTES:
+        raise HTTPException(status_code=413, detail=f"Uploads are limited to {settings.MEDIA_MAX_BYTES} bytes")
+
+    chunks = request.stream().__aiter__()
+    head = b""
+    async for chunk in chunks:
+        head += chunk
+        if len(head) >= SNIFF_BYTES:
+            break
+    if not head:
+        raise HTTPException(status_code=400, detail="Empty upload")
+    content_type = sniff_content_type(head[:SNIFF_BYTES], request.headers.get("content-type"))
+    if not content_type or not content_type.startswith(ALLOWED_MEDIA_PREFIXES):
+        raise HTTPException(status_code=415, detail="Only image and video uploads are supported")
+
+    try:
+        blob = await media_store.save_stream(chunks, settings.MEDIA_MAX_BYTES, head=head)
+    except MediaTooLarge as e:
+        raise HTTPException(status_code=413, detail=str(e))
+
+    inserted = await db.execute(
+        dialect_insert(db, MediaAsset)
+        .values(sha256=blob.sha256, size=blob.size, content_type=content_type, storage_key=blob.storage_key, status="processing")
+        .on_conflict_do_nothing(index_elements=["sha256"])
+        .returning(MediaAsset.id)
+    )
+    new_asset = inserted.scalar() is not None
+    asset = (await db.execute(select(MediaAsset).filter(MediaAsset.sha256 == blob.sha256))).scalars().one()
+    await db.execute(
+        dialect_insert(db, UserMedia)
+        .values(user_id=current_user, asset_id=asset.id, filename=filename)
+        .on_conflict_do_nothing(index_elements=["user_id", "asset_id"])
+    )
+    await db.commit()
+    media = (await db.execute(
+        select(UserMedia).filter(UserMedia.user_id == current_user, UserMedia.asset_id == asset.id)
+    )).scalars().one()
+
+    if new_asset:
+        await task_backend.enqueue("process_media", args=(asset.id, current_user))
+        await db.refresh(asset)
+    logger.info(
+        "Media upload by user_id=%s: %d bytes, sha256=%s, %s",
+        current_user, blob.size, blob.sha256[:12], "new" if new_asset else "deduplicated",
+        extra={"event": "media.uploaded", "user_id": current_user},
+    )
+    return media_json(media, asset, deduplicated=not new_asset)
+
+
+# -----------------------------
+# Listing and download
+# -----------------------------
+@router.get("")
+async def list_media(
+    response: Response,
+    count: int = Query(20, ge=1, le=100),
+    before: Optional[int] = None,
+    db: AsyncSession = Depends(get_read_db),
+    current_user: int = Depends(get_current_user),
+):
+    """The user's media, newest first; pass `X-Next-Before` back as `before` for the next page."""
+    query = (
+        select(UserMedia, MediaAsset)
+        .join(MediaAsset, MediaAsset.id == UserMedia.asset_id)
+        .filter(UserMedia.user_id == current_user)
+        .order_by(UserMedia.id.desc())
+        .limit(count + 1)
+    )
+    if before is not None:
+        query = query.filter(UserMedia.id < before)
+    rows = (await db.execute(query)).all()
+    if len(rows) > count:
+        rows = rows[:count]
+        response.headers["X-Next-Before"] = str(rows[-1][0].id)
+    return [media_json(media, asset) for media, asset in rows]
+
+
+async def _owned_asset(db: AsyncSession, user_id: int, media_id: int):
+    row = (await db.execute(
+        select(UserMedia.filename, MediaAsset.sha256, MediaAsset.content_type, MediaAsset.storage_key, MediaAsset.thumbnail_key)
+        .join(MediaAsset, MediaAsset.id == UserMedia.asset_id)
+        .filter(UserMedia.id == media_id, UserMedia.user_id == user_id)
+    )).first()
+    if row is None:
+        raise HTTPException(status_code=404, detail="Media not found")
+    return row
+
+
+def send_media(key: str, content_type: str, etag: str, filename: Optional[str] = None) -> Response:
+    """
+    With MEDIA_ACCEL_REDIRECT nginx serves the file from its internal location
+    (sendfile, ranges, keep-alive) and the worker is free immediately;
+    otherwise the app streams it with range support. Content never changes
+    under a key, so clients may cache it indefinitely.
+    """
+    headers = {"Cache-Control": "private, max-age=31536000, immutable", "ETag": f'"{etag}"'}
+    if settings.MEDIA_ACCEL_REDIRECT:
+        headers["X-Accel-Redirect"] = settings.MEDIA_ACCEL_PREFIX + key
+        return Response(media_type=content_type, headers=headers)
+    path = media_store.path(key)
+    if not path.exists():
+        raise HTTPException(status_code=404, detail="Media file missing")
+    return FileResponse(path, media_type=content_type, headers=headers, filename=filename, content_disposition_type="inline")
+
+
+@router.get("/{media_id}")
+async def download_media(media_id: int, db: AsyncSession = Depends(get_read_db), current_user: int = Depends(get_current_user)):
+    row = await _owned_asset(db, current_user, media_id)
+    return send_media(row.storage_key, row.content_type, row.sha256, row.filename)
+
+
+@router.get("/{media_id}/thumbnail")
+async def download_thumbnail(media_id: int, db: AsyncSession = Depends(get_read_db), current_user: int = Depends(get_current_user)):
+    row = await _owned_asset(db, current_user, media_id)
+    if not row.thumbnail_key:
+        raise HTTPException(status_code=404, detail="No thumbnail (yet)")
+    return send_media(row.thumbnail_key, "image/jpeg", f"{row.sha256}-thumb")
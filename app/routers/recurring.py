@@ -0,0 +1,276 @@
+import logging
+from datetime import datetime, timedelta, timezone
+from typing import Any, Dict, List, Optional
+from fastapi import APIRouter, Depends, HTTPException, Query
+from sqlalchemy import delete, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.config import settings
+from app.database import get_db, get_read_db
+from app.models.post import Post
+from app.models.recurring_post import RecurringPost
+from app.payloads.create_twitter import RecurringPostRequest, SkipOccurrenceRequest
+from app.routers.accounts import linked_accounts, media_url_for
+from app.routers.dependencies import get_current_user
+from app.routers.schedule import manager, notify_scheduled
+from app.utils.account_cache import AccountSnapshot
+from app.utils.analytics import PostEvent, record_post_events
+from app.utils.recurrence import RecurrenceError, Rule, as_utc, exdate_key, materialize, rule_for
+from app.utils.user_version import bump_user_versions
+
+logger = logging.getLogger(__name__)
+
+router = APIRouter()
+
+
+def _rule(rule: str, starts_at: datetime, timezone_name: str) -> Rule:
+    try:
+        parsed = Rule(rule, starts_at, timezone_name)
+        parsed.check_interval(settings.RECURRENCE_MIN_INTERVAL_SECONDS)
+    except RecurrenceError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return parsed
+
+
+def _recurrence_json(recurring: RecurringPost, pending: List[Post]) -> Dict[str, Any]:
+    return {
+        "id": recurring.id,
+        "account_id": recurring.account_id,
+        "content": recurring.content,
+        "rule": recurring.rule,
+        "timezone": recurring.timezone,
+        "starts_at": recurring.starts_at,
+        "next_time": recurring.next_time,
+        "exdates": recurring.exdates,
+        "status": recurring.status,
+        "pending": [{"id": p.id, "scheduled_time": p.scheduled_time} for p in pending],
+    }
+
+
+async def _owned(db: AsyncSession, user_id: int, recurrence_id: int) -> RecurringPost:
+    """The user's recurring post, locked for the rest of the transaction."""
+    recurring = (await db.execute(
+        select(RecurringPost)
+        .filter(RecurringPost.id == recurrence_id, RecurringPost.user_id == user_id)
+        .with_for_update()
+    )).scalar()
+    if recurring is None:
+        raise HTTPException(status_code=404, detail="Recurring post not found")
+    return recurring
+
+
+async def _pending(db: AsyncSession, recurrence_ids: List[int]) -> List[Post]:
+    if not recurrence_ids:
+        return []
+    return (await db.execute(
+        select(Post)
+        .filter(Post.recurrence_id.in_(recurrence_ids), Post.status == "scheduled")
+        .order_by(Post.scheduled_time, Post.id)
+    )).scalars().all()
+
+
+async def _drop_pending(db: AsyncSession, recurring: RecurringPost, at: Optional[datetime] = None) -> List[Post]:
+    """
+    Delete materialized occurrences (only the one at `at` if given) that have
+    not been claimed yet, and take back the "scheduled" counts they added to
+    the rollup, so it matches what backfill_stats rebuilds from posts.
+    """
+    dropped = [p for p in await _pending(db, [recurring.id]) if at is None or as_utc(p.scheduled_time) == at]
+    if dropped:
+        deleted = set((await db.execute(
+            delete(Post)
+            .where(Post.id.in_([p.id for p in dropped]))
+            .where(Post.status == "scheduled")
+            .returning(Post.id)
+            .execution_options(synchronize_session=False)
+        )).scalars())
+        # One the dispatcher claimed meanwhile is kept, and stays counted
+        dropped = [p for p in dropped if p.id in deleted]
+        await record_post_events(db, [PostEvent(p.user_id, p.account_id, "scheduled", p.created_at, count=-1) for p in dropped])
+    return dropped
+
+
+async def _after_write(user_id: int, recurring: RecurringPost, pending: List[Post], created: List[Post], removed: List[Post] = ()):
+    """Wake the due timer for new occurrences and tell the user's clients, once committed."""
+    if created:
+        await notify_scheduled(min(p.scheduled_time for p in created))
+        await manager.emit(user_id, "post.scheduled", posts=[
+            {"id": p.id, "text": p.content, "status": p.status, "scheduled_time": p.scheduled_time, "recurrence_id": p.recurrence_id}
+            for p in created
+        ])
+    await manager.emit(
+        user_id,
+        "recurrence.updated",
+        recurrence=_recurrence_json(recurring, pending),
+        removed=[p.id for p in removed],
+    )
+
+
+# -----------------------------
+# Create / list
+# -----------------------------
+@router.post("")
+async def create_recurring_post(
+    request: RecurringPostRequest,
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(get_current_user),
+    accounts: List[AccountSnapshot] = Depends(linked_accounts),
+):
+    """
+    Repeat a post by an RRULE or cron rule. Only the next RECURRENCE_AHEAD
+    occurrences become scheduled posts now; each one claimed by the scheduler
+    materializes the next, so storage and scheduler work follow the
+    near-term horizon, not the length of the rule.
+    """
+    if request.account_id is None:
+        account = accounts[0] if accounts else None
+    else:
+        account = next((a for a in accounts if a.id == request.account_id), None)
+    if account is None:
+        raise HTTPException(status_code=404, detail="No linked account found")
+
+    now = datetime.now(timezone.utc)
+    starts_at = as_utc(request.starts_at) if request.starts_at else now
+    rule = _rule(request.rule, starts_at, request.timezone)
+    recurring = RecurringPost(
+        content=request.content,
+        media_url=await media_url_for(db, current_user, request.media_id),
+        rule=request.rule.strip(),
+        timezone=request.timezone,
+        starts_at=as_utc(rule.starts_at),
+        next_time=rule.first(),
+        exdates=sorted({exdate_key(at) for at in request.exdates}),
+        status="active",
+        user_id=current_user,
+        account_id=account.id,
+    )
+    db.add(recurring)
+    await db.flush()
+    created = await materialize(db, recurring, now, settings.RECURRENCE_AHEAD)
+    await bump_user_versions(db, [current_user])
+    await db.commit()
+    await _after_write(current_user, recurring, created, created)
+
+    logger.info(
+        "Recurring post id=%s created for user_id=%s: %s", recurring.id, current_user, recurring.rule,
+        extra={"event": "recurrence.created", "recurrence_id": recurring.id, "user_id": current_user},
+    )
+    return _recurrence_json(recurring, created)
+
+
+@router.get("")
+async def list_recurring_posts(
+    db: AsyncSession = Depends(get_read_db),
+    current_user: int = Depends(get_current_user),
+):
+    """The user's recurring posts with their materialized, not yet published occurrences."""
+    rows = (await db.execute(
+        select(RecurringPost).filter(RecurringPost.user_id == current_user).order_by(RecurringPost.id)
+    )).scalars().all()
+    pending: Dict[int, List[Post]] = {}
+    for post in await _pending(db, [r.id for r in rows]):
+        pending.setdefault(post.recurrence_id, []).append(post)
+    return [_recurrence_json(r, pending.get(r.id, [])) for r in rows]
+
+
+@router.get("/{recurrence_id}/preview")
+async def preview_recurring_post(
+    recurrence_id: int,
+    count: int = Query(10, ge=1, le=100),
+    db: AsyncSession = Depends(get_read_db),
+    current_user: int = Depends(get_current_user),
+):
+    """Upcoming occurrences computed from the rule (skips left out); nothing is stored."""
+    recurring = (await db.execute(
+        select(RecurringPost).filter(RecurringPost.id == recurrence_id, RecurringPost.user_id == current_user)
+    )).scalar()
+    if recurring is None:
+        raise HTTPException(status_code=404, detail="Recurring post not found")
+    return rule_for(recurring).upcoming(datetime.now(timezone.utc), count, recurring.exdates or ())
+
+
+# -----------------------------
+# Pause / resume / skip / delete
+# -----------------------------
+@router.post("/{recurrence_id}/pause")
+async def pause_recurring_post(
+    recurrence_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(get_current_user),
+):
+    """Stop the rule and withdraw its unpublished occurrences; resume picks up from the next one due."""
+    recurring = await _owned(db, current_user, recurrence_id)
+    if recurring.status != "active":
+        raise HTTPException(status_code=409, detail=f"Recurring post is {recurring.status}")
+    removed = await _drop_pending(db, recurring)
+    times = [as_utc(p.scheduled_time) for p in removed]
+    if recurring.next_time is not None:
+        times.append(as_utc(recurring.next_time))
+    recurring.next_time = min(times) if times else None
+    recurring.status = "paused"
+    await bump_user_versions(db, [current_user])
+    await db.commit()
+    await _after_write(current_user, recurring, [], [], removed)
+    return _recurrence_json(recurring, [])
+
+
+@router.post("/{recurrence_id}/resume")
+async def resume_recurring_post(
+    recurrence_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(get_current_user),
+):
+    """Occurrences missed while paused are skipped, not published late."""
+    recurring = await _owned(db, current_user, recurrence_id)
+    if recurring.status != "paused":
+        raise HTTPException(status_code=409, detail=f"Recurring post is {recurring.status}")
+    recurring.status = "active" if recurring.next_time is not None else "finished"
+    created = await materialize(db, recurring, datetime.now(timezone.utc), settings.RECURRENCE_AHEAD)
+    await bump_user_versions(db, [current_user])
+    await db.commit()
+    await _after_write(current_user, recurring, created, created)
+    return _recurrence_json(recurring, created)
+
+
+@router.post("/{recurrence_id}/skip")
+async def skip_occurrence(
+    request: SkipOccurrenceRequest,
+    recurrence_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(get_current_user),
+):
+    """Leave out one occurrence; if it was already materialized it is withdrawn and the next one added."""
+    recurring = await _owned(db, current_user, recurrence_id)
+    at = as_utc(request.at)
+    if rule_for(recurring).after(at - timedelta(seconds=1)) != at:
+        raise HTTPException(status_code=400, detail="Not an occurrence of this rule")
+    recurring.exdates = sorted(set(recurring.exdates or ()) | {exdate_key(at)})
+    removed = await _drop_pending(db, recurring, at)
+    created = await materialize(db, recurring, datetime.now(timezone.utc), settings.RECURRENCE_AHEAD)
+    pending = await _pending(db, [recurring.id])
+    await bump_user_versions(db, [current_user])
+    await db.commit()
+    await _after_write(current_user, recurring, pending, created, removed)
+    return _recurrence_json(recurring, pending)
+
+
+@router.delete("/{recurrence_id}")
+async def delete_recurring_post(
+    recurrence_id: int,
+    db: AsyncSession = Depends(get_db),
+    current_user: int = Depends(get_current_user),
+):
+    """Delete the rule and its unpublished occurrences; published posts are kept."""
+    recurring = await _owned(db, current_user, recurrence_id)
+    removed = await _drop_pending(db, recurring)
+    await db.execute(
+        update(Post)
+        .where(Post.recurrence_id == recurring.id)
+        .values(recurrence_id=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.delete(recurring)
+    await bump_user_versions(db, [current_user])
+    await db.commit()
+    await manager.emit(current_user, "recurrence.deleted", recurrence_id=recurrence_id, removed=[p.id for p in removed])
+    return {"msg": "Recurring post deleted", "removed": len(removed)}
@@ -1,15 +1,43 @@
+import asyncio
+import json
+import logging
 import os
+import time
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, HTTPException, Depends
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from datetime import datetime, timezone
+from datetime import datetime, timedelta, timezone
 from sqlalchemy.future import select
 from sqlalchemy.ext.asyncio import AsyncSession
-from app.database import async_session
+from app.database import async_session, engine
 from app.models.post import Post
-from typing import Set
+from typing import Dict, Iterable, List, Optional, Set
 from jose import JWTError, jwt
 from app.config import settings
-from app.utils.security import decode_access_token, auth_error
+from app.utils.security import auth_error, revoke_access_token, token_cache, verify_access_token
+from app.utils.dispatcher import ClaimedPost, dispatch_due_posts
+from app.utils.leader import LeaderElector, build_lock_backend
+from app.utils.log import job_context
+from app.utils.due_timer import DueTimer, to_epoch
+from app.utils.backplane import Backplane, build_backplane
+from app.utils.event_log import EventLog, build_event_log, json_default
+from app.utils.metrics import (
+    POSTS_PUBLISHED,
+    PUBLISH_LATENESS,
+    SCHEDULER_TICK_POSTS,
+    SCHEDULER_TICK_SECONDS,
+    TIMER_PENDING,
+    WS_SEND_SECONDS,
+    register_stats,
+)
+from app.utils.analytics import PostEvent, lateness_seconds, record_post_events
+from app.utils.followers import DIRECTIONS, FollowerSyncError, build_follower_source, stale_accounts, sync_graph
+from app.utils.publisher import PublishJob, PublishPipeline, build_platform_clients, enqueue_posts
+from app.utils.rate_limit import build_rate_limit_backend
+from app.utils.recurrence import top_up
+from app.utils.tasks import build_task_backend, task
+from app.utils.user_version import bump_user_versions
+
+logger = logging.getLogger(__name__)
 
 router = APIRouter()
 scheduler = AsyncIOScheduler()
@@ -17,102 +45,527 @@ scheduler = AsyncIOScheduler()
 SECRET_KEY = settings.SECRET_KEY
 ALGORITHM = settings.ALGORITHM
 
+class _Client:
+    """One accepted socket plus its bounded outbound queue and sender task."""
+    def __init__(self, websocket: WebSocket, user_id: int, queue_size: int):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sender: Optional[asyncio.Task] = None
+
+
 class ConnectionManager:
-    """Manages active WebSocket connections with JWT authentication."""
-    def __init__(self):
-        self.active_connections: Set[WebSocket] = set()
+    """
+    Manages active WebSocket connections with JWT authentication.
+    Connections are indexed by user id and every socket drains its own bounded
+    queue, so one slow client never delays the others. Messages travel over the
+    backplane so a publish in one process reaches sockets held by another.
+    Events are JSON objects with a per-user `seq`; reconnecting clients pass
+    their last seq and get the missed events replayed from the event log.
+    """
+    TOPIC = "ws.user_messages"
+
+    def __init__(self, backplane: Backplane, event_log: EventLog, queue_size: int = 64, send_timeout: float = 5.0):
+        self.backplane = backplane
+        self.event_log = event_log
+        self.queue_size = queue_size
+        self.send_timeout = send_timeout
+        self.connections: Dict[int, Dict[WebSocket, _Client]] = {}
+        self.sent = 0
+        self.evicted = 0
+        self._closing: Set[asyncio.Task] = set()
 
-    async def connect(self, websocket: WebSocket, token: str):
-        """Verify token first, then accept connection."""
+    @property
+    def active_connections(self) -> int:
+        return sum(len(clients) for clients in self.connections.values())
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "connections": self.active_connections,
+            "users": len(self.connections),
+            "sent": self.sent,
+            "evicted": self.evicted,
+        }
+
+    async def start(self):
+        await self.backplane.subscribe(self.TOPIC, self._deliver)
+
+    async def connect(self, websocket: WebSocket, token: str, last_seq: Optional[int] = None):
+        """Verify token first, then accept connection and replay missed events."""
         try:
-            payload = decode_access_token(token)
+            payload = verify_access_token(token)
             user_id = payload.get("sub")
             if user_id is None:
                 raise auth_error("Invalid token: missing subject (sub).")
             websocket.state.user_id = int(user_id)
         except Exception as e:
-            print(f"[ERROR] JWT validation failed: {e}")
+            logger.info("WebSocket rejected: JWT validation failed: %s", e)
             await websocket.close(code=4000, reason="Invalid token")
             return False
 
         await websocket.accept()
-        self.active_connections.add(websocket)
+        client = _Client(websocket, websocket.state.user_id, self.queue_size)
+        # Register before replaying so nothing published meanwhile is lost; the
+        # sender starts afterwards, and clients drop duplicates by seq.
+        self.connections.setdefault(client.user_id, {})[websocket] = client
+        try:
+            await self._replay(client, last_seq)
+        except Exception:
+            logger.exception("Failed to replay events")
+            self.disconnect(websocket)
+            return False
+        client.sender = asyncio.create_task(self._sender(client))
         return True
 
+    async def _replay(self, client: _Client, last_seq: Optional[int]):
+        current = await self.event_log.current_seq(client.user_id)
+        missed = None if last_seq is None else await self.event_log.since(client.user_id, last_seq)
+        if missed is None:
+            # Fresh connection, or the gap is older than the buffer: the client
+            # starts from `seq` and refetches only if it asked for a replay.
+            kind = "sync" if last_seq is None else "resync"
+            await client.websocket.send_text(json.dumps({"type": kind, "seq": current}))
+            return
+        for event in missed:
+            await client.websocket.send_text(json.dumps(event, default=json_default))
+
+    async def emit(self, user_id: int, event_type: str, **data):
+        """
+        Append an event to the user's log and push it to their sockets. Called
+        once the write has committed, so a backplane outage is logged instead of
+        failing a request that already succeeded; clients resync on reconnect.
+        """
+        try:
+            event = await self.event_log.append(user_id, {"type": event_type, **data})
+            await self.send_to_users([user_id], json.dumps(event, default=json_default))
+        except Exception as e:
+            logger.error(
+                "Failed to emit %s for user_id=%s: %s", event_type, user_id, e,
+                extra={"event": event_type, "user_id": user_id},
+            )
+
     def disconnect(self, websocket: WebSocket):
-        self.active_connections.discard(websocket)
+        user_id = getattr(websocket.state, "user_id", None)
+        clients = self.connections.get(user_id)
+        if not clients:
+            return
+        client = clients.pop(websocket, None)
+        if not clients:
+            self.connections.pop(user_id, None)
+        if client and client.sender and client.sender is not asyncio.current_task():
+            client.sender.cancel()
+
+    async def send_to_users(self, user_ids: Iterable[int], message: str):
+        """Route a message to every socket owned by `user_ids`, in any process."""
+        await self.backplane.publish(self.TOPIC, {"user_ids": sorted(set(user_ids)), "message": message})
 
     async def broadcast(self, message: str):
-        for ws in list(self.active_connections):
+        await self.backplane.publish(self.TOPIC, {"user_ids": None, "message": message})
+
+    async def _deliver(self, payload: dict):
+        user_ids = payload["user_ids"]
+        if user_ids is None:
+            user_ids = list(self.connections)
+        for user_id in user_ids:
+            for client in list(self.connections.get(user_id, {}).values()):
+                try:
+                    client.queue.put_nowait(payload["message"])
+                except asyncio.QueueFull:
+                    logger.warning("Evicting slow WebSocket consumer for user_id=%s", user_id, extra={"user_id": user_id})
+                    self._evict(client, code=1013, reason="Slow consumer")
+
+    async def _sender(self, client: _Client):
+        while True:
+            message = await client.queue.get()
+            started = time.perf_counter()
             try:
-                await ws.send_text(message)
+                await asyncio.wait_for(client.websocket.send_text(message), self.send_timeout)
+                WS_SEND_SECONDS.observe(time.perf_counter() - started)
+                self.sent += 1
+            except asyncio.CancelledError:
+                raise
             except WebSocketDisconnect:
-                self.disconnect(ws)
+                self.disconnect(client.websocket)
+                return
+            except asyncio.TimeoutError:
+                logger.warning("Evicting WebSocket consumer for user_id=%s: send timed out", client.user_id, extra={"user_id": client.user_id})
+                self._evict(client, code=1013, reason="Slow consumer")
+                return
             except Exception as e:
-                print(f"[ERROR] Failed to send message: {e}")
-                self.disconnect(ws)
+                logger.warning("Failed to send WebSocket message: %s", e)
+                self._evict(client, code=1011, reason="Send failed")
+                return
+
+    def _evict(self, client: _Client, code: int, reason: str):
+        """Unregister the client now; its close handshake runs on its own task, bounded by send_timeout."""
+        self.evicted += 1
+        self.disconnect(client.websocket)
+        task = asyncio.create_task(self._close(client.websocket, code, reason))
+        self._closing.add(task)
+        task.add_done_callback(self._closing.discard)
+
+    async def _close(self, websocket: WebSocket, code: int, reason: str):
+        try:
+            await asyncio.wait_for(websocket.close(code=code, reason=reason), self.send_timeout)
+        except Exception:
+            pass
+
+backplane = build_backplane(settings.WS_BACKPLANE, settings.REDIS_URL)
+manager = ConnectionManager(
+    backplane,
+    build_event_log(settings.WS_BACKPLANE, settings.REDIS_URL, settings.WS_EVENT_BUFFER_SIZE),
+    queue_size=settings.WS_SEND_QUEUE_SIZE,
+    send_timeout=settings.WS_SEND_TIMEOUT_SECONDS,
+)
+register_stats("websocket", "WebSocket connections in this process", manager.stats, counters=("sent", "evicted"))
 
-manager = ConnectionManager()
+def record_published(scheduled_times: Iterable[Optional[datetime]]):
+    """Count published scheduled posts and how late each went out."""
+    published_at = time.time()
+    for scheduled_time in scheduled_times:
+        if scheduled_time is not None:
+            POSTS_PUBLISHED.inc()
+            PUBLISH_LATENESS.observe(max(0.0, published_at - to_epoch(scheduled_time)))
 
+async def emit_posts(event_type: str, posts: Iterable[tuple]):
+    """Send one event per owner for (user_id, post dict) pairs."""
+    by_user: Dict[int, list] = {}
+    for user_id, post in posts:
+        by_user.setdefault(user_id, []).append(post)
+    for user_id, user_posts in by_user.items():
+        await manager.emit(user_id, event_type, posts=user_posts)
+
+async def _on_claimed(db: AsyncSession, claimed: List[ClaimedPost]):
+    """
+    Runs in each dispatcher batch's transaction: rollup counters, then the
+    outbox. Recurring posts whose occurrences were claimed get their next ones
+    materialized in the same transaction. The owners' versions move last.
+    """
+    now = datetime.now(timezone.utc)
+    created = await top_up(db, (p.recurrence_id for p in claimed if p.recurrence_id is not None), now, settings.RECURRENCE_AHEAD)
+    if created:
+        # Occurrences are in the future, so the wakeup cannot beat the commit
+        await notify_scheduled(min(p.scheduled_time for p in created))
+    if settings.PUBLISH_PIPELINE_ENABLED:
+        await record_post_events(db, [PostEvent(p.user_id, p.account_id, "queued", now) for p in claimed])
+        await enqueue_posts(db, [(p.id, p.account_id) for p in claimed], now)
+    else:
+        await record_post_events(db, [
+            PostEvent(p.user_id, p.account_id, "published", now, lateness_seconds(p.scheduled_time, now))
+            for p in claimed
+        ])
+    await bump_user_versions(db, (p.user_id for p in claimed))
+
+@task("publish_scheduled_posts")
 async def publish_scheduled_posts():
     """
-    Fetches posts with status 'scheduled' and scheduled_time <= now.
-    Marks them as published and notifies connected clients via WebSocket.
+    Claims posts with status 'scheduled' and scheduled_time <= now in bounded
+    batches, marks them as published and notifies connected clients via WebSocket.
+    With the publish pipeline enabled they are marked 'queued' and handed to
+    the outbox in the same transaction instead; its workers publish them.
+    """
+    with SCHEDULER_TICK_SECONDS.time():
+        await _publish_due_posts()
+
+async def _publish_due_posts():
+    now = datetime.now(timezone.utc)
+    pipeline = settings.PUBLISH_PIPELINE_ENABLED
+    # A failing batch is logged there; the batches committed before it are still notified
+    published = await dispatch_due_posts(
+        async_session,
+        now,
+        batch_size=settings.PUBLISH_BATCH_SIZE,
+        max_batches=settings.PUBLISH_MAX_BATCHES_PER_TICK,
+        new_status="queued" if pipeline else "published",
+        on_claimed=_on_claimed,
+    )
+    SCHEDULER_TICK_POSTS.observe(len(published))
+
+    if not published:
+        logger.debug("No scheduled posts to publish at this time")
+        return
+
+    if pipeline:
+        await wake_publish_pipeline()
+        logger.info("Queued %d due posts for publishing", len(published), extra={"posts": len(published)})
+        await emit_posts("post.queued", (
+            (post.user_id, {"id": post.id, "status": "queued", "scheduled_time": post.scheduled_time})
+            for post in published
+        ))
+        return
+
+    record_published(post.scheduled_time for post in published)
+    logger.info("Published %d due posts", len(published), extra={"posts": len(published)})
+    for post in published:
+        logger.info(
+            "Post id=%s auto-published for user_id=%s", post.id, post.user_id,
+            extra={"event": "post.published", "post_id": post.id, "user_id": post.user_id},
+        )
+
+    # Notify only the owners of the published posts
+    await emit_posts("post.published", (
+        (post.user_id, {
+            "id": post.id,
+            "status": "published",
+            "scheduled_time": post.scheduled_time,
+            "published_time": now,
+        })
+        for post in published
+    ))
+
+async def _on_pipeline_published(jobs: List[PublishJob], published_time: datetime):
+    record_published(job.scheduled_time for job in jobs)
+    await emit_posts("post.published", (
+        (job.user_id, {
+            "id": job.post_id,
+            "status": "published",
+            "scheduled_time": job.scheduled_time,
+            "published_time": published_time,
+        })
+        for job in jobs
+    ))
+
+async def _on_pipeline_failed(jobs: List[PublishJob]):
+    await emit_posts("post.failed", ((job.user_id, {"id": job.post_id, "status": "failed"}) for job in jobs))
+
+publish_pipeline = PublishPipeline(
+    async_session,
+    build_platform_clients(
+        settings.PUBLISH_PLATFORM_CLIENT,
+        latency=settings.FAKE_PLATFORM_LATENCY_MS / 1000,
+        failure_rate=settings.FAKE_PLATFORM_FAILURE_RATE,
+    ),
+    workers_per_platform=settings.PUBLISH_WORKERS_PER_PLATFORM,
+    queue_size=settings.PUBLISH_QUEUE_SIZE,
+    account_rate_per_minute=settings.RATE_LIMIT_PER_MINUTE,
+    platform_rate_per_minute=settings.PLATFORM_RATE_LIMIT_PER_MINUTE,
+    max_attempts=settings.PUBLISH_MAX_ATTEMPTS,
+    retry_base=settings.PUBLISH_RETRY_BASE_SECONDS,
+    retry_max=settings.PUBLISH_RETRY_MAX_SECONDS,
+    lease_seconds=settings.PUBLISH_LEASE_SECONDS,
+    call_timeout=settings.PUBLISH_CALL_TIMEOUT_SECONDS,
+    poll_interval=settings.PUBLISH_POLL_SECONDS,
+    on_published=_on_pipeline_published,
+    on_failed=_on_pipeline_failed,
+    rate_backend=build_rate_limit_backend(settings.PUBLISH_RATE_LIMIT_BACKEND, settings.REDIS_URL, prefix="publish:"),
+)
+register_stats("publish_pipeline", "Outbound publish pipeline", publish_pipeline.stats, label="platform")
+
+PIPELINE_WAKEUP_TOPIC = "publish.wakeup"
+
+async def wake_publish_pipeline():
+    """
+    Let the process hosting the publish pipeline (API or Celery worker) poll the
+    outbox now. Best effort: without it the outbox is still polled every
+    PUBLISH_POLL_SECONDS.
     """
-    published_post_ids = []
+    try:
+        await backplane.publish(PIPELINE_WAKEUP_TOPIC, {})
+    except Exception as e:
+        logger.error("Failed to wake the publish pipeline: %s", e)
+
+async def _on_pipeline_wakeup(payload: dict):
+    publish_pipeline.wake()
+
+async def start_publish_pipeline():
+    """Run the outbox workers in this process and listen for wakeups."""
+    publish_pipeline.start()
+    await backplane.subscribe(PIPELINE_WAKEUP_TOPIC, _on_pipeline_wakeup)
+
+task_backend = build_task_backend(
+    settings.TASK_BACKEND,
+    settings.REDIS_URL,
+    workers=settings.TASK_WORKERS,
+    queue_size=settings.TASK_QUEUE_SIZE,
+    eager=settings.TASK_ALWAYS_EAGER,
+)
+register_stats("task_queue", "Background task queues", task_backend.stats, label="queue")
+
+leader = LeaderElector(
+    build_lock_backend(
+        settings.SCHEDULER_LOCK_BACKEND, settings.DATABASE_URL, settings.REDIS_URL, engine, settings.SCHEDULER_LOCK_DIR
+    ),
+    name="publish_posts_job",
+    ttl=settings.SCHEDULER_LEASE_SECONDS,
+)
+
+async def enqueue_publish():
+    # At most one publish task waits in the queue; a running one does not block the next
+    await task_backend.enqueue("publish_scheduled_posts", unique_for=settings.SCHEDULER_LEASE_SECONDS)
+
+@job_context("publish_posts_job")
+async def publish_posts_job():
+    """Scheduled in every worker; only the current lease holder queues the publish task."""
+    await leader.run_if_leader(enqueue_publish)
+    TIMER_PENDING.set(due_timer.pending)
+
+async def load_next_due(limit: int):
+    """Nearest scheduled_time values, read from ix_posts_status_scheduled_time."""
     async with async_session() as db:
-        now = datetime.now(timezone.utc)
-        try:
-            result = await db.execute(
-                select(Post)
-                .filter(Post.status == "scheduled")
-                .filter(Post.scheduled_time <= now)
+        result = await db.execute(
+            select(Post.scheduled_time)
+            .filter(Post.status == "scheduled")
+            .filter(Post.scheduled_time.isnot(None))
+            .order_by(Post.scheduled_time)
+            .limit(limit)
+        )
+        return result.scalars().all()
+
+due_timer = DueTimer(
+    load_next_due,
+    publish_posts_job,
+    is_active=lambda: leader.is_leader,
+    capacity=settings.SCHEDULER_TIMER_CAPACITY,
+    inactive_poll=max(1, settings.SCHEDULER_LEASE_SECONDS // 3),
+    min_interval=0.0 if task_backend.eager else settings.SCHEDULER_MIN_TICK_SECONDS,
+)
+
+follower_source = build_follower_source(
+    settings.FOLLOWER_SOURCE,
+    fake_followers=settings.FAKE_FOLLOWER_COUNT,
+    fake_following=settings.FAKE_FOLLOWING_COUNT,
+    churn=settings.FAKE_FOLLOWER_CHURN,
+    page_size=settings.FOLLOWER_PAGE_SIZE,
+)
+
+@task("sync_followers", queue="followers")
+async def sync_followers(account_ids: Optional[List[int]] = None):
+    """
+    Refresh the stored follower/following snapshots of the given accounts, or
+    of the FOLLOWER_SYNC_BATCH accounts synced longest ago, and tell each owner
+    how many followers were gained and lost.
+    """
+    if account_ids is None:
+        older_than = datetime.now(timezone.utc) - timedelta(seconds=settings.FOLLOWER_SYNC_INTERVAL_SECONDS)
+        async with async_session() as db:
+            account_ids = await stale_accounts(db, older_than, settings.FOLLOWER_SYNC_BATCH)
+
+    for account_id in account_ids:
+        for direction in DIRECTIONS:
+            try:
+                result = await sync_graph(async_session, follower_source, account_id, direction, settings.FOLLOWER_MAX_IDS)
+            except FollowerSyncError as e:
+                logger.error("Follower sync failed for account_id=%s (%s): %s", account_id, direction, e)
+                continue
+            if result is None:
+                break
+            logger.info(
+                "Synced %d %s for account_id=%s: +%d -%d in %.2fs",
+                result.total, direction, account_id, result.gained, result.lost, result.seconds,
+            )
+            await manager.emit(
+                result.user_id,
+                "followers.synced",
+                account_id=account_id,
+                direction=direction,
+                total=result.total,
+                gained=result.gained,
+                lost=result.lost,
             )
-            posts = result.scalars().all()
 
-            if not posts:
-                print("[INFO] No scheduled posts to publish at this time.")
-                return
+async def enqueue_follower_sync():
+    await task_backend.enqueue("sync_followers", unique_for=settings.FOLLOWER_SYNC_TICK_SECONDS)
 
-            for post in posts:
-                post.status = "published"
-                post.published_time = now
-                published_post_ids.append(post.id)
-                print(f"[INFO] Post id={post.id} auto-published for user_id={post.user_id}")
+@job_context("follower_sync_job")
+async def follower_sync_job():
+    """Scheduled in every worker; only the lease holder queues the next sync batch."""
+    await leader.run_if_leader(enqueue_follower_sync)
 
-            await db.commit()
-            
-            # Broadcast update to clients
-            if published_post_ids:
-                message = "An update has occurred. Please refresh your data."
-                print(f"[INFO] Broadcasting: {message}")
-                await manager.broadcast(message)
+WAKEUP_TOPIC = "scheduler.wakeup"
 
-        except Exception as e:
-            await db.rollback()
-            print(f"[ERROR] Failed to publish posts: {e}")
+async def notify_scheduled(when: datetime):
+    """
+    Wake the leader's due timer for a newly scheduled post, whichever process
+    holds it. Best effort: a lost wakeup is caught by reconcile_posts_job.
+    """
+    try:
+        await backplane.publish(WAKEUP_TOPIC, {"at": when.isoformat()})
+    except Exception as e:
+        logger.error("Failed to wake the due timer: %s", e)
+
+async def _on_wakeup(payload: dict):
+    due_timer.notify(datetime.fromisoformat(payload["at"]))
+
+REVOKE_TOPIC = "auth.revoke"
+
+async def revoke_token(token: str):
+    """Revoke a JWT in this process and, through the backplane, in every other one."""
+    revoked = revoke_access_token(token)
+    if revoked:
+        key, until = revoked
+        await backplane.publish(REVOKE_TOPIC, {"key": key, "until": until})
+
+async def _on_revoke(payload: dict):
+    token_cache.revoke_key(payload["key"], payload["until"])
+
+@job_context("reconcile_posts_job")
+async def reconcile_posts_job():
+    """
+    Safety net behind the due timer: publishes anything it missed (e.g. a lost
+    wakeup during a leader hand-over) and resyncs its heap with the database.
+    """
+    await publish_posts_job()
+    due_timer.invalidate()
 
 @router.on_event("startup")
 async def start_scheduler():
-    """Start APScheduler safely on FastAPI startup."""
+    """Start APScheduler and the due timer safely on FastAPI startup."""
     if not scheduler.get_jobs():
         scheduler.add_job(
-            publish_scheduled_posts,
+            reconcile_posts_job,
             'interval',
-            minutes=1,
+            seconds=settings.SCHEDULER_RECONCILE_SECONDS,
             id="publish_posts_job"
         )
-        print("[INFO] Job 'publish_posts_job' added to scheduler")
+        # Renew the lease well inside its TTL so leadership does not flap between ticks
+        scheduler.add_job(
+            leader.ensure_leader,
+            'interval',
+            seconds=max(1, settings.SCHEDULER_LEASE_SECONDS // 3),
+            id="leader_heartbeat_job"
+        )
+        scheduler.add_job(
+            follower_sync_job,
+            'interval',
+            seconds=settings.FOLLOWER_SYNC_TICK_SECONDS,
+            id="follower_sync_job"
+        )
+        logger.info("Job 'publish_posts_job' added to scheduler")
 
     if not scheduler.running:
         scheduler.start()
-        print("[INFO] Scheduler started: checking for scheduled posts every minute")
+        logger.info("Scheduler started: reconciling scheduled posts every %ss", settings.SCHEDULER_RECONCILE_SECONDS)
+
+    await manager.start()
+    await backplane.subscribe(WAKEUP_TOPIC, _on_wakeup)
+    await backplane.subscribe(REVOKE_TOPIC, _on_revoke)
+    await leader.ensure_leader()
+    task_backend.start()
+    due_timer.start()
+    # With Celery the pipeline runs in the worker processes instead
+    if settings.PUBLISH_PIPELINE_ENABLED and settings.TASK_BACKEND != "celery":
+        await start_publish_pipeline()
+
+@router.on_event("shutdown")
+async def stop_scheduler():
+    """Stop polling and hand the lease over to another worker."""
+    await due_timer.stop()
+    await task_backend.stop()
+    await publish_pipeline.stop()
+    # Shutdown is deferred to the event loop, so use the job list to stay idempotent
+    if scheduler.running and scheduler.get_jobs():
+        scheduler.remove_all_jobs()
+        scheduler.shutdown(wait=False)
+    await leader.resign()
+    await backplane.stop()
 
 @router.websocket("/ws/posts/")
-async def websocket_endpoint(websocket: WebSocket, token: str):
-    """WebSocket endpoint that uses shared JWT verification."""
-    print(f"Extracted token: {token}")
-    authorized = await manager.connect(websocket, token)
+async def websocket_endpoint(websocket: WebSocket, token: str, last_seq: Optional[int] = None):
+    """
+    WebSocket endpoint that uses shared JWT verification.
+    Pass `last_seq` when reconnecting to receive the events missed meanwhile.
+    """
+    authorized = await manager.connect(websocket, token, last_seq)
     if not authorized:
         return  
 
@@ -121,4 +574,4 @@ async def websocket_endpoint(websocket: WebSocket, token: str):
             await websocket.receive_text()
     except WebSocketDisconnect:
         manager.disconnect(websocket)
-        print("[INFO] Client disconnected from WebSocket.")
+        logger.debug("Client disconnected from WebSocket")
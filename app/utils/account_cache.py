@@ -0,0 +1,162 @@
+import json
+import logging
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from app.models.account import Platform
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class AccountSnapshot:
+    """Immutable copy of the Account columns handlers need; never holds tokens."""
+    id: int
+    user_id: int
+    platform: Platform
+    username: str
+    created_at: Optional[datetime]
+
+    @classmethod
+    def from_account(cls, account) -> "AccountSnapshot":
+        return cls(account.id, account.user_id, Platform(account.platform), account.username, account.created_at)
+
+    def to_json(self) -> Dict:
+        return {
+            "id": self.id,
+            "user_id": self.user_id,
+            "platform": self.platform.value,
+            "username": self.username,
+            "created_at": self.created_at.isoformat() if self.created_at else None,
+        }
+
+    @classmethod
+    def from_json(cls, data: Dict) -> "AccountSnapshot":
+        created_at = datetime.fromisoformat(data["created_at"]) if data["created_at"] else None
+        return cls(data["id"], data["user_id"], Platform(data["platform"]), data["username"], created_at)
+
+
+Loader = Callable[[int], Awaitable[List[AccountSnapshot]]]
+
+# Store a load only if no invalidation happened since it started (the
+# generation it read is still current), so a slow loader in any process can
+# never put back what another one just invalidated.
+_REDIS_STORE = """
+if (redis.call('HGET', KEYS[1], 'gen') or '0') ~= ARGV[1] then
+    return 0
+end
+redis.call('HSET', KEYS[1], 'gen', ARGV[1], 'data', ARGV[2])
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+return 1
+"""
+
+_REDIS_INVALIDATE = """
+redis.call('HINCRBY', KEYS[1], 'gen', 1)
+redis.call('HDEL', KEYS[1], 'data')
+redis.call('EXPIRE', KEYS[1], ARGV[1])
+return 1
+"""
+
+
+class AccountCache:
+    """
+    Read-through cache of a user's linked accounts (ordered by id).
+    A per-process LRU sits in front of an optional shared Redis tier; entries
+    live for `ttl` seconds. `invalidate` drops both tiers after a write; a load
+    that raced with an invalidation is returned but not stored. In Redis each
+    user has a hash of (gen, data): invalidation bumps `gen`, and a store is
+    compare-and-set on the `gen` read before loading, across all processes.
+    """
+
+    def __init__(self, loader: Loader, maxsize: int = 10000, ttl: float = 300, redis_url: Optional[str] = None, clock: Callable[[], float] = time.time):
+        self.loader = loader
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[int, Tuple[List[AccountSnapshot], float]]" = OrderedDict()
+        self._generations: Dict[int, int] = {}
+        self.redis = None
+        if redis_url:
+            import redis.asyncio as redis
+
+            self.redis = redis.from_url(redis_url)
+            self._store = self.redis.register_script(_REDIS_STORE)
+            self._invalidate = self.redis.register_script(_REDIS_INVALIDATE)
+        self.hits = 0
+        self.redis_hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    @staticmethod
+    def key(user_id: int) -> str:
+        return f"accounts:{user_id}:cache"
+
+    async def get(self, user_id: int) -> List[AccountSnapshot]:
+        now = self.clock()
+        entry = self._entries.get(user_id)
+        if entry is not None:
+            if entry[1] > now:
+                self._entries.move_to_end(user_id)
+                self.hits += 1
+                return entry[0]
+            del self._entries[user_id]
+
+        generation = self._generations.get(user_id, 0)
+        accounts = None
+        shared_generation = None
+        if self.redis is not None:
+            try:
+                shared_generation, raw = await self.redis.hmget(self.key(user_id), "gen", "data")
+                shared_generation = (shared_generation or b"0").decode()
+            except Exception as e:
+                logger.warning("Account cache read failed: %s", e)
+                raw = None
+            if raw is not None:
+                self.redis_hits += 1
+                accounts = [AccountSnapshot.from_json(item) for item in json.loads(raw)]
+
+        if accounts is None:
+            self.misses += 1
+            accounts = await self.loader(user_id)
+            if shared_generation is not None and self._generations.get(user_id, 0) == generation:
+                try:
+                    payload = json.dumps([a.to_json() for a in accounts])
+                    await self._store(
+                        keys=[self.key(user_id)],
+                        args=[shared_generation, payload, max(1, int(self.ttl))],
+                    )
+                except Exception as e:
+                    logger.warning("Account cache write failed: %s", e)
+
+        if self._generations.get(user_id, 0) == generation:
+            self._entries[user_id] = (accounts, now + self.ttl)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return accounts
+
+    def drop_local(self, user_id: int) -> None:
+        """Forget the user's entry in this process (called in every process on invalidation)."""
+        self._entries.pop(user_id, None)
+        self._generations[user_id] = self._generations.get(user_id, 0) + 1
+        if len(self._generations) > 2 * self.maxsize:
+            self._generations.clear()
+
+    async def invalidate(self, user_id: int) -> None:
+        self.invalidations += 1
+        self.drop_local(user_id)
+        if self.redis is not None:
+            try:
+                await self._invalidate(keys=[self.key(user_id)], args=[max(1, int(self.ttl))])
+            except Exception as e:
+                logger.error("Account cache invalidation failed: %s", e)
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "redis_hits": self.redis_hits,
+            "misses": self.misses,
+            "invalidations": self.invalidations,
+            "size": len(self._entries),
+        }
@@ -0,0 +1,164 @@
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import case, delete, func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
+from app.models.post_stats import PostStatsDaily
+
+
+@dataclass
+class PostEvent:
+    """
+    A post entering `status` at `at`; `lateness` is set for published
+    scheduled posts. A `count` of -1 takes back an earlier event, e.g. for a
+    post deleted before it left that status.
+    """
+    user_id: int
+    account_id: Optional[int]
+    status: str
+    at: datetime
+    lateness: Optional[float] = None
+    count: int = 1
+
+
+def event_day(at: datetime) -> date:
+    """UTC calendar day; naive datetimes are already UTC."""
+    if at.tzinfo is not None:
+        at = at.astimezone(timezone.utc)
+    return at.date()
+
+
+def lateness_seconds(scheduled_time: Optional[datetime], published_at: datetime) -> Optional[float]:
+    if scheduled_time is None:
+        return None
+    if scheduled_time.tzinfo is None:
+        scheduled_time = scheduled_time.replace(tzinfo=timezone.utc)
+    if published_at.tzinfo is None:
+        published_at = published_at.replace(tzinfo=timezone.utc)
+    return max(0.0, (published_at - scheduled_time).total_seconds())
+
+
+def accumulate(deltas: Dict[Tuple, Dict], events: Iterable[PostEvent]) -> Dict[Tuple, Dict]:
+    """Fold events into `deltas`, one counter row per rollup key."""
+    for event in events:
+        key = (event.user_id, event_day(event.at), event.account_id or 0, event.status)
+        row = deltas.get(key)
+        if row is None:
+            row = deltas[key] = {
+                "user_id": key[0],
+                "day": key[1],
+                "account_id": key[2],
+                "status": key[3],
+                "post_count": 0,
+                "lateness_count": 0,
+                "lateness_sum_seconds": 0.0,
+                "lateness_max_seconds": 0.0,
+            }
+        row["post_count"] += event.count
+        if event.lateness is not None:
+            row["lateness_count"] += 1
+            row["lateness_sum_seconds"] += event.lateness
+            row["lateness_max_seconds"] = max(row["lateness_max_seconds"], event.lateness)
+    return deltas
+
+
+def aggregate(events: Iterable[PostEvent]) -> List[Dict]:
+    """Collapse events into one counter delta per rollup key, in key order."""
+    deltas = accumulate({}, events)
+    return [deltas[key] for key in sorted(deltas)]
+
+
+async def record_post_events(db: AsyncSession, events: Iterable[PostEvent]) -> None:
+    """
+    Add events to post_stats_daily inside the caller's transaction with one
+    upsert per distinct key. Keys are written in sorted order so concurrent
+    writers lock rows in the same order.
+    """
+    rows = aggregate(events)
+    if not rows:
+        return
+    stmt = dialect_insert(db, PostStatsDaily)
+    excluded = stmt.excluded
+    stmt = stmt.on_conflict_do_update(
+        index_elements=["user_id", "day", "account_id", "status"],
+        set_={
+            "post_count": PostStatsDaily.post_count + excluded.post_count,
+            "lateness_count": PostStatsDaily.lateness_count + excluded.lateness_count,
+            "lateness_sum_seconds": PostStatsDaily.lateness_sum_seconds + excluded.lateness_sum_seconds,
+            "lateness_max_seconds": case(
+                (excluded.lateness_max_seconds > PostStatsDaily.lateness_max_seconds, excluded.lateness_max_seconds),
+                else_=PostStatsDaily.lateness_max_seconds,
+            ),
+        },
+    )
+    await db.execute(stmt, rows)
+
+
+async def forget_account_stats(db: AsyncSession, user_id: int, account_id: int) -> None:
+    """
+    Drop an account's counters inside the caller's transaction, for when the
+    account (and with it every post it had) is deleted; backfill_stats would
+    not rebuild them either.
+    """
+    await db.execute(
+        delete(PostStatsDaily)
+        .where(PostStatsDaily.user_id == user_id, PostStatsDaily.account_id == account_id)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def _rollup_query(user_id: int, since: date, until: date, account_id: Optional[int], status: Optional[str], *group_by):
+    query = (
+        select(
+            *group_by,
+            func.sum(PostStatsDaily.post_count).label("posts"),
+            func.sum(PostStatsDaily.lateness_count).label("lateness_count"),
+            func.sum(PostStatsDaily.lateness_sum_seconds).label("lateness_sum"),
+            func.max(PostStatsDaily.lateness_max_seconds).label("lateness_max"),
+        )
+        .filter(PostStatsDaily.user_id == user_id)
+        .filter(PostStatsDaily.day >= since)
+        .filter(PostStatsDaily.day <= until)
+        .group_by(*group_by)
+        .order_by(*group_by)
+    )
+    if account_id is not None:
+        query = query.filter(PostStatsDaily.account_id == account_id)
+    if status:
+        query = query.filter(PostStatsDaily.status == status)
+    return query
+
+
+def _totals(row) -> Dict:
+    return {
+        "posts": row.posts,
+        "avg_lateness_seconds": row.lateness_sum / row.lateness_count if row.lateness_count else None,
+        "max_lateness_seconds": row.lateness_max if row.lateness_count else None,
+    }
+
+
+async def daily_series(
+    db: AsyncSession,
+    user_id: int,
+    since: date,
+    until: date,
+    account_id: Optional[int] = None,
+    status: Optional[str] = None,
+) -> List[Dict]:
+    """Per-day, per-status totals for [since, until], read from the rollup only."""
+    query = _rollup_query(user_id, since, until, account_id, status, PostStatsDaily.day, PostStatsDaily.status)
+    return [{"day": row.day, "status": row.status, **_totals(row)} for row in await db.execute(query)]
+
+
+async def status_totals(
+    db: AsyncSession,
+    user_id: int,
+    since: date,
+    until: date,
+    account_id: Optional[int] = None,
+) -> Dict[str, Dict]:
+    """Per-status totals for [since, until], read from the rollup only."""
+    query = _rollup_query(user_id, since, until, account_id, None, PostStatsDaily.status)
+    return {row.status: _totals(row) for row in await db.execute(query)}
@@ -0,0 +1,119 @@
+import asyncio
+import json
+import logging
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+Handler = Callable[[Any], Awaitable[None]]
+
+
+class Backplane(ABC):
+    """
+    Topic-based pub/sub used to reach every app process. A message published
+    on a topic is handed to that topic's handlers in all processes, including
+    the one that published it.
+    """
+
+    @abstractmethod
+    async def subscribe(self, topic: str, handler: Handler) -> None:
+        """Call `handler` with the payload of every message on `topic`."""
+
+    @abstractmethod
+    async def publish(self, topic: str, payload: Any) -> None:
+        """Send `payload` (JSON serializable) to the topic's handlers in every process."""
+
+    async def stop(self) -> None:
+        pass
+
+
+class InMemoryBackplane(Backplane):
+    """Single-process backplane; delivery is a direct call, used for tests and dev."""
+
+    def __init__(self):
+        self._handlers: Dict[str, List[Handler]] = {}
+
+    async def subscribe(self, topic: str, handler: Handler) -> None:
+        handlers = self._handlers.setdefault(topic, [])
+        if handler not in handlers:
+            handlers.append(handler)
+
+    async def publish(self, topic: str, payload: Any) -> None:
+        for handler in list(self._handlers.get(topic, ())):
+            try:
+                await handler(payload)
+            except Exception:
+                logger.exception("Backplane handler for '%s' failed", topic)
+
+
+class RedisBackplane(Backplane):
+    """Redis pub/sub; payloads are JSON encoded and fanned out by a listener task."""
+
+    def __init__(self, url: str, prefix: str = "backplane:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._handlers: Dict[str, List[Handler]] = {}
+        self._pubsub = None
+        self._listener: Optional[asyncio.Task] = None
+
+    async def subscribe(self, topic: str, handler: Handler) -> None:
+        handlers = self._handlers.setdefault(topic, [])
+        if handler in handlers:
+            return
+        handlers.append(handler)
+        if self._pubsub is None:
+            self._pubsub = self.client.pubsub(ignore_subscribe_messages=True)
+        await self._pubsub.subscribe(self.prefix + topic)
+        if self._listener is None:
+            self._listener = asyncio.create_task(self._listen())
+
+    async def publish(self, topic: str, payload: Any) -> None:
+        await self.client.publish(self.prefix + topic, json.dumps(payload, default=str))
+
+    async def _listen(self) -> None:
+        while True:
+            try:
+                message = await self._pubsub.get_message(timeout=1.0)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                logger.error("Backplane listener failed: %s", e)
+                await asyncio.sleep(1)
+                continue
+            if message is None:
+                continue
+            channel = message["channel"]
+            if isinstance(channel, bytes):
+                channel = channel.decode()
+            topic = channel[len(self.prefix):]
+            payload = json.loads(message["data"])
+            for handler in list(self._handlers.get(topic, ())):
+                try:
+                    await handler(payload)
+                except Exception:
+                    logger.exception("Backplane handler for '%s' failed", topic)
+
+    async def stop(self) -> None:
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        if self._pubsub is not None:
+            await self._pubsub.aclose()
+            self._pubsub = None
+        self._handlers.clear()
+
+
+def build_backplane(kind: str, redis_url: str) -> Backplane:
+    """Resolve the WS_BACKPLANE setting to a backplane instance."""
+    if kind == "redis":
+        return RedisBackplane(redis_url)
+    if kind == "memory":
+        return InMemoryBackplane()
+    raise ValueError(f"Unknown backplane: {kind}")
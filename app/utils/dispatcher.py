@@ -0,0 +1,119 @@
+import logging
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Awaitable, Callable, List, Optional
+from sqlalchemy import update
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.post import Post
+
+logger = logging.getLogger(__name__)
+
+@dataclass
+class ClaimedPost:
+    """Lightweight row returned for every post claimed by the dispatcher."""
+    id: int
+    user_id: int
+    account_id: Optional[int]
+    scheduled_time: Optional[datetime]
+    recurrence_id: Optional[int] = None
+
+
+def _due_ids(now: datetime, batch_size: int, lock: bool):
+    """
+    Due post ids in scheduled_time order, served by ix_posts_status_scheduled_time.
+    On Postgres the rows are locked with SKIP LOCKED so concurrent dispatchers
+    claim disjoint batches instead of waiting on each other.
+    """
+    stmt = (
+        select(Post.id)
+        .filter(Post.status == "scheduled")
+        .filter(Post.scheduled_time <= now)
+        .order_by(Post.scheduled_time)
+        .limit(batch_size)
+    )
+    if lock:
+        stmt = stmt.with_for_update(skip_locked=True)
+    return stmt
+
+
+async def claim_due_posts(
+    db: AsyncSession,
+    now: datetime,
+    batch_size: int,
+    new_status: str = "published",
+) -> List[ClaimedPost]:
+    """
+    Claim one bounded batch of due posts and flip their status in a single
+    bulk UPDATE ... RETURNING. The caller owns the transaction.
+    """
+    dialect = db.bind.dialect
+    values = {"status": new_status}
+    if new_status == "published":
+        values["published_time"] = now
+    returning = (Post.id, Post.user_id, Post.account_id, Post.scheduled_time, Post.recurrence_id)
+
+    if dialect.update_returning:
+        # SQLite has no row locks; the single UPDATE statement is atomic under
+        # its database-level write lock, so the sub-select just omits FOR UPDATE.
+        due = _due_ids(now, batch_size, lock=dialect.name == "postgresql")
+        result = await db.execute(
+            update(Post)
+            .where(Post.id.in_(due.scalar_subquery()))
+            .where(Post.status == "scheduled")
+            .values(**values)
+            .returning(*returning)
+            .execution_options(synchronize_session=False)
+        )
+        rows = result.all()
+    else:
+        # Fallback for backends without UPDATE ... RETURNING.
+        ids = (await db.execute(_due_ids(now, batch_size, lock=False))).scalars().all()
+        if not ids:
+            return []
+        await db.execute(
+            update(Post)
+            .where(Post.id.in_(ids))
+            .where(Post.status == "scheduled")
+            .values(**values)
+            .execution_options(synchronize_session=False)
+        )
+        result = await db.execute(select(*returning).filter(Post.id.in_(ids)))
+        rows = result.all()
+
+    return [ClaimedPost(*row) for row in rows]
+
+
+async def dispatch_due_posts(
+    session_factory,
+    now: datetime,
+    batch_size: int,
+    max_batches: int,
+    new_status: str = "published",
+    on_claimed: Optional[Callable[[AsyncSession, List[ClaimedPost]], Awaitable[None]]] = None,
+) -> List[ClaimedPost]:
+    """
+    Drain due posts batch by batch, committing after each one so row locks are
+    held only briefly. Stops early once a batch comes back short, so a tick costs
+    O(due posts) and never touches the rest of the queue. `on_claimed` runs in
+    each batch's transaction, e.g. to add the posts to the publish outbox.
+    A failing batch is rolled back and logged and the tick stops there; the
+    posts of the batches already committed are still returned, so the caller
+    notifies about every post that changed state.
+    """
+    claimed: List[ClaimedPost] = []
+    for _ in range(max_batches):
+        async with session_factory() as db:
+            try:
+                batch = await claim_due_posts(db, now, batch_size, new_status)
+                if batch and on_claimed is not None:
+                    await on_claimed(db, batch)
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                logger.exception("Failed to claim a batch of due posts; %d already claimed this tick", len(claimed))
+                break
+        claimed.extend(batch)
+        if len(batch) < batch_size:
+            break
+    return claimed
@@ -0,0 +1,145 @@
+import asyncio
+import heapq
+import logging
+import time
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+def to_epoch(value: datetime) -> float:
+    """Naive datetimes (SQLite) are stored as UTC."""
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value.timestamp()
+
+
+class DueTimer:
+    """
+    Min-heap of the nearest due scheduled_time values. The loop sleeps exactly
+    until the head is due, then calls `fire`. The heap is filled lazily with
+    `load_next(capacity)` and only reloaded when it drains and the database may
+    hold more; otherwise an idle timer waits on `notify()` without polling.
+    When `fire` only queues the work, `min_interval` spaces ticks out so rows
+    that are still due until the task runs do not make the loop spin.
+    """
+
+    def __init__(
+        self,
+        load_next: Callable[[int], Awaitable[List[datetime]]],
+        fire: Callable[[], Awaitable[None]],
+        is_active: Callable[[], bool] = lambda: True,
+        capacity: int = 1000,
+        inactive_poll: float = 10.0,
+        clock: Callable[[], float] = time.time,
+        min_interval: float = 0.0,
+    ):
+        self.load_next = load_next
+        self.fire = fire
+        self.is_active = is_active
+        self.capacity = capacity
+        self.inactive_poll = inactive_poll
+        self.clock = clock
+        self.min_interval = min_interval
+        self._last_fire = float("-inf")
+        self._heap: List[float] = []
+        self._loaded = False
+        self._exhausted = False
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def pending(self) -> int:
+        return len(self._heap)
+
+    @property
+    def next_due(self) -> Optional[float]:
+        return self._heap[0] if self._heap else None
+
+    def notify(self, when: datetime) -> None:
+        """Register a newly scheduled time; wakes the loop if it is now the earliest."""
+        if not self._loaded:
+            # The next load picks it up from the database.
+            self._wakeup.set()
+            return
+        due = to_epoch(when)
+        earliest = not self._heap or due < self._heap[0]
+        heapq.heappush(self._heap, due)
+        if len(self._heap) > 2 * self.capacity:
+            self._heap = heapq.nsmallest(self.capacity, self._heap)
+            self._exhausted = False
+        if earliest:
+            self._wakeup.set()
+
+    def invalidate(self) -> None:
+        """Drop the cached heap so the next iteration reloads it from the database."""
+        self._loaded = False
+        self._wakeup.set()
+
+    async def _load(self) -> None:
+        times = await self.load_next(self.capacity)
+        self._heap = [to_epoch(t) for t in times]
+        heapq.heapify(self._heap)
+        self._exhausted = len(times) < self.capacity
+        self._loaded = True
+
+    async def _sleep(self, timeout: Optional[float]) -> None:
+        try:
+            await asyncio.wait_for(self._wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            pass
+        self._wakeup.clear()
+
+    async def _run_once(self) -> None:
+        if not self.is_active():
+            self._loaded = False
+            await self._sleep(self.inactive_poll)
+            return
+
+        if not self._loaded or (not self._heap and not self._exhausted):
+            await self._load()
+
+        if not self._heap:
+            await self._sleep(None)
+            return
+
+        delay = self._heap[0] - self.clock()
+        if delay > 0:
+            await self._sleep(delay)
+            return
+
+        delay = self._last_fire + self.min_interval - self.clock()
+        if delay > 0:
+            await self._sleep(delay)
+            return
+
+        now = self.clock()
+        while self._heap and self._heap[0] <= now:
+            heapq.heappop(self._heap)
+        self._last_fire = now
+        await self.fire()
+
+    async def run(self) -> None:
+        while True:
+            try:
+                await self._run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Due timer iteration failed")
+                self._loaded = False
+                await self._sleep(self.inactive_poll)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
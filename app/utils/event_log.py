@@ -0,0 +1,132 @@
+import json
+from abc import ABC, abstractmethod
+from collections import OrderedDict, deque
+from datetime import date, datetime
+from typing import Any, Deque, Dict, List, Optional
+
+
+def json_default(value: Any):
+    """JSON encoder fallback for event payloads (ISO 8601 timestamps)."""
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    return str(value)
+
+
+class EventLog(ABC):
+    """
+    Bounded per-user ring buffer of WebSocket events. Every appended event gets
+    the user's next sequence number so reconnecting clients can ask for what
+    they missed.
+    """
+
+    @abstractmethod
+    async def append(self, user_id: int, event: dict) -> dict:
+        """Store the event and return it with its `seq` filled in."""
+
+    @abstractmethod
+    async def current_seq(self, user_id: int) -> int:
+        """The user's last assigned `seq`, 0 before the first event."""
+
+    @abstractmethod
+    async def since(self, user_id: int, last_seq: int) -> Optional[List[dict]]:
+        """Events after `last_seq`, or None when some of them already left the buffer."""
+
+    @staticmethod
+    def _slice(events: List[dict], current: int, last_seq: int) -> Optional[List[dict]]:
+        if last_seq == current:
+            return []
+        if last_seq > current or not events or events[0]["seq"] > last_seq + 1:
+            return None
+        return [e for e in events if e["seq"] > last_seq]
+
+
+class InMemoryEventLog(EventLog):
+    """Process-local buffers; the least recently active users are dropped past `max_users`."""
+
+    def __init__(self, per_user: int = 200, max_users: int = 10000):
+        self.per_user = per_user
+        self.max_users = max_users
+        self._events: "OrderedDict[int, Deque[dict]]" = OrderedDict()
+        self._seq: Dict[int, int] = {}
+
+    async def append(self, user_id: int, event: dict) -> dict:
+        seq = self._seq.get(user_id, 0) + 1
+        self._seq[user_id] = seq
+        event = {**event, "seq": seq}
+        buffer = self._events.get(user_id)
+        if buffer is None:
+            buffer = self._events[user_id] = deque(maxlen=self.per_user)
+        self._events.move_to_end(user_id)
+        buffer.append(event)
+        while len(self._events) > self.max_users:
+            self._events.popitem(last=False)
+        return event
+
+    async def current_seq(self, user_id: int) -> int:
+        return self._seq.get(user_id, 0)
+
+    async def since(self, user_id: int, last_seq: int) -> Optional[List[dict]]:
+        events = list(self._events.get(user_id, ()))
+        return self._slice(events, await self.current_seq(user_id), last_seq)
+
+
+# Assign the next sequence number and push onto the capped list in one step.
+# The event arrives as JSON without its opening brace and seq is spliced in
+# front; decoding it with cjson would turn empty arrays into objects.
+_REDIS_APPEND = """
+local seq = redis.call('INCR', KEYS[1])
+local raw
+if ARGV[1] == '}' then
+  raw = '{"seq":' .. seq .. '}'
+else
+  raw = '{"seq":' .. seq .. ',' .. ARGV[1]
+end
+redis.call('RPUSH', KEYS[2], raw)
+redis.call('LTRIM', KEYS[2], -tonumber(ARGV[2]), -1)
+redis.call('EXPIRE', KEYS[1], ARGV[3])
+redis.call('EXPIRE', KEYS[2], ARGV[3])
+return raw
+"""
+
+
+class RedisEventLog(EventLog):
+    """Shared buffers in Redis so any process can replay events for a reconnecting client."""
+
+    def __init__(self, url: str, per_user: int = 200, ttl_seconds: int = 86400, prefix: str = "events:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.per_user = per_user
+        self.ttl_seconds = ttl_seconds
+        self.prefix = prefix
+        self._append = self.client.register_script(_REDIS_APPEND)
+
+    def _keys(self, user_id: int):
+        return f"{self.prefix}{user_id}:seq", f"{self.prefix}{user_id}:log"
+
+    async def append(self, user_id: int, event: dict) -> dict:
+        raw = await self._append(
+            keys=list(self._keys(user_id)),
+            args=[json.dumps(event, default=json_default)[1:], self.per_user, self.ttl_seconds],
+        )
+        return json.loads(raw)
+
+    async def current_seq(self, user_id: int) -> int:
+        value = await self.client.get(self._keys(user_id)[0])
+        return int(value or 0)
+
+    async def since(self, user_id: int, last_seq: int) -> Optional[List[dict]]:
+        seq_key, log_key = self._keys(user_id)
+        async with self.client.pipeline(transaction=True) as pipe:
+            current, raw = await pipe.get(seq_key).lrange(log_key, 0, -1).execute()
+        events = [json.loads(r) for r in raw]
+        return self._slice(events, int(current or 0), last_seq)
+
+
+def build_event_log(kind: str, redis_url: str, per_user: int) -> EventLog:
+    """Event buffers live wherever the WebSocket backplane does."""
+    if kind == "redis":
+        return RedisEventLog(redis_url, per_user=per_user)
+    if kind == "memory":
+        return InMemoryEventLog(per_user=per_user)
+    raise ValueError(f"Unknown event log backend: {kind}")
@@ -0,0 +1,306 @@
+import asyncio
+import heapq
+import sys
+import time
+from abc import ABC, abstractmethod
+from array import array
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Optional, Tuple
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
+from app.models.account import Account
+from app.models.follower_graph import FollowerGraph
+from app.utils.user_version import bump_user_versions
+
+DIRECTIONS = ("followers", "following")
+# Platform user ids are stored as little-endian int64s
+ID_SIZE = 8
+
+
+class FollowerSyncError(Exception):
+    """The platform could not list the account's graph; the stored snapshot is kept."""
+
+
+# -----------------------------
+# Packed id arrays
+# -----------------------------
+def pack(ids: array) -> bytes:
+    if sys.byteorder == "big":
+        ids = array("q", ids)
+        ids.byteswap()
+    return ids.tobytes()
+
+
+def unpack(blob: Optional[bytes]) -> array:
+    ids = array("q")
+    if blob:
+        ids.frombytes(blob)
+        if sys.byteorder == "big":
+            ids.byteswap()
+    return ids
+
+
+def merge_runs(runs: List[array]) -> array:
+    """Merge individually sorted pages into one sorted array without duplicates."""
+    merged = array("q")
+    last = None
+    for value in heapq.merge(*runs):
+        if value != last:
+            merged.append(value)
+            last = value
+    return merged
+
+
+def diff_sorted(old: array, new: array) -> Tuple[array, array]:
+    """(gained, lost) between two sorted snapshots in a single merge pass."""
+    gained, lost = array("q"), array("q")
+    i = j = 0
+    n, m = len(old), len(new)
+    while i < n and j < m:
+        a, b = old[i], new[j]
+        if a == b:
+            i += 1
+            j += 1
+        elif a < b:
+            lost.append(a)
+            i += 1
+        else:
+            gained.append(b)
+            j += 1
+    lost.extend(old[i:])
+    gained.extend(new[j:])
+    return gained, lost
+
+
+# -----------------------------
+# Platform sources
+# -----------------------------
+@dataclass
+class SourceAccount:
+    id: int
+    platform: str
+    username: str
+    access_token: Optional[str]
+
+
+class FollowerSource(ABC):
+    """Lists an account's follower or following ids, one platform page at a time."""
+
+    @abstractmethod
+    def pages(self, account: SourceAccount, direction: str) -> AsyncIterator[List[int]]:
+        """Async generator of id pages; raises FollowerSyncError if the platform refuses."""
+
+
+class FakeFollowerSource(FollowerSource):
+    """
+    Deterministic stand-in for the platform APIs. Each account's graph is a
+    window of `size` ids that slides by `churn * size` on every sync, so
+    consecutive syncs report that many gained and lost ids.
+    """
+
+    def __init__(self, size: Callable[[SourceAccount, str], int], churn: float = 0.01, page_size: int = 1000, latency: float = 0.0):
+        self.size = size
+        self.churn = churn
+        self.page_size = page_size
+        self.latency = latency
+        self._syncs: Dict[Tuple[int, str], int] = {}
+
+    async def pages(self, account, direction):
+        size = self.size(account, direction)
+        generation = self._syncs.get((account.id, direction), 0)
+        self._syncs[(account.id, direction)] = generation + 1
+        start = account.id * 10**9 + generation * int(size * self.churn)
+        # Newest first, as the platforms return them
+        for offset in range(size, 0, -self.page_size):
+            if self.latency:
+                await asyncio.sleep(self.latency)
+            yield list(range(start + offset - 1, start + max(0, offset - self.page_size) - 1, -1))
+
+
+class TwitterFollowerSource(FollowerSource):
+    """Pages through the v2 follower/following endpoints with tweepy's async client."""
+
+    def __init__(self, page_size: int = 1000):
+        self.page_size = min(page_size, 1000)
+
+    async def pages(self, account, direction):
+        try:
+            import tweepy
+            from tweepy.asynchronous import AsyncClient
+        except ImportError as e:
+            raise FollowerSyncError(f"tweepy async support is not installed: {e}")
+
+        if not account.access_token:
+            raise FollowerSyncError("Account has no access token")
+        client = AsyncClient(bearer_token=account.access_token)
+        method = client.get_users_followers if direction == "followers" else client.get_users_following
+        try:
+            user = await client.get_user(username=account.username, user_auth=False)
+            token = None
+            while True:
+                response = await method(user.data.id, max_results=self.page_size, pagination_token=token, user_auth=False)
+                yield [int(u.id) for u in response.data or []]
+                token = response.meta.get("next_token")
+                if not token:
+                    break
+        except tweepy.HTTPException as e:
+            raise FollowerSyncError(str(e))
+
+
+class _PerPlatformSource(FollowerSource):
+    def __init__(self, sources: Dict[str, FollowerSource], default: FollowerSource):
+        self.sources = sources
+        self.default = default
+
+    async def pages(self, account, direction):
+        async for page in self.sources.get(account.platform, self.default).pages(account, direction):
+            yield page
+
+
+def build_follower_source(kind: str, fake_followers: int = 1000, fake_following: int = 100, churn: float = 0.01, page_size: int = 1000) -> FollowerSource:
+    """`live` only has a real source for Twitter so far; other platforms stay fake."""
+    fake = FakeFollowerSource(
+        lambda account, direction: fake_followers if direction == "followers" else fake_following,
+        churn=churn,
+        page_size=page_size,
+    )
+    if kind == "fake":
+        return fake
+    if kind == "live":
+        return _PerPlatformSource({"twitter": TwitterFollowerSource(page_size)}, fake)
+    raise ValueError(f"Unknown FOLLOWER_SOURCE '{kind}'")
+
+
+# -----------------------------
+# Sync
+# -----------------------------
+@dataclass
+class SyncResult:
+    account_id: int
+    user_id: int
+    direction: str
+    total: int
+    gained: int
+    lost: int
+    seconds: float
+
+
+async def fetch_sorted(source: FollowerSource, account: SourceAccount, direction: str, max_ids: int) -> array:
+    """All ids from the source as one sorted array; each page is sorted as it arrives."""
+    runs: List[array] = []
+    count = 0
+    async for page in source.pages(account, direction):
+        runs.append(array("q", sorted(page)))
+        count += len(page)
+        if count > max_ids:
+            raise FollowerSyncError(f"More than {max_ids} {direction}")
+    return await asyncio.to_thread(merge_runs, runs)
+
+
+async def sync_graph(session_factory, source: FollowerSource, account_id: int, direction: str, max_ids: int = 5_000_000) -> Optional[SyncResult]:
+    """
+    Replace the stored snapshot of one account's graph and record what changed
+    since the previous sync. Returns None when the account no longer exists.
+    """
+    started = time.perf_counter()
+    async with session_factory() as db:
+        row = (await db.execute(
+            select(Account.id, Account.user_id, Account.platform, Account.username, Account.access_token).filter(Account.id == account_id)
+        )).first()
+    if row is None:
+        return None
+    account = SourceAccount(row.id, getattr(row.platform, "value", row.platform), row.username, row.access_token)
+
+    ids = await fetch_sorted(source, account, direction, max_ids)
+    now = datetime.now(timezone.utc)
+    async with session_factory() as db:
+        previous = (await db.execute(
+            select(FollowerGraph.ids, FollowerGraph.synced_at)
+            .filter(FollowerGraph.account_id == account_id, FollowerGraph.direction == direction)
+        )).first()
+        if previous is None:
+            # The first snapshot is a baseline, not a burst of new followers
+            gained, lost = array("q"), array("q")
+        else:
+            gained, lost = await asyncio.to_thread(diff_sorted, unpack(previous.ids), ids)
+        values = {
+            "id_count": len(ids),
+            "ids": pack(ids),
+            "gained": pack(gained),
+            "lost": pack(lost),
+            "synced_at": now,
+            "previous_synced_at": previous.synced_at if previous is not None else None,
+        }
+        stmt = dialect_insert(db, FollowerGraph).values(account_id=account_id, direction=direction, **values)
+        await db.execute(stmt.on_conflict_do_update(index_elements=["account_id", "direction"], set_=values))
+        await bump_user_versions(db, [row.user_id])
+        await db.commit()
+    return SyncResult(account_id, row.user_id, direction, len(ids), len(gained), len(lost), time.perf_counter() - started)
+
+
+async def stale_accounts(db: AsyncSession, older_than: datetime, limit: int) -> List[int]:
+    """Accounts whose follower snapshot is missing or was taken before `older_than`, oldest first."""
+    synced = (
+        select(FollowerGraph.account_id, func.min(FollowerGraph.synced_at).label("synced_at"))
+        .group_by(FollowerGraph.account_id)
+        .subquery()
+    )
+    result = await db.execute(
+        select(Account.id)
+        .outerjoin(synced, synced.c.account_id == Account.id)
+        .filter((synced.c.synced_at.is_(None)) | (synced.c.synced_at < older_than))
+        .order_by(synced.c.synced_at.is_not(None), synced.c.synced_at, Account.id)
+        .limit(limit)
+    )
+    return list(result.scalars().all())
+
+
+# -----------------------------
+# Reads
+# -----------------------------
+def _slice(column, offset: int, limit: int):
+    # substr is 1-based on both Postgres bytea and SQLite blobs
+    return func.substr(column, offset * ID_SIZE + 1, limit * ID_SIZE)
+
+
+async def read_page(db: AsyncSession, account_id: int, direction: str, offset: int, limit: int, column: str = "ids") -> Optional[Dict]:
+    """
+    One page of a stored id array, sliced in the database so a request for 50
+    ids transfers 400 bytes, not the whole snapshot. None if never synced.
+    """
+    counts = {"ids": FollowerGraph.id_count, "gained": func.length(FollowerGraph.gained) / ID_SIZE, "lost": func.length(FollowerGraph.lost) / ID_SIZE}
+    row = (await db.execute(
+        select(counts[column].label("total"), _slice(getattr(FollowerGraph, column), offset, limit).label("page"), FollowerGraph.synced_at, FollowerGraph.previous_synced_at)
+        .filter(FollowerGraph.account_id == account_id, FollowerGraph.direction == direction)
+    )).first()
+    if row is None:
+        return None
+    return {
+        "total": int(row.total or 0),
+        "ids": unpack(row.page).tolist(),
+        "synced_at": row.synced_at,
+        "previous_synced_at": row.previous_synced_at,
+    }
+
+
+async def read_first_pages(db: AsyncSession, account_id: int, limit: int) -> Dict[str, Dict]:
+    """The first `limit` ids of both directions in one query, keyed by direction; unsynced ones are missing."""
+    result = await db.execute(
+        select(FollowerGraph.direction, FollowerGraph.id_count, _slice(FollowerGraph.ids, 0, limit).label("page"), FollowerGraph.synced_at)
+        .filter(FollowerGraph.account_id == account_id)
+    )
+    return {
+        row.direction: {"total": row.id_count, "ids": unpack(row.page).tolist(), "synced_at": row.synced_at}
+        for row in result
+    }
+
+
+async def graph_counts(db: AsyncSession, account_ids: Iterable[int]) -> Dict[Tuple[int, str], int]:
+    result = await db.execute(
+        select(FollowerGraph.account_id, FollowerGraph.direction, FollowerGraph.id_count)
+        .filter(FollowerGraph.account_id.in_(list(account_ids)))
+    )
+    return {(row.account_id, row.direction): row.id_count for row in result}
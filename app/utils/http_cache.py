@@ -0,0 +1,367 @@
+import gzip
+import hashlib
+import json
+import logging
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from app.database import read_from_primary
+from app.utils.rate_limit import bearer_token
+
+logger = logging.getLogger(__name__)
+
+Headers = List[Tuple[bytes, bytes]]
+CachedResponse = Tuple[Headers, bytes]
+
+
+# -----------------------------
+# Shared response cache
+# -----------------------------
+class ResponseCache(ABC):
+    """Complete 200 responses (raw headers and body) by ETag."""
+
+    @abstractmethod
+    async def get(self, key: str) -> Optional[CachedResponse]:
+        """The stored response, or None when missing or expired."""
+
+    @abstractmethod
+    async def set(self, key: str, headers: Headers, body: bytes) -> None:
+        """Store a response under `key`, replacing any earlier one."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryResponseCache(ResponseCache):
+    """Per-process LRU capped at `max_bytes` of bodies; entries live for `ttl` seconds."""
+
+    def __init__(self, max_bytes: int = 64 * 1024 * 1024, ttl: float = 300, clock: Callable[[], float] = time.monotonic):
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.clock = clock
+        self.size = 0
+        self._entries: "OrderedDict[str, Tuple[Headers, bytes, float]]" = OrderedDict()
+
+    async def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[2] <= self.clock():
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[0], entry[1]
+
+    async def set(self, key, headers, body):
+        if len(body) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._drop(key)
+        self._entries[key] = (headers, body, self.clock() + self.ttl)
+        self.size += len(body)
+        while self.size > self.max_bytes:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str) -> None:
+        self.size -= len(self._entries.pop(key)[1])
+
+
+class RedisResponseCache(ResponseCache):
+    """
+    One Redis string per response, shared by every worker, so a response
+    built once is served everywhere until the user's version moves on.
+    """
+
+    def __init__(self, url: str, ttl: float = 300, prefix: str = "http:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.ttl = ttl
+        self.prefix = prefix
+
+    async def get(self, key):
+        raw = await self.client.get(self.prefix + key)
+        if raw is None:
+            return None
+        head, _, body = raw.partition(b"\n")
+        return [(k.encode("latin-1"), v.encode("latin-1")) for k, v in json.loads(head)], body
+
+    async def set(self, key, headers, body):
+        head = json.dumps([(k.decode("latin-1"), v.decode("latin-1")) for k, v in headers]).encode()
+        await self.client.set(self.prefix + key, head + b"\n" + body, ex=max(1, int(self.ttl)))
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def build_response_cache(kind: str, redis_url: str, max_bytes: int, ttl: float) -> Optional[ResponseCache]:
+    if kind == "off":
+        return None
+    if kind == "memory":
+        return MemoryResponseCache(max_bytes, ttl)
+    if kind == "redis":
+        return RedisResponseCache(redis_url, ttl)
+    raise ValueError(f"Unknown HTTP_CACHE_BACKEND '{kind}'")
+
+
+# -----------------------------
+# Conditional GETs
+# -----------------------------
+def _header(scope, name: bytes) -> Optional[str]:
+    for key, value in scope["headers"]:
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires (a gzipped copy carries W/)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+
+class HttpCache:
+    """
+    Validators for per-user read endpoints. A response on `paths` depends only
+    on the user's data, and every write to it bumps the user's version in the
+    same transaction (see bump_user_versions), so the ETag is a hash of user,
+    version, UTC day (some responses cover "the last 30 days") and URL, known
+    before the handler runs. `version(user_id, primary)` is read from the same
+    database as the handler's reads, before them, so a response is never older
+    than its tag. Bump `salt` when a deploy changes what these endpoints return.
+    """
+
+    def __init__(
+        self,
+        version: Callable[[int, bool], Awaitable[str]],
+        verify_token: Callable[[str], Optional[dict]],
+        paths: Iterable[str],
+        cache: Optional[ResponseCache] = None,
+        max_body: int = 1024 * 1024,
+        salt: str = "",
+    ):
+        self.version = version
+        self.verify_token = verify_token
+        self.paths = frozenset(paths)
+        self.cache = cache
+        self.max_body = max_body
+        self.salt = salt
+        self.not_modified = 0
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._warned_at = 0.0
+
+    def user(self, scope) -> Optional[int]:
+        token = bearer_token(scope)
+        if not token:
+            return None
+        try:
+            payload = self.verify_token(token)
+            return int(payload["sub"]) if payload else None
+        except Exception:
+            return None
+
+    def warn(self, message: str, error: Exception) -> None:
+        self.errors += 1
+        if time.monotonic() - self._warned_at > 60:
+            self._warned_at = time.monotonic()
+            logger.warning(message, error)
+
+    def etag(self, user_id: int, version: str, scope) -> str:
+        day = datetime.now(timezone.utc).date().isoformat()
+        key = f"{self.salt}|{user_id}|{version}|{day}|{scope['path']}?{scope['query_string'].decode('latin-1')}"
+        return f'"{hashlib.blake2b(key.encode(), digest_size=16).hexdigest()}"'
+
+    def stats(self) -> Dict[str, int]:
+        stats = {"not_modified": self.not_modified, "hits": self.hits, "misses": self.misses, "errors": self.errors}
+        if isinstance(self.cache, MemoryResponseCache):
+            stats["entries"] = len(self.cache._entries)
+            stats["bytes"] = self.cache.size
+        return stats
+
+
+class HttpCacheMiddleware:
+    """
+    Conditional GETs ahead of routing: a matching If-None-Match gets a 304
+    after one primary-key lookup of the user's version; otherwise a copy in
+    the response cache is replayed, and only then the handler runs (its 200 is
+    tagged and stored).
+
+    A revalidation (If-None-Match) reads the version and the body from the
+    primary, so a client polling right after its own write sees it. Plain GETs
+    stay on the read replica: the version comes from the replica too, and the
+    body, read after it, is at least as new, so a lagging replica only means a
+    tag that is older than it could be, never one newer than the body.
+    """
+
+    def __init__(self, app, http_cache: HttpCache):
+        self.app = app
+        self.http_cache = http_cache
+
+    async def __call__(self, scope, receive, send):
+        http_cache = self.http_cache
+        if scope["type"] != "http" or scope["method"] != "GET" or scope["path"] not in http_cache.paths:
+            await self.app(scope, receive, send)
+            return
+        user_id = http_cache.user(scope)
+        if user_id is None:
+            # Let the handler answer with its 401
+            await self.app(scope, receive, send)
+            return
+        if_none_match = _header(scope, b"if-none-match")
+        primary = if_none_match is not None
+        try:
+            version = await http_cache.version(user_id, primary)
+        except Exception as e:
+            http_cache.warn("User version unavailable, serving uncached: %s", e)
+            await self.app(scope, receive, send)
+            return
+
+        etag = http_cache.etag(user_id, version, scope)
+        validators = [
+            (b"etag", etag.encode()),
+            (b"cache-control", b"private, no-cache"),
+            (b"vary", b"Authorization"),
+        ]
+        if etag_matches(if_none_match, etag):
+            http_cache.not_modified += 1
+            await send({"type": "http.response.start", "status": 304, "headers": validators})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        cache = http_cache.cache
+        if cache is not None:
+            try:
+                cached = await cache.get(etag)
+            except Exception as e:
+                http_cache.warn("Response cache unavailable: %s", e)
+                cached = None
+            if cached is not None:
+                http_cache.hits += 1
+                await send({"type": "http.response.start", "status": 200, "headers": cached[0]})
+                await send({"type": "http.response.body", "body": cached[1]})
+                return
+        http_cache.misses += 1
+
+        headers: Headers = []
+        chunks: List[bytes] = []
+        size = 0
+        store = False
+
+        async def send_tagged(message):
+            nonlocal headers, size, store
+            if message["type"] == "http.response.start":
+                if message["status"] == 200:
+                    names = {name for name, _ in validators}
+                    headers = [(k, v) for k, v in message["headers"] if k not in names] + validators
+                    message["headers"] = headers
+                    store = cache is not None and all(k != b"set-cookie" for k, _ in headers)
+            elif message["type"] == "http.response.body" and store:
+                body = message.get("body", b"")
+                size += len(body)
+                if size > http_cache.max_body:
+                    store = False
+                    chunks.clear()
+                else:
+                    chunks.append(body)
+                    if not message.get("more_body", False):
+                        try:
+                            await cache.set(etag, headers, b"".join(chunks))
+                        except Exception as e:
+                            http_cache.warn("Response cache unavailable: %s", e)
+            await send(message)
+
+        # The body must be read from where the version came from, after it
+        token = read_from_primary.set(primary)
+        try:
+            await self.app(scope, receive, send_tagged)
+        finally:
+            read_from_primary.reset(token)
+
+
+# -----------------------------
+# Compression
+# -----------------------------
+class CompressionMiddleware:
+    """
+    Gzips complete (non-streaming) responses of `content_types` of at least
+    `minimum_size` bytes for clients that accept it. Streams (file and media
+    downloads, exports), already encoded bodies and binary formats pass
+    through untouched. A strong ETag turns weak on the gzipped copy.
+    """
+
+    def __init__(
+        self,
+        app,
+        minimum_size: int = 1024,
+        compresslevel: int = 6,
+        content_types: Sequence[str] = ("application/json", "text/"),
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compresslevel = compresslevel
+        self.content_types = tuple(content_types)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or "gzip" not in (_header(scope, b"accept-encoding") or ""):
+            await self.app(scope, receive, send)
+            return
+
+        start = None
+
+        async def send_compressed(message):
+            nonlocal start
+            if message["type"] == "http.response.start":
+                start = message
+                return
+            if start is None:
+                await send(message)
+                return
+            message_start, start = start, None
+            body = message.get("body", b"")
+            headers = message_start["headers"]
+            if (
+                message["type"] == "http.response.body"
+                and message_start["status"] != 206
+                and not message.get("more_body", False)
+                and len(body) >= self.minimum_size
+                and self._compressible(headers)
+            ):
+                compressed = gzip.compress(body, self.compresslevel, mtime=0)
+                message_start["headers"] = self._encoded_headers(headers, len(compressed))
+                message = {**message, "body": compressed}
+            await send(message_start)
+            await send(message)
+
+        await self.app(scope, receive, send_compressed)
+
+    def _compressible(self, headers: Headers) -> bool:
+        content_type = b""
+        for name, value in headers:
+            if name == b"content-encoding":
+                return False
+            if name == b"content-type":
+                content_type = value
+        return content_type.decode("latin-1").startswith(self.content_types)
+
+    @staticmethod
+    def _encoded_headers(headers: Headers, length: int) -> Headers:
+        out: Headers = []
+        for name, value in headers:
+            if name == b"content-length":
+                continue
+            if name == b"etag" and not value.startswith(b"W/"):
+                value = b"W/" + value
+            out.append((name, value))
+        out += [
+            (b"content-encoding", b"gzip"),
+            (b"content-length", str(length).encode()),
+            (b"vary", b"Accept-Encoding"),
+        ]
+        return out
@@ -0,0 +1,234 @@
+import fcntl
+import logging
+import os
+import socket
+import time
+import uuid
+import tempfile
+import zlib
+from abc import ABC, abstractmethod
+from typing import Awaitable, Callable, Dict, Optional, Tuple
+from sqlalchemy import text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncEngine
+
+logger = logging.getLogger(__name__)
+
+
+class LockBackend(ABC):
+    """Interface for the leases used by LeaderElector."""
+
+    @abstractmethod
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        """Take the lease, or renew it if `owner` already holds it."""
+
+    @abstractmethod
+    async def release(self, name: str, owner: str) -> None:
+        """Give the lease up if `owner` holds it."""
+
+
+class InMemoryLockBackend(LockBackend):
+    """
+    Process-local leases, for tests only: every worker process would elect
+    itself. Share one instance between several electors to simulate
+    multiple workers; `clock` can be swapped for a fake.
+    """
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self.clock = clock
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        now = self.clock()
+        holder = self._leases.get(name)
+        if holder and holder[0] != owner and holder[1] > now:
+            return False
+        self._leases[name] = (owner, now + ttl)
+        return True
+
+    async def release(self, name: str, owner: str) -> None:
+        holder = self._leases.get(name)
+        if holder and holder[0] == owner:
+            del self._leases[name]
+
+
+class FileLockBackend(LockBackend):
+    """
+    flock() on a file in `directory`, held on an open descriptor. Covers the
+    workers of one host (SQLite deployments); the kernel drops the lock when
+    its process exits, so `ttl` is not needed.
+    """
+
+    def __init__(self, directory: str = "", prefix: str = "lock-"):
+        self.directory = directory or tempfile.gettempdir()
+        self.prefix = prefix
+        self._files: Dict[str, int] = {}
+
+    def _path(self, name: str) -> str:
+        return os.path.join(self.directory, f"{self.prefix}{name}")
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        if name in self._files:
+            return True
+        fd = os.open(self._path(name), os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self._files[name] = fd
+        return True
+
+    async def release(self, name: str, owner: str) -> None:
+        fd = self._files.pop(name, None)
+        if fd is not None:
+            fcntl.flock(fd, fcntl.LOCK_UN)
+            os.close(fd)
+
+
+# Take the key if free, extend it if we already own it.
+_REDIS_ACQUIRE = """
+local current = redis.call('GET', KEYS[1])
+if current == ARGV[1] then
+    redis.call('PEXPIRE', KEYS[1], ARGV[2])
+    return 1
+end
+if not current then
+    redis.call('SET', KEYS[1], ARGV[1], 'PX', ARGV[2])
+    return 1
+end
+return 0
+"""
+
+_REDIS_RELEASE = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+
+
+class RedisLockBackend(LockBackend):
+    """Lease stored as a Redis key with a TTL; renewals are atomic Lua scripts."""
+
+    def __init__(self, url: str, prefix: str = "lock:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._acquire = self.client.register_script(_REDIS_ACQUIRE)
+        self._release = self.client.register_script(_REDIS_RELEASE)
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        result = await self._acquire(keys=[self.prefix + name], args=[owner, int(ttl * 1000)])
+        return bool(result)
+
+    async def release(self, name: str, owner: str) -> None:
+        await self._release(keys=[self.prefix + name], args=[owner])
+
+
+class PostgresAdvisoryLockBackend(LockBackend):
+    """
+    Session-level pg_try_advisory_lock held on a dedicated connection. The lock
+    lives as long as that connection, so a crashed leader frees it immediately
+    and `ttl` is not needed. The connection runs in autocommit so it never
+    sits idle in a transaction, pinning a snapshot, between heartbeats.
+    """
+
+    def __init__(self, engine: AsyncEngine):
+        self.engine = engine
+        self._connections: Dict[str, AsyncConnection] = {}
+
+    @staticmethod
+    def _key(name: str) -> int:
+        return zlib.crc32(name.encode())
+
+    async def acquire(self, name: str, owner: str, ttl: float) -> bool:
+        conn = self._connections.get(name)
+        if conn is not None:
+            try:
+                await conn.execute(text("SELECT 1"))
+                return True
+            except Exception:
+                # Connection dropped, and the lock went with it.
+                self._connections.pop(name, None)
+                await conn.invalidate()
+
+        conn = await self.engine.connect()
+        try:
+            await conn.execution_options(isolation_level="AUTOCOMMIT")
+            result = await conn.execute(
+                text("SELECT pg_try_advisory_lock(:key)"), {"key": self._key(name)}
+            )
+            locked = bool(result.scalar())
+        except Exception:
+            await conn.close()
+            raise
+        if not locked:
+            await conn.close()
+            return False
+        self._connections[name] = conn
+        return True
+
+    async def release(self, name: str, owner: str) -> None:
+        conn = self._connections.pop(name, None)
+        if conn is None:
+            return
+        try:
+            await conn.execute(text("SELECT pg_advisory_unlock(:key)"), {"key": self._key(name)})
+        finally:
+            await conn.close()
+
+
+class LeaderElector:
+    """
+    Keeps track of whether this process holds the lease for `name`.
+    Call `ensure_leader()` periodically (more often than `ttl`) to renew it.
+    """
+
+    def __init__(self, backend: LockBackend, name: str, ttl: float, owner: Optional[str] = None):
+        self.backend = backend
+        self.name = name
+        self.ttl = ttl
+        self.owner = owner or f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self.is_leader = False
+
+    async def ensure_leader(self) -> bool:
+        try:
+            acquired = await self.backend.acquire(self.name, self.owner, self.ttl)
+        except Exception as e:
+            logger.error("Leader lease check failed for '%s': %s", self.name, e)
+            acquired = False
+        if acquired != self.is_leader:
+            state = "acquired" if acquired else "lost"
+            logger.info("%s %s leadership of '%s'", self.owner, state, self.name)
+        self.is_leader = acquired
+        return acquired
+
+    async def run_if_leader(self, job: Callable[[], Awaitable[None]]) -> bool:
+        """Run `job` only when this process currently holds the lease."""
+        if not await self.ensure_leader():
+            return False
+        await job()
+        return True
+
+    async def resign(self) -> None:
+        if self.is_leader:
+            await self.backend.release(self.name, self.owner)
+            self.is_leader = False
+
+
+def build_lock_backend(
+    kind: str, database_url: str, redis_url: str, engine: AsyncEngine, lock_dir: str = ""
+) -> LockBackend:
+    """Resolve the SCHEDULER_LOCK_BACKEND setting to a backend instance."""
+    if kind == "auto":
+        kind = "postgres" if database_url.startswith("postgresql") else "file"
+    if kind == "postgres":
+        return PostgresAdvisoryLockBackend(engine)
+    if kind == "redis":
+        return RedisLockBackend(redis_url)
+    if kind == "file":
+        return FileLockBackend(lock_dir)
+    if kind == "memory":
+        return InMemoryLockBackend()
+    raise ValueError(f"Unknown scheduler lock backend: {kind}")
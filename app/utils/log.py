@@ -0,0 +1,293 @@
+import atexit
+import contextlib
+import functools
+import itertools
+import json
+import logging
+import logging.handlers
+import queue
+import re
+import sys
+import time
+import uuid
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+request_id_var: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+job_id_var: ContextVar[Optional[str]] = ContextVar("job_id", default=None)
+
+# -----------------------------
+# Redaction
+# -----------------------------
+REDACTED = "[REDACTED]"
+SECRET_KEYS = {"token", "access_token", "refresh_token", "password", "secret", "authorization", "oauth_token", "oauth_verifier"}
+_SECRET_PATTERNS = [
+    # JWTs and other dotted base64url tokens
+    (re.compile(r"eyJ[\w-]+\.[\w-]+\.[\w-]*"), REDACTED),
+    (re.compile(r"(?i)\b(bearer)\s+[\w\-.~+/]+=*"), r"\1 " + REDACTED),
+    (re.compile(r"(?i)\b(access_token|refresh_token|token|password|secret|oauth_verifier)=([^&\s]+)"), r"\1=" + REDACTED),
+]
+
+
+def redact(text: str) -> str:
+    for pattern, replacement in _SECRET_PATTERNS:
+        text = pattern.sub(replacement, text)
+    return text
+
+
+# Attributes every LogRecord has; anything else came in through `extra`
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime", "taskName"}
+
+
+def record_fields(record: logging.LogRecord) -> Dict:
+    fields = {}
+    for key, value in record.__dict__.items():
+        if key in _RECORD_ATTRS or key.startswith("_"):
+            continue
+        fields[key] = REDACTED if key.lower() in SECRET_KEYS else value
+    return fields
+
+
+# -----------------------------
+# Filters (run on the calling thread, before the queue)
+# -----------------------------
+class ContextFilter(logging.Filter):
+    """Stamps the request and job ids of the code that logged, before the record changes thread."""
+
+    def filter(self, record):
+        record.request_id = request_id_var.get()
+        record.job_id = job_id_var.get()
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keeps 1 in N records for high-volume events, keyed by the `event` extra
+    (e.g. LOG_SAMPLE_RATES={"post.published": 0.01}). Kept records carry
+    `sample_rate` so counts can be scaled back up. Warnings always pass.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.every = {event: max(1, round(1 / rate)) for event, rate in rates.items() if rate > 0}
+        self.dropped_events = {event for event, rate in rates.items() if rate <= 0}
+        self.counters: Dict[str, itertools.count] = {event: itertools.count() for event in self.every}
+
+    def filter(self, record):
+        event = getattr(record, "event", None)
+        if event is None or record.levelno >= logging.WARNING:
+            return True
+        if event in self.dropped_events:
+            return False
+        every = self.every.get(event)
+        if every is None or every == 1:
+            return True
+        if next(self.counters[event]) % every:
+            return False
+        record.sample_rate = 1 / every
+        return True
+
+
+# -----------------------------
+# Formatters (run on the listener thread)
+# -----------------------------
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        data = {
+            "ts": time.strftime("%Y-%m-%dT%H:%M:%S", time.gmtime(record.created)) + f".{int(record.msecs):03d}Z",
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": redact(record.getMessage()),
+        }
+        for key, value in record_fields(record).items():
+            if value is not None:
+                data[key] = value
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            data["exc"] = redact(record.exc_text)
+        return json.dumps(data, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    """Human-readable lines for local development (LOG_FORMAT=text)."""
+
+    def format(self, record):
+        fields = " ".join(f"{k}={v}" for k, v in record_fields(record).items() if v is not None)
+        line = f"{self.formatTime(record)} {record.levelname:<7} {record.name}: {redact(record.getMessage())}"
+        if fields:
+            line += f" [{fields}]"
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            line += "\n" + redact(record.exc_text)
+        return line
+
+
+# -----------------------------
+# Non-blocking handler
+# -----------------------------
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    Puts records on a bounded in-memory queue; a listener thread formats and
+    writes them. When the queue is full the record is dropped and counted,
+    so logging never blocks the event loop.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Render %-args now (they may change later) but leave JSON to the listener
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"queued": self.queue.qsize(), "dropped": self.dropped}
+
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[logging.handlers.QueueListener] = None
+
+
+def setup_logging(
+    level: str = "INFO",
+    levels: Optional[Dict[str, str]] = None,
+    fmt: str = "json",
+    sample_rates: Optional[Dict[str, float]] = None,
+    queue_size: int = 10000,
+) -> NonBlockingQueueHandler:
+    """
+    Route all logging (including uvicorn's) through one queue handler and a
+    background listener writing to stdout. Safe to call more than once.
+    """
+    global _handler, _listener
+    root = logging.getLogger()
+    root.setLevel(level.upper())
+    for name, name_level in (levels or {}).items():
+        logging.getLogger(name).setLevel(name_level.upper())
+    if _handler is not None:
+        return _handler
+
+    output = logging.StreamHandler(sys.stdout)
+    output.setFormatter(TextFormatter() if fmt == "text" else JsonFormatter())
+    _handler = NonBlockingQueueHandler(queue.Queue(maxsize=queue_size))
+    _handler.addFilter(SamplingFilter(sample_rates or {}))
+    _handler.addFilter(ContextFilter())
+    root.handlers = [_handler]
+    # uvicorn installs its own synchronous stream handlers; send those records here too
+    for name in ("uvicorn", "uvicorn.error", "uvicorn.access"):
+        logger = logging.getLogger(name)
+        logger.handlers = []
+        logger.propagate = True
+
+    _listener = logging.handlers.QueueListener(_handler.queue, output, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _handler
+
+
+def configure_logging() -> NonBlockingQueueHandler:
+    """setup_logging from Settings, for the API and the Celery worker."""
+    from app.config import settings
+    from app.utils.metrics import register_stats
+
+    first = _handler is None
+    handler = setup_logging(
+        settings.LOG_LEVEL,
+        settings.LOG_LEVELS,
+        settings.LOG_FORMAT,
+        settings.LOG_SAMPLE_RATES,
+        settings.LOG_QUEUE_SIZE,
+    )
+    if first:
+        register_stats("log_queue", "Log records waiting for the writer thread", handler.stats, counters=("dropped",))
+    return handler
+
+
+def stop_logging() -> None:
+    """Flush what is queued and stop the listener thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+# -----------------------------
+# Correlation ids
+# -----------------------------
+_REQUEST_ID = re.compile(r"^[\w\-.:]{1,128}$")
+
+
+def new_id() -> str:
+    return uuid.uuid4().hex[:16]
+
+
+class RequestIdMiddleware:
+    """
+    Gives every HTTP request and WebSocket an id (the caller's X-Request-ID
+    when it looks sane), exposes it to log records and echoes it back.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] not in ("http", "websocket"):
+            await self.app(scope, receive, send)
+            return
+
+        incoming = None
+        for name, value in scope["headers"]:
+            if name == b"x-request-id":
+                incoming = value.decode("latin-1")
+                break
+        request_id = incoming if incoming and _REQUEST_ID.match(incoming) else new_id()
+        token = request_id_var.set(request_id)
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                message.setdefault("headers", [])
+                message["headers"] = list(message["headers"]) + [(b"x-request-id", request_id.encode())]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper if scope["type"] == "http" else send)
+        finally:
+            request_id_var.reset(token)
+
+
+@contextlib.contextmanager
+def log_context(job: Optional[str] = None, request_id: Optional[str] = None):
+    """Tag the logs of one scheduler job or task run, and of the request that queued it."""
+    job_token = job_id_var.set(f"{job}:{new_id()}") if job else None
+    request_token = request_id_var.set(request_id) if request_id else None
+    try:
+        yield
+    finally:
+        if job_token is not None:
+            job_id_var.reset(job_token)
+        if request_token is not None:
+            request_id_var.reset(request_token)
+
+
+def job_context(name: str):
+    """Decorator form of log_context for scheduler jobs: each run gets its own job id."""
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            with log_context(job=name):
+                return await func(*args, **kwargs)
+        return wrapper
+    return decorator
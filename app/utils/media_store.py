@@ -0,0 +1,153 @@
+import asyncio
+import hashlib
+import logging
+import os
+import uuid
+from dataclasses import dataclass
+from pathlib import Path
+from typing import AsyncIterator, Optional
+
+logger = logging.getLogger(__name__)
+
+ALLOWED_MEDIA_PREFIXES = ("image/", "video/")
+
+
+class MediaTooLarge(Exception):
+    pass
+
+
+class MediaProcessingError(Exception):
+    pass
+
+
+@dataclass
+class StoredBlob:
+    sha256: str
+    size: int
+    storage_key: str
+    # False when identical content was already on disk and the upload was discarded
+    created: bool
+
+
+def sniff_content_type(head: bytes, declared: Optional[str]) -> Optional[str]:
+    """
+    The upload's media type: libmagic's guess from the first bytes when
+    python-magic is installed, else the declared Content-Type.
+    """
+    declared = (declared or "").split(";")[0].strip().lower() or None
+    try:
+        import magic
+    except ImportError:
+        return declared
+    try:
+        return magic.from_buffer(head, mime=True) or declared
+    except Exception as e:
+        logger.warning("Media type detection failed: %s", e)
+        return declared
+
+
+class LocalMediaStore:
+    """
+    Content-addressed files on local disk (a volume nginx can also read).
+    Uploads stream into tmp/ while being hashed, then are renamed to
+    objects/ab/cd/<sha256>; a second upload of the same bytes is discarded.
+    """
+
+    def __init__(self, root: str, buffer_size: int = 1024 * 1024):
+        self.root = Path(root)
+        self.buffer_size = buffer_size
+        self.tmp_dir = self.root / "tmp"
+
+    @staticmethod
+    def key_for(sha256: str, suffix: str = "") -> str:
+        return f"objects/{sha256[:2]}/{sha256[2:4]}/{sha256}{suffix}"
+
+    def path(self, key: str) -> Path:
+        return self.root / key
+
+    async def save_stream(self, chunks: AsyncIterator[bytes], max_bytes: int, head: bytes = b"") -> StoredBlob:
+        """
+        Write an upload to disk without holding it in memory. Chunks are
+        gathered into `buffer_size` blocks, and each block is hashed and written
+        in a worker thread so the event loop never waits on disk.
+        """
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.tmp_dir / uuid.uuid4().hex
+        digest = hashlib.sha256()
+        size = 0
+        pending = bytearray(head)
+
+        def write_block(handle, block: bytes):
+            digest.update(block)
+            handle.write(block)
+
+        handle = await asyncio.to_thread(open, tmp_path, "wb")
+        try:
+            size = len(pending)
+            async for chunk in chunks:
+                size += len(chunk)
+                if size > max_bytes:
+                    raise MediaTooLarge(f"Uploads are limited to {max_bytes} bytes")
+                pending += chunk
+                if len(pending) >= self.buffer_size:
+                    block, pending = bytes(pending), bytearray()
+                    await asyncio.to_thread(write_block, handle, block)
+            if size > max_bytes:
+                raise MediaTooLarge(f"Uploads are limited to {max_bytes} bytes")
+            if pending:
+                await asyncio.to_thread(write_block, handle, bytes(pending))
+            await asyncio.to_thread(self._close, handle)
+        except BaseException:
+            await asyncio.to_thread(handle.close)
+            await asyncio.to_thread(tmp_path.unlink, True)
+            raise
+
+        sha256 = digest.hexdigest()
+        key = self.key_for(sha256)
+        created = await asyncio.to_thread(self._commit, tmp_path, self.path(key))
+        return StoredBlob(sha256, size, key, created)
+
+    @staticmethod
+    def _close(handle) -> None:
+        handle.flush()
+        os.fsync(handle.fileno())
+        handle.close()
+
+    @staticmethod
+    def _commit(tmp_path: Path, final: Path) -> bool:
+        if final.exists():
+            tmp_path.unlink()
+            return False
+        final.parent.mkdir(parents=True, exist_ok=True)
+        os.replace(tmp_path, final)
+        return True
+
+    async def make_thumbnail(self, key: str, ffmpeg: str = "ffmpeg", width: int = 320, timeout: float = 120) -> str:
+        """
+        Render a JPEG thumbnail of an image or a video's first frame with
+        ffmpeg, in a subprocess so it never runs on the event loop.
+        """
+        thumb_key = f"{key}.thumb.jpg"
+        self.tmp_dir.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.tmp_dir / f"{uuid.uuid4().hex}.jpg"
+        try:
+            process = await asyncio.create_subprocess_exec(
+                ffmpeg, "-v", "error", "-y", "-i", str(self.path(key)),
+                "-frames:v", "1", "-vf", f"scale='min({width},iw)':-2", str(tmp_path),
+                stdout=asyncio.subprocess.DEVNULL,
+                stderr=asyncio.subprocess.PIPE,
+            )
+        except FileNotFoundError:
+            raise MediaProcessingError(f"{ffmpeg} is not installed")
+        try:
+            _, stderr = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            await process.wait()
+            await asyncio.to_thread(tmp_path.unlink, True)
+            raise MediaProcessingError(f"Thumbnailing took longer than {timeout}s")
+        if process.returncode != 0:
+            await asyncio.to_thread(tmp_path.unlink, True)
+            raise MediaProcessingError(stderr.decode(errors="replace").strip()[-500:] or f"{ffmpeg} exited with {process.returncode}")
+        await asyncio.to_thread(os.replace, tmp_path, self.path(thumb_key))
+        return thumb_key
@@ -0,0 +1,274 @@
+import time
+from contextvars import ContextVar
+from typing import Callable, Dict, Iterable, Optional
+from prometheus_client import CONTENT_TYPE_LATEST, REGISTRY, Counter, Gauge, Histogram, generate_latest
+from prometheus_client.core import CounterMetricFamily, GaugeMetricFamily
+from sqlalchemy import event
+from starlette.requests import Request
+from starlette.responses import Response
+
+# -----------------------------
+# HTTP requests
+# -----------------------------
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "Time from request start until the response body was sent",
+    ["method", "route", "status"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "http_requests_in_flight",
+    "HTTP requests currently being served",
+)
+HTTP_DB_QUERIES = Histogram(
+    "http_request_db_queries",
+    "Database statements executed while serving a request",
+    ["route"],
+    buckets=(0, 1, 2, 3, 5, 8, 13, 21, 50, 100),
+)
+HTTP_DB_SECONDS = Histogram(
+    "http_request_db_seconds",
+    "Time a request spent waiting on database statements",
+    ["route"],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 5),
+)
+
+# -----------------------------
+# Database
+# -----------------------------
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Duration of individual database statements",
+    ["engine"],
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1, 5),
+)
+
+# -----------------------------
+# Scheduler
+# -----------------------------
+PUBLISH_LATENESS = Histogram(
+    "scheduler_publish_lateness_seconds",
+    "Delay between a post's scheduled_time and the moment it was published",
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300),
+)
+POSTS_PUBLISHED = Counter(
+    "scheduler_posts_published_total",
+    "Scheduled posts published by the dispatcher",
+)
+TIMER_PENDING = Gauge(
+    "scheduler_timer_pending",
+    "Due times currently cached in the in-memory timer heap",
+)
+SCHEDULER_TICK_SECONDS = Histogram(
+    "scheduler_tick_duration_seconds",
+    "Duration of one publish_scheduled_posts run",
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+SCHEDULER_TICK_POSTS = Histogram(
+    "scheduler_tick_posts",
+    "Due posts claimed by one publish_scheduled_posts run",
+    buckets=(0, 1, 5, 10, 50, 100, 500, 1000, 5000, 10000),
+)
+
+# -----------------------------
+# WebSockets
+# -----------------------------
+WS_SEND_SECONDS = Histogram(
+    "ws_send_duration_seconds",
+    "Time to write one event to a client socket",
+    buckets=(0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5),
+)
+
+# -----------------------------
+# Publish pipeline
+# -----------------------------
+PIPELINE_JOBS = Counter(
+    "publish_pipeline_jobs_total",
+    "Platform publish calls by outcome (done, pending = retry scheduled, dead)",
+    ["platform", "outcome"],
+)
+PIPELINE_CALL_SECONDS = Histogram(
+    "publish_pipeline_call_seconds",
+    "Duration of platform publish calls",
+    ["platform"],
+    buckets=(0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10, 30),
+)
+
+# -----------------------------
+# Background tasks
+# -----------------------------
+TASKS = Counter(
+    "tasks_total",
+    "Background tasks by outcome (enqueued, rejected, succeeded, failed)",
+    ["task", "outcome"],
+)
+TASK_WAIT_SECONDS = Histogram(
+    "task_wait_seconds",
+    "Time a task spent queued before a worker started it",
+    ["task"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
+TASK_RUN_SECONDS = Histogram(
+    "task_run_seconds",
+    "Task execution time",
+    ["task"],
+    buckets=(0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60),
+)
+
+
+# -----------------------------
+# In-process stats (caches, pools)
+# -----------------------------
+class StatsCollector:
+    """
+    Reads a component's stats() dict at scrape time and exposes it as metrics.
+    With `label`, stats() returns {label value: {name: value}} instead.
+    """
+
+    def __init__(
+        self,
+        prefix: str,
+        documentation: str,
+        stats: Callable[[], Dict],
+        counters: Iterable[str] = (),
+        label: Optional[str] = None,
+    ):
+        self.prefix = prefix
+        self.documentation = documentation
+        self.stats = stats
+        self.counters = set(counters)
+        self.label = label
+
+    def describe(self):
+        # Skips the collect() that register() would otherwise run at import time
+        return []
+
+    def collect(self):
+        series = self.stats() if self.label else {None: self.stats()}
+        families = {}
+        for label_value, values in series.items():
+            for name, value in values.items():
+                family = families.get(name)
+                if family is None:
+                    kind = CounterMetricFamily if name in self.counters else GaugeMetricFamily
+                    labels = [self.label] if self.label else None
+                    family = families[name] = kind(f"{self.prefix}_{name}", f"{self.documentation} ({name})", labels=labels)
+                family.add_metric([label_value] if self.label else [], value)
+        yield from families.values()
+
+
+def register_stats(
+    prefix: str,
+    documentation: str,
+    stats: Callable[[], Dict],
+    counters: Iterable[str] = (),
+    label: Optional[str] = None,
+):
+    REGISTRY.register(StatsCollector(prefix, documentation, stats, counters, label))
+
+
+# -----------------------------
+# Per-request timing
+# -----------------------------
+class _DbTally:
+    __slots__ = ("queries", "seconds")
+
+    def __init__(self):
+        self.queries = 0
+        self.seconds = 0.0
+
+
+_db_tally: ContextVar[Optional[_DbTally]] = ContextVar("db_tally", default=None)
+
+
+def instrument_engine(engine, name: str) -> None:
+    """Time every statement on `engine` and add it to the current request's tally."""
+    observe = DB_QUERY_SECONDS.labels(name).observe
+
+    @event.listens_for(engine.sync_engine, "before_cursor_execute")
+    def _before(conn, cursor, statement, parameters, context, executemany):
+        conn.info.setdefault("query_start", []).append(time.perf_counter())
+
+    @event.listens_for(engine.sync_engine, "after_cursor_execute")
+    def _after(conn, cursor, statement, parameters, context, executemany):
+        elapsed = time.perf_counter() - conn.info["query_start"].pop()
+        observe(elapsed)
+        tally = _db_tally.get()
+        if tally is not None:
+            tally.queries += 1
+            tally.seconds += elapsed
+
+    @event.listens_for(engine.sync_engine, "handle_error")
+    def _error(context):
+        starts = context.connection.info.get("query_start") if context.connection is not None else None
+        if starts:
+            starts.pop()
+
+
+def route_label(scope) -> str:
+    """The matched route template, so /media/1 and /media/2 share one series."""
+    route = scope.get("route")
+    if route is not None:
+        return route.path
+    if "endpoint" not in scope:
+        return "unmatched"
+    if scope.get("root_path", "") != scope.get("app_root_path", scope.get("root_path", "")):
+        return f"{scope['root_path']}/*"  # a mounted app such as /static
+    return scope["path"]
+
+
+class MetricsMiddleware:
+    """
+    Records latency, status and database load per route. Plain ASGI rather
+    than BaseHTTPMiddleware, so it adds no extra task or body copy per request;
+    streaming responses are timed until their last chunk.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        # Labelled children per (method, route, status); labels() is the costly part
+        self._series: Dict[tuple, tuple] = {}
+
+    def _observers(self, method: str, route: str, status: int):
+        key = (method, route, status)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = (
+                HTTP_REQUEST_SECONDS.labels(method, route, str(status)).observe,
+                HTTP_DB_QUERIES.labels(route).observe,
+                HTTP_DB_SECONDS.labels(route).observe,
+            )
+        return series
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        tally = _DbTally()
+        token = _db_tally.set(tally)
+        HTTP_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_FLIGHT.dec()
+            _db_tally.reset(token)
+            observe_latency, observe_queries, observe_db = self._observers(scope["method"], route_label(scope), status)
+            observe_latency(elapsed)
+            observe_queries(tally.queries)
+            observe_db(tally.seconds)
+
+
+async def metrics_endpoint(request: Request) -> Response:
+    """Prometheus scrape endpoint."""
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
@@ -0,0 +1,636 @@
+import asyncio
+import html
+import logging
+import math
+import random
+import re
+import time
+import uuid
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+from sqlalchemy import bindparam, update
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.database import dialect_insert
+from app.models.account import Account, Platform
+from app.models.outbox import PublishOutbox
+from app.models.post import Post
+from app.utils.analytics import PostEvent, lateness_seconds, record_post_events
+from app.utils.metrics import PIPELINE_CALL_SECONDS, PIPELINE_JOBS
+from app.utils.rate_limit import MemoryRateLimitBackend, RateLimitBackend
+from app.utils.user_version import bump_user_versions
+
+logger = logging.getLogger(__name__)
+
+
+class PublishError(Exception):
+    """A platform call failed in a way that is worth retrying."""
+
+
+class PermanentPublishError(PublishError):
+    """A platform call failed for good (bad credentials, rejected content)."""
+
+
+@dataclass
+class PublishJob:
+    """Everything a worker needs to publish one outbox row."""
+    outbox_id: int
+    post_id: int
+    account_id: int
+    platform: str
+    idempotency_key: str
+    attempts: int
+    user_id: int
+    content: str
+    media_url: Optional[str]
+    access_token: Optional[str]
+    scheduled_time: Optional[datetime]
+    # When the outbox row was written; nothing can have been published before
+    queued_at: Optional[datetime] = None
+
+
+def idempotency_key(post_id: int) -> str:
+    return f"post:{post_id}"
+
+
+# -----------------------------
+# Platform clients
+# -----------------------------
+class PlatformClient(ABC):
+    """Publishes one post on a platform and returns the platform's id for it."""
+
+    @abstractmethod
+    async def publish(self, job: PublishJob) -> str:
+        """Raise PublishError to retry, PermanentPublishError to give up."""
+
+
+class FakePlatformClient(PlatformClient):
+    """
+    Simulated platform with configurable latency and failure rate. Honours the
+    idempotency key like a real API would, so a retried job returns the id of
+    the first successful call instead of creating a second post.
+    """
+
+    def __init__(self, latency: float = 0.2, failure_rate: float = 0.0, rng: Optional[random.Random] = None):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.rng = rng or random.Random()
+        self.published: Dict[str, str] = {}
+        self.calls = 0
+
+    async def publish(self, job: PublishJob) -> str:
+        self.calls += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        if self.failure_rate and self.rng.random() < self.failure_rate:
+            raise PublishError("Simulated platform error")
+        if job.idempotency_key not in self.published:
+            self.published[job.idempotency_key] = uuid.uuid4().hex
+        return self.published[job.idempotency_key]
+
+
+_URL = re.compile(r"https?://\S+")
+
+
+def _same_text(ours: str, theirs: str) -> bool:
+    """Twitter returns text HTML-escaped with links rewritten to t.co, so links compare as placeholders."""
+    return _URL.sub("<url>", ours).strip() == _URL.sub("<url>", html.unescape(theirs)).strip()
+
+
+class TwitterClient(PlatformClient):
+    """
+    Posts through tweepy's async client (needs `tweepy[async]`) using the
+    account's OAuth 2.0 user token. The v2 API has no idempotency header, so
+    a retry first looks for the post among the account's tweets since the job
+    was queued: a call that succeeded remotely but whose answer was lost (a
+    timeout, a crash before the outbox row was marked done) returns the
+    existing tweet instead of posting it twice. If the lookup itself fails the
+    retry is postponed, never sent blind.
+    """
+
+    # Platform clocks may run behind ours
+    CLOCK_SKEW = timedelta(minutes=5)
+
+    async def publish(self, job: PublishJob) -> str:
+        try:
+            import tweepy
+            from tweepy.asynchronous import AsyncClient
+        except ImportError as e:
+            raise PermanentPublishError(f"tweepy async support is not installed: {e}")
+
+        if not job.access_token:
+            raise PermanentPublishError("Account has no access token")
+        client = AsyncClient(bearer_token=job.access_token)
+        try:
+            if job.attempts > 1:
+                existing = await self._find_published(client, job)
+                if existing is not None:
+                    return existing
+            response = await client.create_tweet(text=job.content, user_auth=False)
+        except (tweepy.TooManyRequests, tweepy.TwitterServerError) as e:
+            raise PublishError(str(e))
+        except tweepy.HTTPException as e:
+            raise PermanentPublishError(str(e))
+        return str(response.data["id"])
+
+    async def _find_published(self, client, job: PublishJob) -> Optional[str]:
+        me = await client.get_me(user_auth=False)
+        params = {"max_results": 100, "user_auth": False}
+        if job.queued_at is not None:
+            # Naive on SQLite, where timestamps are stored in UTC
+            queued_at = job.queued_at if job.queued_at.tzinfo else job.queued_at.replace(tzinfo=timezone.utc)
+            params["start_time"] = queued_at - self.CLOCK_SKEW
+        response = await client.get_users_tweets(me.data.id, **params)
+        for tweet in response.data or ():
+            if _same_text(job.content, tweet.text):
+                return str(tweet.id)
+        return None
+
+
+def build_platform_clients(kind: str, latency: float = 0.2, failure_rate: float = 0.0) -> Dict[str, PlatformClient]:
+    """One client per platform; `live` only has a real client for Twitter so far."""
+    clients: Dict[str, PlatformClient] = {
+        platform.value: FakePlatformClient(latency, failure_rate) for platform in Platform
+    }
+    if kind == "live":
+        clients[Platform.twitter.value] = TwitterClient()
+    elif kind != "fake":
+        raise ValueError(f"Unknown PUBLISH_PLATFORM_CLIENT '{kind}'")
+    return clients
+
+
+# -----------------------------
+# Outbox writes and claims
+# -----------------------------
+def _insert_ignore(db: AsyncSession):
+    """INSERT that skips rows whose idempotency key is already queued."""
+    return dialect_insert(db, PublishOutbox).on_conflict_do_nothing(index_elements=["idempotency_key"])
+
+
+async def enqueue_posts(db: AsyncSession, posts: Sequence[Tuple[int, Optional[int]]], now: datetime) -> List[int]:
+    """
+    Add outbox rows for (post_id, account_id) pairs inside the caller's
+    transaction, so a post is queued exactly when its status change commits.
+    Posts without a usable account are marked failed (and counted as such in
+    the rollup). Returns queued post ids.
+    """
+    account_ids = {account_id for _, account_id in posts if account_id is not None}
+    platforms: Dict[int, str] = {}
+    if account_ids:
+        result = await db.execute(select(Account.id, Account.platform).filter(Account.id.in_(account_ids)))
+        platforms = {row.id: row.platform.value for row in result}
+
+    rows, orphaned = [], []
+    for post_id, account_id in posts:
+        if account_id in platforms:
+            rows.append({
+                "post_id": post_id,
+                "account_id": account_id,
+                "platform": platforms[account_id],
+                "idempotency_key": idempotency_key(post_id),
+                "status": "pending",
+                "attempts": 0,
+                "next_attempt_at": now,
+            })
+        else:
+            orphaned.append(post_id)
+
+    if rows:
+        await db.execute(_insert_ignore(db), rows)
+    if orphaned:
+        result = await db.execute(
+            update(Post)
+            .where(Post.id.in_(orphaned))
+            .values(status="failed")
+            .returning(Post.user_id, Post.account_id)
+            .execution_options(synchronize_session=False)
+        )
+        await record_post_events(db, [PostEvent(row.user_id, row.account_id, "failed", now) for row in result])
+    return [row["post_id"] for row in rows]
+
+
+async def claim_outbox(
+    db: AsyncSession,
+    platform: str,
+    now: datetime,
+    limit: int,
+    lease_seconds: float,
+) -> List[PublishJob]:
+    """
+    Move up to `limit` claimable rows of one platform to in_flight with a lease
+    and load what the workers need. Pending rows are claimable once due;
+    in_flight rows once their lease ran out (the worker holding them died).
+    """
+    due = (
+        select(PublishOutbox.id)
+        .filter(PublishOutbox.status.in_(("pending", "in_flight")))
+        .filter(PublishOutbox.next_attempt_at <= now)
+        .filter(PublishOutbox.platform == platform)
+        .order_by(PublishOutbox.next_attempt_at)
+        .limit(limit)
+    )
+    if db.bind.dialect.name == "postgresql":
+        due = due.with_for_update(skip_locked=True)
+    result = await db.execute(
+        update(PublishOutbox)
+        .where(PublishOutbox.id.in_(due.scalar_subquery()))
+        .values(
+            status="in_flight",
+            attempts=PublishOutbox.attempts + 1,
+            next_attempt_at=now + timedelta(seconds=lease_seconds),
+        )
+        .returning(
+            PublishOutbox.id,
+            PublishOutbox.post_id,
+            PublishOutbox.account_id,
+            PublishOutbox.platform,
+            PublishOutbox.idempotency_key,
+            PublishOutbox.attempts,
+            PublishOutbox.created_at,
+        )
+        .execution_options(synchronize_session=False)
+    )
+    claimed = result.all()
+    if not claimed:
+        return []
+
+    result = await db.execute(
+        select(Post.id, Post.user_id, Post.content, Post.media_url, Post.scheduled_time, Account.access_token)
+        .join(Account, Account.id == Post.account_id)
+        .filter(Post.id.in_([row.post_id for row in claimed]))
+    )
+    posts = {row.id: row for row in result}
+    jobs = []
+    for row in claimed:
+        post = posts.get(row.post_id)
+        if post is None:
+            continue
+        jobs.append(PublishJob(
+            outbox_id=row.id,
+            post_id=row.post_id,
+            account_id=row.account_id,
+            platform=row.platform,
+            idempotency_key=row.idempotency_key,
+            attempts=row.attempts,
+            user_id=post.user_id,
+            content=post.content,
+            media_url=post.media_url,
+            access_token=post.access_token,
+            scheduled_time=post.scheduled_time,
+            queued_at=row.created_at,
+        ))
+    return jobs
+
+
+@dataclass
+class _Outcome:
+    job: PublishJob
+    status: str  # done | pending (retry) | dead
+    external_id: Optional[str] = None
+    error: Optional[str] = None
+    next_attempt_at: Optional[datetime] = None
+
+
+# -----------------------------
+# Pipeline
+# -----------------------------
+class PublishPipeline:
+    """
+    Drains the publish outbox with a bounded pool of workers per platform.
+
+    A poller claims due rows (SKIP LOCKED on Postgres, so several processes can
+    share the outbox) into one bounded queue per platform. Calls are throttled
+    by a token bucket per platform and one per account, kept in `rate_backend`
+    (Redis when several processes publish, so the limits hold in total); rows
+    of an account that is over its budget go back to the outbox with a delay
+    instead of blocking a worker. Failures retry with exponential backoff and jitter until
+    `max_attempts`, then the row is dead-lettered and the post marked failed.
+    Outcomes are written in batches by a single writer task.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        clients: Dict[str, PlatformClient],
+        workers_per_platform: int = 8,
+        queue_size: int = 200,
+        account_rate_per_minute: float = 10,
+        platform_rate_per_minute: float = 3000,
+        max_attempts: int = 5,
+        retry_base: float = 2.0,
+        retry_max: float = 300.0,
+        lease_seconds: float = 300,
+        call_timeout: float = 30.0,
+        poll_interval: float = 5.0,
+        on_published: Optional[Callable[[List[PublishJob], datetime], Awaitable[None]]] = None,
+        on_failed: Optional[Callable[[List[PublishJob]], Awaitable[None]]] = None,
+        max_accounts: int = 10000,
+        rate_backend: Optional[RateLimitBackend] = None,
+    ):
+        self.session_factory = session_factory
+        self.clients = clients
+        self.workers_per_platform = workers_per_platform
+        self.queue_size = queue_size
+        self.account_rate = account_rate_per_minute / 60.0
+        self.account_burst = max(1.0, float(account_rate_per_minute))
+        self.platform_rate = platform_rate_per_minute / 60.0
+        self.platform_burst = max(1.0, float(platform_rate_per_minute))
+        self.max_attempts = max_attempts
+        self.retry_base = retry_base
+        self.retry_max = retry_max
+        self.lease_seconds = lease_seconds
+        self.call_timeout = call_timeout
+        self.poll_interval = poll_interval
+        self.on_published = on_published
+        self.on_failed = on_failed
+        self.rate_backend = rate_backend or MemoryRateLimitBackend(max_keys=max_accounts + len(clients))
+        self.rate_errors = 0
+        self._warned_at = 0.0
+        self.queues: Dict[str, asyncio.Queue] = {}
+        self.busy: Dict[str, int] = {platform: 0 for platform in clients}
+        self._outcomes: Optional[asyncio.Queue] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._backlog = False
+        self._tasks: List[asyncio.Task] = []
+        self.counts = {"claimed": 0, "done": 0, "retried": 0, "dead": 0, "deferred": 0}
+
+    # Lifecycle
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._wakeup = asyncio.Event()
+        self._outcomes = asyncio.Queue()
+        for platform in self.clients:
+            self.queues[platform] = asyncio.Queue(maxsize=self.queue_size)
+            for _ in range(self.workers_per_platform):
+                self._tasks.append(asyncio.create_task(self._worker(platform)))
+        self._tasks.append(asyncio.create_task(self._writer()))
+        self._tasks.append(asyncio.create_task(self._poller()))
+
+    async def stop(self) -> None:
+        """Stop workers and flush recorded outcomes; unfinished rows are re-claimed after their lease."""
+        tasks, self._tasks = self._tasks, []
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if self._outcomes is not None and not self._outcomes.empty():
+            batch = []
+            while not self._outcomes.empty():
+                batch.append(self._outcomes.get_nowait())
+            await self._record(batch)
+
+    def wake(self) -> None:
+        """Poll the outbox now, e.g. right after rows were enqueued."""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def drain(self) -> None:
+        """Wait until every queued job has run and its outcome is written (tests, benchmarks)."""
+        for queue in self.queues.values():
+            await queue.join()
+        if self._outcomes is not None:
+            await self._outcomes.join()
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {
+            platform: {"queued": queue.qsize(), "busy": self.busy[platform]}
+            for platform, queue in self.queues.items()
+        }
+
+    # Rate limits
+    async def _take(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        """One token from a shared bucket; if the backend is unreachable calls go ahead, as HTTP requests do."""
+        try:
+            return await self.rate_backend.hit(key, rate, capacity)
+        except Exception as e:
+            self.rate_errors += 1
+            if time.monotonic() - self._warned_at > 60:
+                self._warned_at = time.monotonic()
+                logger.warning("Publish rate limit backend unavailable, not limiting: %s", e)
+            return True, 0.0
+
+    async def _acquire_platform(self, platform: str) -> None:
+        while True:
+            ok, wait = await self._take(f"platform:{platform}", self.platform_rate, self.platform_burst)
+            if ok:
+                return
+            await asyncio.sleep(wait)
+
+    # Poller
+    async def _poller(self) -> None:
+        while True:
+            try:
+                claimed = await self.poll_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Publish outbox poll failed")
+                claimed = 0
+            if claimed:
+                continue
+            self._wakeup.clear()
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+            except asyncio.TimeoutError:
+                pass
+
+    async def poll_once(self) -> int:
+        """Claim rows for every platform with free queue slots; returns rows queued."""
+        now = datetime.now(timezone.utc)
+        queued = 0
+        self._backlog = False
+        for platform, queue in self.queues.items():
+            free = queue.maxsize - queue.qsize()
+            if free <= 0:
+                self._backlog = True
+                continue
+            async with self.session_factory() as db:
+                try:
+                    jobs = await claim_outbox(db, platform, now, free, self.lease_seconds)
+                    ready, deferred = await self._admit(jobs)
+                    if deferred:
+                        await self._defer(db, deferred, now)
+                    await db.commit()
+                except Exception:
+                    await db.rollback()
+                    raise
+            self.counts["claimed"] += len(jobs)
+            self.counts["deferred"] += sum(len(group) for group in deferred.values())
+            if len(jobs) == free:
+                self._backlog = True
+            for job in ready:
+                queue.put_nowait(job)
+            queued += len(ready)
+        return queued
+
+    async def _admit(self, jobs: Iterable[PublishJob]):
+        """Split claimed jobs into those within their account's budget and the rest, grouped by delay."""
+        ready: List[PublishJob] = []
+        deferred: Dict[float, List[int]] = {}
+        backlog: Dict[int, int] = {}
+        for job in jobs:
+            ok, wait = await self._take(f"account:{job.account_id}", self.account_rate, self.account_burst)
+            if ok:
+                ready.append(job)
+                continue
+            # Space an account's surplus out at its rate so the rows come back
+            # one token at a time instead of all at once; whole seconds keep
+            # the number of UPDATEs small.
+            position = backlog.get(job.account_id, 0)
+            backlog[job.account_id] = position + 1
+            delay = math.ceil(wait + position / self.account_rate) if self.account_rate else self.poll_interval
+            deferred.setdefault(delay, []).append(job.outbox_id)
+        return ready, deferred
+
+    async def _defer(self, db: AsyncSession, deferred: Dict[float, List[int]], now: datetime) -> None:
+        """Hand rate-limited rows back to the outbox without charging an attempt."""
+        for wait, ids in deferred.items():
+            await db.execute(
+                update(PublishOutbox)
+                .where(PublishOutbox.id.in_(ids))
+                .values(
+                    status="pending",
+                    attempts=PublishOutbox.attempts - 1,
+                    next_attempt_at=now + timedelta(seconds=wait),
+                )
+                .execution_options(synchronize_session=False)
+            )
+
+    # Workers
+    def _retry_delay(self, attempts: int) -> float:
+        delay = min(self.retry_max, self.retry_base * (2 ** max(0, attempts - 1)))
+        return delay * random.uniform(0.5, 1.0)
+
+    async def _worker(self, platform: str) -> None:
+        queue = self.queues[platform]
+        client = self.clients[platform]
+        while True:
+            job = await queue.get()
+            self.busy[platform] += 1
+            try:
+                outcome = await self._publish(client, job)
+                self._outcomes.put_nowait(outcome)
+            finally:
+                self.busy[platform] -= 1
+                queue.task_done()
+                if self._backlog:
+                    self.wake()
+
+    async def _publish(self, client: PlatformClient, job: PublishJob) -> _Outcome:
+        await self._acquire_platform(job.platform)
+        start = time.perf_counter()
+        try:
+            external_id = await asyncio.wait_for(client.publish(job), timeout=self.call_timeout)
+        except asyncio.CancelledError:
+            raise
+        except PermanentPublishError as e:
+            outcome = _Outcome(job, "dead", error=str(e))
+        except Exception as e:
+            error = str(e) or type(e).__name__
+            if job.attempts >= self.max_attempts:
+                outcome = _Outcome(job, "dead", error=error)
+            else:
+                retry_at = datetime.now(timezone.utc) + timedelta(seconds=self._retry_delay(job.attempts))
+                outcome = _Outcome(job, "pending", error=error, next_attempt_at=retry_at)
+        else:
+            outcome = _Outcome(job, "done", external_id=external_id)
+        PIPELINE_CALL_SECONDS.labels(job.platform).observe(time.perf_counter() - start)
+        PIPELINE_JOBS.labels(job.platform, outcome.status).inc()
+        return outcome
+
+    # Outcome writer
+    async def _writer(self) -> None:
+        while True:
+            batch = [await self._outcomes.get()]
+            while not self._outcomes.empty() and len(batch) < 500:
+                batch.append(self._outcomes.get_nowait())
+            try:
+                await self._record(batch)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                # The rows stay in_flight and are retried once their lease runs out
+                logger.exception("Failed to record %d publish outcomes", len(batch))
+            finally:
+                for _ in batch:
+                    self._outcomes.task_done()
+
+    async def _record(self, batch: List[_Outcome]) -> None:
+        """Write a batch of outcomes to the outbox and posts in one transaction, then notify."""
+        now = datetime.now(timezone.utc)
+        outbox = PublishOutbox.__table__
+        posts = Post.__table__
+        done = [o.job for o in batch if o.status == "done"]
+        dead = [o.job for o in batch if o.status == "dead"]
+
+        async with self.session_factory() as db:
+            try:
+                await db.execute(
+                    outbox.update()
+                    .where(outbox.c.id == bindparam("oid"))
+                    .values(
+                        status=bindparam("new_status"),
+                        external_id=bindparam("ext"),
+                        last_error=bindparam("err"),
+                        next_attempt_at=bindparam("retry_at"),
+                    ),
+                    [
+                        {
+                            "oid": o.job.outbox_id,
+                            "new_status": o.status,
+                            "ext": o.external_id,
+                            "err": o.error,
+                            "retry_at": o.next_attempt_at or now,
+                        }
+                        for o in batch
+                    ],
+                )
+                # Only posts still queued change status (and are counted): a
+                # post deleted or already resolved meanwhile is left alone.
+                if done:
+                    result = await db.execute(
+                        posts.update()
+                        .where(posts.c.id.in_([job.post_id for job in done]))
+                        .where(posts.c.status == "queued")
+                        .values(status="published", published_time=now)
+                        .returning(posts.c.id)
+                    )
+                    changed = set(result.scalars())
+                    done = [job for job in done if job.post_id in changed]
+                if dead:
+                    result = await db.execute(
+                        posts.update()
+                        .where(posts.c.id.in_([job.post_id for job in dead]))
+                        .where(posts.c.status == "queued")
+                        .values(status="failed")
+                        .returning(posts.c.id)
+                    )
+                    changed = set(result.scalars())
+                    dead = [job for job in dead if job.post_id in changed]
+                await record_post_events(db, [
+                    PostEvent(job.user_id, job.account_id, "published", now, lateness_seconds(job.scheduled_time, now))
+                    for job in done
+                ] + [PostEvent(job.user_id, job.account_id, "failed", now) for job in dead])
+                await bump_user_versions(db, (job.user_id for job in done + dead))
+                await db.commit()
+            except Exception:
+                await db.rollback()
+                raise
+
+        self.counts["done"] += sum(1 for o in batch if o.status == "done")
+        self.counts["dead"] += sum(1 for o in batch if o.status == "dead")
+        self.counts["retried"] += sum(1 for o in batch if o.status == "pending")
+        for outcome in batch:
+            if outcome.status != "done":
+                logger.warning(
+                    "Publishing post id=%s failed (attempt %s, %s): %s",
+                    outcome.job.post_id, outcome.job.attempts, outcome.status, outcome.error,
+                    extra={"event": "post.publish_failed", "post_id": outcome.job.post_id, "platform": outcome.job.platform},
+                )
+        if done and self.on_published:
+            await self.on_published(done, now)
+        if dead and self.on_failed:
+            await self.on_failed(dead)
+
@@ -0,0 +1,315 @@
+import asyncio
+import json
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Callable, Dict, Iterable, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """
+    Classic token bucket: `rate` tokens per second refill up to `capacity`.
+    Not thread-safe; meant to be used from a single event loop.
+    """
+
+    def __init__(self, rate: float, capacity: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self.tokens = capacity
+        self.updated = clock()
+
+    def _refill(self) -> None:
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_acquire(self, tokens: float = 1) -> Tuple[bool, float]:
+        """Take tokens if available; otherwise return how long until they will be."""
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return True, 0.0
+        if self.rate <= 0:
+            return False, float("inf")
+        return False, (tokens - self.tokens) / self.rate
+
+    async def acquire(self, tokens: float = 1) -> None:
+        """Wait until tokens are available, then take them."""
+        while True:
+            ok, wait = self.try_acquire(tokens)
+            if ok:
+                return
+            await asyncio.sleep(wait)
+
+
+# -----------------------------
+# HTTP rate limiting
+# -----------------------------
+class RateLimitBackend(ABC):
+    """Token buckets by key."""
+
+    @abstractmethod
+    async def hit(self, key: str, rate: float, capacity: float) -> Tuple[bool, float]:
+        """Take one token; returns (allowed, seconds until one is free)."""
+
+    async def close(self) -> None:
+        pass
+
+
+class MemoryRateLimitBackend(RateLimitBackend):
+    """Buckets in this process only, least recently used evicted past `max_keys`."""
+
+    def __init__(self, max_keys: int = 100000):
+        self.max_keys = max_keys
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+
+    async def hit(self, key, rate, capacity):
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            bucket = self._buckets[key] = TokenBucket(rate, capacity)
+            if len(self._buckets) > self.max_keys:
+                self._buckets.popitem(last=False)
+        else:
+            self._buckets.move_to_end(key)
+        return bucket.try_acquire()
+
+
+# Refill and take in one round trip, on the Redis clock so workers agree.
+# Lua numbers become integers on the way out, so the wait is returned as a string.
+_REDIS_HIT = """
+local rate = tonumber(ARGV[1])
+local capacity = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local wait = 0
+if tokens >= 1 then
+    tokens = tokens - 1
+    allowed = 1
+else
+    wait = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000) + 1000)
+return {allowed, tostring(wait)}
+"""
+
+
+class RedisRateLimitBackend(RateLimitBackend):
+    """Buckets shared by every worker, each updated atomically by a Lua script."""
+
+    def __init__(self, url: str, prefix: str = "ratelimit:"):
+        import redis.asyncio as redis
+
+        self.client = redis.from_url(url)
+        self.prefix = prefix
+        self._hit = self.client.register_script(_REDIS_HIT)
+
+    async def hit(self, key, rate, capacity):
+        allowed, wait = await self._hit(keys=[self.prefix + key], args=[rate, capacity])
+        return bool(allowed), float(wait)
+
+    async def close(self) -> None:
+        await self.client.aclose()
+
+
+def build_rate_limit_backend(
+    kind: str, redis_url: str, max_keys: int = 100000, prefix: str = "ratelimit:"
+) -> RateLimitBackend:
+    if kind == "redis":
+        return RedisRateLimitBackend(redis_url, prefix)
+    if kind == "memory":
+        return MemoryRateLimitBackend(max_keys)
+    raise ValueError(f"Unknown RATE_LIMIT_BACKEND '{kind}'")
+
+
+class AdmissionController:
+    """
+    Caps the requests one process serves at once. Past the cap a request
+    waits up to `queue_timeout` for a slot and is then turned away, so
+    overload is shed quickly instead of piling up on the database pool.
+    """
+
+    def __init__(self, limit: int, queue_timeout: float = 0.25):
+        self.limit = limit
+        self.queue_timeout = queue_timeout
+        self._slots = asyncio.Semaphore(limit)
+        self.active = 0
+        self.waiting = 0
+        self.admitted = 0
+        self.rejected = 0
+
+    async def acquire(self) -> bool:
+        if self._slots.locked():
+            if self.queue_timeout <= 0:
+                self.rejected += 1
+                return False
+            self.waiting += 1
+            try:
+                await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+            except asyncio.TimeoutError:
+                self.rejected += 1
+                return False
+            finally:
+                self.waiting -= 1
+        else:
+            await self._slots.acquire()
+        self.active += 1
+        self.admitted += 1
+        return True
+
+    def release(self) -> None:
+        self.active -= 1
+        self._slots.release()
+
+    def stats(self) -> Dict[str, int]:
+        return {"limit": self.limit, "active": self.active, "waiting": self.waiting, "admitted": self.admitted, "rejected": self.rejected}
+
+
+def bearer_token(scope) -> Optional[str]:
+    for name, value in scope["headers"]:
+        if name == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+            return token.strip() if scheme.lower() == "bearer" else None
+    return None
+
+
+async def _reject(send, status: int, detail: str, retry_after: float, headers: Iterable[Tuple[bytes, bytes]] = ()) -> None:
+    body = json.dumps({"detail": detail}).encode()
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            *headers,
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+class RateLimiter:
+    """
+    Per-client budgets. Signed-in requests are counted per user (the JWT
+    `sub`), anonymous ones per client IP; `routes` adds a tighter budget per
+    client on top, keyed "METHOD /path" or "/path". If the backend is
+    unreachable requests are let through.
+    """
+
+    def __init__(
+        self,
+        backend: RateLimitBackend,
+        user_per_minute: int,
+        ip_per_minute: int,
+        routes: Optional[Dict[str, int]] = None,
+        verify_token: Optional[Callable[[str], Optional[dict]]] = None,
+    ):
+        self.backend = backend
+        self.user_per_minute = user_per_minute
+        self.ip_per_minute = ip_per_minute
+        self.routes = dict(routes or {})
+        self.verify_token = verify_token
+        self.allowed = 0
+        self.limited = 0
+        self.backend_errors = 0
+        self._warned_at = 0.0
+
+    def _identity(self, scope) -> Tuple[str, int]:
+        token = bearer_token(scope) if self.verify_token is not None else None
+        if token:
+            try:
+                payload = self.verify_token(token)
+            except Exception:
+                payload = None
+            if payload and payload.get("sub") is not None:
+                return f"user:{payload['sub']}", self.user_per_minute
+        client = scope.get("client")
+        return f"ip:{client[0] if client else 'unknown'}", self.ip_per_minute
+
+    async def _hit(self, key: str, per_minute: int) -> Tuple[bool, float]:
+        if per_minute <= 0:
+            return True, 0.0
+        try:
+            return await self.backend.hit(key, per_minute / 60.0, float(per_minute))
+        except Exception as e:
+            self.backend_errors += 1
+            if time.monotonic() - self._warned_at > 60:
+                self._warned_at = time.monotonic()
+                logger.warning("Rate limit backend unavailable, not limiting: %s", e)
+            return True, 0.0
+
+    async def check(self, scope) -> Optional[Tuple[int, float]]:
+        """None when the request may proceed, else (the budget it exceeded, seconds to wait)."""
+        identity, per_minute = self._identity(scope)
+        ok, wait = await self._hit(identity, per_minute)
+        if ok:
+            route = f"{scope['method']} {scope['path']}"
+            route_limit = self.routes.get(route, self.routes.get(scope["path"]))
+            if route_limit is not None:
+                ok, wait = await self._hit(f"{route}|{identity}", route_limit)
+                per_minute = route_limit
+        if ok:
+            self.allowed += 1
+            return None
+        self.limited += 1
+        return per_minute, wait
+
+    def stats(self) -> Dict[str, int]:
+        return {"allowed": self.allowed, "limited": self.limited, "backend_errors": self.backend_errors}
+
+
+class RateLimitMiddleware:
+    """
+    Rate limits and admission control ahead of routing, so a rejected request
+    costs no database work: over budget is 429, over capacity 503, both with
+    Retry-After. Paths under `exempt_prefixes` and WebSockets pass straight
+    through; paths under `unmetered_prefixes` (long uploads and downloads
+    that hold no database connection) are rate limited but take no slot.
+    """
+
+    def __init__(
+        self,
+        app,
+        limiter: Optional[RateLimiter] = None,
+        admission: Optional[AdmissionController] = None,
+        exempt_prefixes: Sequence[str] = (),
+        unmetered_prefixes: Sequence[str] = (),
+    ):
+        self.app = app
+        self.limiter = limiter
+        self.admission = admission
+        self.exempt_prefixes = tuple(exempt_prefixes)
+        self.unmetered_prefixes = tuple(unmetered_prefixes)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(self.exempt_prefixes):
+            await self.app(scope, receive, send)
+            return
+
+        if self.limiter is not None:
+            exceeded = await self.limiter.check(scope)
+            if exceeded is not None:
+                limit, wait = exceeded
+                await _reject(send, 429, "Too many requests", wait, [(b"x-ratelimit-limit", f"{limit};w=60".encode())])
+                return
+
+        if self.admission is None or scope["path"].startswith(self.unmetered_prefixes):
+            await self.app(scope, receive, send)
+            return
+        if not await self.admission.acquire():
+            await _reject(send, 503, "Server is busy, please retry", 1)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.admission.release()
@@ -0,0 +1,210 @@
+from functools import lru_cache
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+from sqlalchemy import func
+from sqlalchemy.future import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.models.post import Post
+from app.models.recurring_post import RecurringPost
+from app.utils.analytics import PostEvent, record_post_events
+
+_WEEKDAYS = ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]
+
+
+class RecurrenceError(ValueError):
+    """The rule cannot be parsed, or repeats more often than allowed."""
+
+
+def as_utc(value: datetime) -> datetime:
+    """Aware UTC; naive datetimes (SQLite) are already UTC."""
+    if value.tzinfo is None:
+        return value.replace(tzinfo=timezone.utc)
+    return value.astimezone(timezone.utc)
+
+
+def exdate_key(value: datetime) -> str:
+    return as_utc(value).isoformat()
+
+
+def _cron_weekdays(field: str) -> str:
+    """
+    Standard cron day-of-week (0 or 7 = Sunday, steps counted from Sunday) as
+    names: APScheduler numbers weekdays from Monday.
+    """
+    days = []
+    for part in field.split(","):
+        base, _, step = part.partition("/")
+        if not (base == "*" or base.replace("-", "").isdigit()):
+            days.append(part)
+            continue
+        first, _, last = base.partition("-")
+        first, last = (0, 6) if base == "*" else (int(first), int(last or (6 if step else first)))
+        if not 0 <= first <= last <= 7:
+            raise RecurrenceError(f"Invalid cron day of week '{part}'")
+        days += [_WEEKDAYS[day % 7] for day in range(first, last + 1, int(step or 1))]
+    return ",".join(days)
+
+
+class Rule:
+    """
+    Occurrences of an RRULE ("FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=0") or a
+    five-field cron expression ("0 9 * * 1"), from `starts_at` on, in wall
+    time of `timezone` so "9:00 every Monday" survives DST changes.
+    """
+
+    def __init__(self, rule: str, starts_at: datetime, timezone_name: str = "UTC"):
+        try:
+            tz = ZoneInfo(timezone_name)
+        except (ZoneInfoNotFoundError, ValueError):
+            raise RecurrenceError(f"Unknown timezone '{timezone_name}'")
+        self.starts_at = as_utc(starts_at).astimezone(tz).replace(microsecond=0)
+        text = rule.strip()
+        self._rrule = self._cron = None
+        if text.upper().startswith(("RRULE:", "FREQ=")):
+            from dateutil.rrule import rrulestr
+
+            try:
+                self._rrule = rrulestr(text, dtstart=self.starts_at)
+            except (ValueError, TypeError) as e:
+                raise RecurrenceError(f"Invalid RRULE: {e}")
+        else:
+            from apscheduler.triggers.cron import CronTrigger
+
+            fields = text.split()
+            if len(fields) != 5:
+                raise RecurrenceError("Expected an RRULE or a cron expression with 5 fields")
+            minute, hour, day, month, day_of_week = fields
+            day_of_week = _cron_weekdays(day_of_week)
+            try:
+                self._cron = CronTrigger(minute=minute, hour=hour, day=day, month=month, day_of_week=day_of_week, timezone=tz)
+            except ValueError as e:
+                raise RecurrenceError(f"Invalid cron expression: {e}")
+
+    def after(self, moment: datetime) -> Optional[datetime]:
+        """First occurrence strictly after `moment`, in UTC; None once the rule has run out."""
+        moment = as_utc(moment)
+        if self._rrule is not None:
+            found = self._rrule.after(moment, inc=False)
+        else:
+            found = self._cron.get_next_fire_time(None, max(moment + timedelta(microseconds=1), self.starts_at))
+        return as_utc(found) if found is not None else None
+
+    def first(self) -> Optional[datetime]:
+        return self.after(self.starts_at - timedelta(seconds=1))
+
+    def upcoming(self, after: datetime, count: int, skip: Iterable[str] = ()) -> List[datetime]:
+        skip = set(skip)
+        times: List[datetime] = []
+        at = self.after(after)
+        while at is not None and len(times) < count:
+            if exdate_key(at) not in skip:
+                times.append(at)
+            at = self.after(at)
+        return times
+
+    def check_interval(self, min_seconds: float) -> None:
+        """Reject rules whose first two occurrences are closer than `min_seconds`."""
+        first = self.first()
+        second = self.after(first) if first is not None else None
+        if first is None:
+            raise RecurrenceError("The rule has no occurrences")
+        if second is not None and (second - first).total_seconds() < min_seconds:
+            raise RecurrenceError(f"Occurrences must be at least {int(min_seconds)} seconds apart")
+
+
+@lru_cache(maxsize=4096)
+def _parsed(rule: str, starts_at: datetime, timezone_name: str) -> Rule:
+    return Rule(rule, starts_at, timezone_name)
+
+
+def rule_for(recurring: RecurringPost) -> Rule:
+    """Parsed once per process: a rule is read again every time one of its occurrences is claimed."""
+    return _parsed(recurring.rule, as_utc(recurring.starts_at), recurring.timezone)
+
+
+async def pending_counts(db: AsyncSession, recurrence_ids: List[int]) -> Dict[int, int]:
+    """Materialized occurrences not yet claimed, per rule, from ix_posts_recurrence_pending."""
+    if not recurrence_ids:
+        return {}
+    rows = await db.execute(
+        select(Post.recurrence_id, func.count())
+        .filter(Post.recurrence_id.in_(recurrence_ids), Post.status == "scheduled")
+        .group_by(Post.recurrence_id)
+    )
+    return dict(rows.all())
+
+
+def _expand(recurring: RecurringPost, now: datetime, missing: int) -> List[Post]:
+    """
+    Up to `missing` posts from `next_time` on, advancing `next_time` past them.
+    Occurrences already past (e.g. while paused) are skipped rather than
+    caught up, as are exdates; so the work is bounded by `missing`, never by
+    how long the rule runs.
+    """
+    if recurring.status != "active" or recurring.next_time is None:
+        return []
+    rule = rule_for(recurring)
+    skip = set(recurring.exdates or ())
+    at: Optional[datetime] = as_utc(recurring.next_time)
+    if at <= now:
+        at = rule.after(now)
+    posts: List[Post] = []
+    while at is not None and len(posts) < missing:
+        if exdate_key(at) not in skip:
+            posts.append(Post(
+                content=recurring.content,
+                media_url=recurring.media_url,
+                scheduled_time=at,
+                status="scheduled",
+                user_id=recurring.user_id,
+                account_id=recurring.account_id,
+                recurrence_id=recurring.id,
+            ))
+        at = rule.after(at)
+    recurring.next_time = at
+    if at is None:
+        recurring.status = "finished"
+    return posts
+
+
+async def _store(db: AsyncSession, posts: List[Post], now: datetime) -> List[Post]:
+    if posts:
+        db.add_all(posts)
+        await record_post_events(db, [PostEvent(p.user_id, p.account_id, "scheduled", now) for p in posts])
+        await db.flush()
+    return posts
+
+
+async def materialize(db: AsyncSession, recurring: RecurringPost, now: datetime, ahead: int) -> List[Post]:
+    """
+    Top `recurring` up to `ahead` scheduled posts, starting at `next_time`.
+    The caller owns the transaction and should hold the row lock (see top_up).
+    """
+    if recurring.status != "active":
+        return []
+    pending = (await pending_counts(db, [recurring.id])).get(recurring.id, 0)
+    return await _store(db, _expand(recurring, now, ahead - pending), now)
+
+
+async def top_up(db: AsyncSession, recurrence_ids: Iterable[int], now: datetime, ahead: int) -> List[Post]:
+    """
+    Materialize the next occurrences of the given recurring posts, e.g. after
+    the dispatcher claimed some. Rows are locked (FOR UPDATE on Postgres) so
+    two dispatchers never expand the same rule twice; a whole batch costs one
+    lock query, one count and one insert, however many rules it touches.
+    """
+    ids = sorted(set(recurrence_ids))
+    if not ids:
+        return []
+    rows = (await db.execute(
+        select(RecurringPost)
+        .filter(RecurringPost.id.in_(ids), RecurringPost.status == "active")
+        .order_by(RecurringPost.id)
+        .with_for_update()
+    )).scalars().all()
+    pending = await pending_counts(db, [r.id for r in rows])
+    posts: List[Post] = []
+    for recurring in rows:
+        posts += _expand(recurring, now, ahead - pending.get(recurring.id, 0))
+    return await _store(db, posts, now)
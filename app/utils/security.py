@@ -1,12 +1,17 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from fastapi import HTTPException, status
 from jose import JWTError, jwt
 from passlib.context import CryptContext
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Callable, Tuple
 from app.config import settings
+from app.utils.metrics import register_stats
+from app.utils.token_cache import TokenCache
 import re
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Hashes made with a different cost are flagged by needs_update and rehashed on login
+pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto", bcrypt__rounds=settings.BCRYPT_ROUNDS)
 
 # Hash password
 def hash_password(password: str) -> str:
@@ -16,6 +21,48 @@ def hash_password(password: str) -> str:
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
+class PasswordHasherPool:
+    """
+    Runs bcrypt on a small dedicated thread pool so a login burst never blocks
+    the event loop. At most `workers` hashes run at once; once `max_pending`
+    calls are running or queued, new ones fail fast with 503.
+    """
+
+    def __init__(self, workers: int, max_pending: int):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bcrypt")
+        self.max_pending = max_pending
+        self.pending = 0
+        self.rejected = 0
+
+    async def run(self, fn: Callable, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Authentication is busy, please retry shortly",
+                headers={"Retry-After": "1"},
+            )
+        self.pending += 1
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self._executor, fn, *args)
+        finally:
+            self.pending -= 1
+
+    def stats(self) -> Dict[str, int]:
+        return {"pending": self.pending, "rejected": self.rejected}
+
+
+password_pool = PasswordHasherPool(settings.PASSWORD_HASH_WORKERS, settings.PASSWORD_HASH_MAX_PENDING)
+register_stats("password_hash_pool", "bcrypt worker pool", password_pool.stats, counters=("rejected",))
+
+# Hash password off the event loop
+async def hash_password_async(password: str) -> str:
+    return await password_pool.run(hash_password, password)
+
+# Verify password off the event loop; returns a new hash when the stored one uses an outdated cost
+async def verify_and_update_password(plain_password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    return await password_pool.run(pwd_context.verify_and_update, plain_password, hashed_password)
+
 def validate_email(email: str) -> bool:
     return re.match(r"[^@]+@[^@]+\.[^@]+", email) is not None
 
@@ -50,6 +97,29 @@ def decode_access_token(token: str):
         return None
 
 
+token_cache = TokenCache(maxsize=settings.AUTH_CACHE_SIZE, ttl=settings.AUTH_CACHE_TTL_SECONDS)
+register_stats("auth_token_cache", "Verified JWT cache", token_cache.stats, counters=("hits", "misses", "revocations"))
+
+# Verify JWT through the cache
+def verify_access_token(token: str):
+    """Same contract as decode_access_token, but skips re-verifying recently seen tokens."""
+    return token_cache.verify(token, decode_access_token)
+
+# Revoke JWT (logout)
+def revoke_access_token(token: str):
+    """
+    Reject the token in this process until it expires.
+    Returns (token hash, exp) so other processes can be told, or None if invalid.
+    """
+    payload = verify_access_token(token)
+    if not payload or payload.get("exp") is None:
+        return None
+    key = TokenCache.key(token)
+    until = float(payload["exp"])
+    token_cache.revoke_key(key, until)
+    return key, until
+
+
 def auth_error(details: str):
     """Helper to build a consistent auth error response."""
     return HTTPException(
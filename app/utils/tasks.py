@@ -0,0 +1,243 @@
+import asyncio
+import logging
+import math
+import time
+from abc import ABC, abstractmethod
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+from app.utils.log import log_context, request_id_var
+from app.utils.metrics import TASK_RUN_SECONDS, TASK_WAIT_SECONDS, TASKS
+
+logger = logging.getLogger(__name__)
+
+TaskFunc = Callable[..., Awaitable[Any]]
+
+
+@dataclass
+class TaskSpec:
+    func: TaskFunc
+    queue: str
+
+
+registry: Dict[str, TaskSpec] = {}
+
+
+def task(name: str, queue: str = "default"):
+    """Register an async function as a background task; `queue` picks the worker pool."""
+    def decorator(func: TaskFunc) -> TaskFunc:
+        registry[name] = TaskSpec(func, queue)
+        return func
+    return decorator
+
+
+def unique_key(name: str) -> str:
+    return f"tasks:unique:{name}"
+
+
+async def run_task(
+    name: str,
+    args: Sequence[Any] = (),
+    kwargs: Optional[Dict[str, Any]] = None,
+    enqueued_at: Optional[float] = None,
+    request_id: Optional[str] = None,
+):
+    """
+    Run one registered task, recording queue wait, run time and outcome. Its
+    log lines carry a job id and the id of the request that queued it.
+    """
+    start = time.time()
+    if enqueued_at is not None:
+        TASK_WAIT_SECONDS.labels(name).observe(max(0.0, start - enqueued_at))
+    try:
+        with log_context(job=name, request_id=request_id):
+            await registry[name].func(*args, **(kwargs or {}))
+    except Exception:
+        TASKS.labels(name, "failed").inc()
+        raise
+    else:
+        TASKS.labels(name, "succeeded").inc()
+    finally:
+        TASK_RUN_SECONDS.labels(name).observe(time.time() - start)
+
+
+class TaskBackend(ABC):
+    """
+    Where background tasks run. `enqueue` returns False when the task was not
+    queued: a `unique_for` task is already waiting, or the queue is full.
+    """
+    eager = False
+
+    @abstractmethod
+    async def enqueue(
+        self,
+        name: str,
+        args: Sequence[Any] = (),
+        kwargs: Optional[Dict[str, Any]] = None,
+        unique_for: Optional[float] = None,
+    ) -> bool:
+        """Queue the registered task `name`; with `unique_for`, at most one waits at a time."""
+
+    def release(self, name: str) -> None:
+        """Clear a `unique_for` marker once the task has started."""
+
+    def start(self) -> None:
+        pass
+
+    async def stop(self) -> None:
+        pass
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        return {}
+
+
+class InProcessBackend(TaskBackend):
+    """
+    Runs tasks on a fixed number of worker coroutines inside the API process,
+    so background load is bounded by `workers` and never runs in a request.
+    With `eager`, enqueue runs the task inline instead (tests, local scripts).
+    """
+
+    def __init__(self, workers: int = 2, queue_size: int = 1000, eager: bool = False):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.eager = eager
+        self.running = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._unique: set = set()
+        self._tasks = []
+
+    async def enqueue(self, name, args=(), kwargs=None, unique_for=None) -> bool:
+        if name not in registry:
+            raise KeyError(f"Unknown task '{name}'")
+        TASKS.labels(name, "enqueued").inc()
+        if self.eager:
+            try:
+                await run_task(name, args, kwargs, time.time())
+            except Exception:
+                logger.exception("Task '%s' failed", name)
+            return True
+        if unique_for and name in self._unique:
+            return False
+        if self._queue is None:
+            self.start()
+        try:
+            self._queue.put_nowait((name, args, kwargs, time.time(), bool(unique_for), request_id_var.get()))
+        except asyncio.QueueFull:
+            TASKS.labels(name, "rejected").inc()
+            logger.error("Task queue full, dropping '%s'", name, extra={"task": name})
+            return False
+        if unique_for:
+            self._unique.add(name)
+        return True
+
+    def release(self, name: str) -> None:
+        self._unique.discard(name)
+
+    def start(self) -> None:
+        if self.eager or self._tasks:
+            return
+        if self._queue is None:
+            self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        tasks, self._tasks = self._tasks, []
+        for t in tasks:
+            t.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _worker(self) -> None:
+        while True:
+            name, args, kwargs, enqueued_at, unique, request_id = await self._queue.get()
+            if unique:
+                self.release(name)
+            self.running += 1
+            try:
+                await run_task(name, args, kwargs, enqueued_at, request_id)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Task '%s' failed", name)
+            finally:
+                self.running -= 1
+                self._queue.task_done()
+
+    def stats(self):
+        depth = self._queue.qsize() if self._queue is not None else 0
+        return {"inprocess": {"depth": depth, "running": self.running}}
+
+
+def make_celery_app():
+    """Celery app shared by the API (producer) and app.worker (consumer)."""
+    from celery import Celery
+    from app.config import settings
+
+    app = Celery("social_media_bot", broker=settings.CELERY_BROKER_URL or settings.REDIS_URL)
+    app.conf.update(
+        task_default_queue="default",
+        task_ignore_result=True,
+        # Ack after the task ran so a killed worker's message is redelivered
+        task_acks_late=True,
+        task_reject_on_worker_lost=True,
+        worker_prefetch_multiplier=settings.CELERY_PREFETCH_MULTIPLIER,
+        worker_concurrency=settings.CELERY_CONCURRENCY,
+        broker_connection_retry_on_startup=True,
+        # Logging is set up by app.utils.log (see app.worker)
+        worker_hijack_root_logger=False,
+    )
+    return app
+
+
+class CeleryBackend(TaskBackend):
+    """
+    Sends tasks to Celery workers through the Redis broker. `unique_for` is a
+    Redis SET NX key the worker clears when the task starts.
+    """
+
+    def __init__(self, celery_app, redis_url: str):
+        import redis
+        import redis.asyncio as aioredis
+
+        self.celery_app = celery_app
+        self.client = aioredis.from_url(redis_url)
+        # Queue depth is read at scrape time, which is synchronous
+        self.sync_client = redis.Redis.from_url(redis_url, socket_timeout=0.5)
+
+    async def enqueue(self, name, args=(), kwargs=None, unique_for=None) -> bool:
+        spec = registry[name]
+        if unique_for and not await self.client.set(unique_key(name), 1, nx=True, ex=math.ceil(unique_for)):
+            return False
+        # send_task does blocking broker I/O
+        await asyncio.to_thread(
+            self.celery_app.send_task,
+            name,
+            args=list(args),
+            kwargs=kwargs or {},
+            queue=spec.queue,
+            headers={"enqueued_at": time.time(), "request_id": request_id_var.get()},
+        )
+        TASKS.labels(name, "enqueued").inc()
+        return True
+
+    def release(self, name: str) -> None:
+        # Called from the synchronous Celery task body
+        self.sync_client.delete(unique_key(name))
+
+    async def stop(self) -> None:
+        await self.client.aclose()
+
+    def stats(self):
+        queues = sorted({spec.queue for spec in registry.values()})
+        try:
+            return {queue: {"depth": self.sync_client.llen(queue)} for queue in queues}
+        except Exception as e:
+            logger.error("Failed to read Celery queue depth: %s", e)
+            return {}
+
+
+def build_task_backend(kind: str, redis_url: str, workers: int = 2, queue_size: int = 1000, eager: bool = False) -> TaskBackend:
+    if kind == "inprocess":
+        return InProcessBackend(workers, queue_size, eager)
+    if kind == "celery":
+        return CeleryBackend(make_celery_app(), redis_url)
+    raise ValueError(f"Unknown TASK_BACKEND '{kind}'")
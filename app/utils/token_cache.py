@@ -0,0 +1,81 @@
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+Payload = Dict[str, Any]
+
+
+class TokenCache:
+    """
+    Bounded LRU of verified JWT payloads keyed by a SHA-256 of the token.
+    An entry lives for at most `ttl` seconds and never past the token's `exp`.
+    Revoked token hashes are remembered until their `exp` so a cached or
+    re-decoded token is rejected after logout.
+    """
+
+    def __init__(self, maxsize: int = 10000, ttl: float = 300, clock: Callable[[], float] = time.time):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.clock = clock
+        self._entries: "OrderedDict[str, Tuple[Payload, float]]" = OrderedDict()
+        self._revoked: Dict[str, float] = {}
+        self.hits = 0
+        self.misses = 0
+        self.revocations = 0
+
+    @staticmethod
+    def key(token: str) -> str:
+        return hashlib.sha256(token.encode()).hexdigest()
+
+    def verify(self, token: str, decode: Callable[[str], Optional[Payload]]) -> Optional[Payload]:
+        """Return the cached payload, or decode (verify) the token and cache the result."""
+        key = self.key(token)
+        now = self.clock()
+        if key in self._revoked:
+            if self._revoked[key] > now:
+                return None
+            del self._revoked[key]
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[1] > now:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry[0]
+            del self._entries[key]
+
+        self.misses += 1
+        payload = decode(token)
+        if payload is None:
+            return None
+        expires_at = now + self.ttl
+        exp = payload.get("exp")
+        if exp is not None:
+            expires_at = min(expires_at, float(exp))
+        if expires_at > now:
+            self._entries[key] = (payload, expires_at)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return payload
+
+    def revoke_key(self, key: str, until: float) -> None:
+        """Evict a token by hash and reject it until `until` (its exp)."""
+        self._entries.pop(key, None)
+        now = self.clock()
+        if until <= now:
+            return
+        if key not in self._revoked:
+            self.revocations += 1
+        self._revoked[key] = until
+        if len(self._revoked) > self.maxsize:
+            self._revoked = {k: v for k, v in self._revoked.items() if v > now}
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "revocations": self.revocations,
+            "size": len(self._entries),
+            "revoked": len(self._revoked),
+        }
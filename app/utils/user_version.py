@@ -0,0 +1,31 @@
+from typing import Iterable
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from app.database import async_read_session, async_session, dialect_insert
+from app.models.user_version import UserVersion
+
+
+async def bump_user_versions(db: AsyncSession, user_ids: Iterable[int]) -> None:
+    """
+    Move the users' versions on inside the caller's transaction, so cached
+    responses go stale exactly when the write commits (and not at all if it
+    rolls back). Call it last, just before the commit: the version rows stay
+    locked only briefly, and always after the rows the write itself locked.
+    """
+    # Sorted, so transactions bumping several users lock them in one order
+    ids = sorted(set(user_ids))
+    if not ids:
+        return
+    stmt = dialect_insert(db, UserVersion).values([{"user_id": user_id, "version": 1} for user_id in ids])
+    await db.execute(stmt.on_conflict_do_update(index_elements=["user_id"], set_={"version": UserVersion.version + 1}))
+
+
+async def read_user_version(user_id: int, primary: bool = True) -> str:
+    """
+    The user's current version: from the primary it is never behind a commit,
+    from the read replica it is as old as the rest of what the replica returns.
+    """
+    session_factory = async_session if primary else async_read_session
+    async with session_factory() as db:
+        version = (await db.execute(select(UserVersion.version).filter(UserVersion.user_id == user_id))).scalar()
+    return str(version or 0)
@@ -0,0 +1,102 @@
+"""
+Celery worker for background tasks (TASK_BACKEND=celery):
+
+    celery -A app.worker worker -Q default,followers,media --concurrency 2 --prefetch-multiplier 1
+
+Each worker process keeps one event loop on a background thread, so the
+async tasks share its database pool and the publish pipeline can keep
+running between tasks.
+"""
+import asyncio
+import logging
+import os
+import threading
+from typing import Optional
+from celery.signals import setup_logging, worker_process_init, worker_process_shutdown, worker_ready
+from prometheus_client import REGISTRY, start_http_server
+from app.config import settings
+from app.database import engine, read_engine
+from app.routers import media, schedule  # registers the publish, follower sync and media tasks
+from app.utils import tasks
+from app.utils.log import configure_logging
+
+logger = logging.getLogger(__name__)
+
+celery_app = tasks.make_celery_app()
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_loop_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """The process's persistent event loop, started on first use."""
+    global _loop
+    with _loop_lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="task-loop", daemon=True).start()
+        return _loop
+
+
+def run_coroutine(coro, timeout: Optional[float] = None):
+    return asyncio.run_coroutine_threadsafe(coro, get_loop()).result(timeout)
+
+
+def _bind(name: str):
+    @celery_app.task(name=name, bind=True)
+    def run(self, *args, **kwargs):
+        schedule.task_backend.release(name)
+        run_coroutine(tasks.run_task(
+            name, args, kwargs,
+            getattr(self.request, "enqueued_at", None),
+            getattr(self.request, "request_id", None),
+        ))
+    return run
+
+
+for _name in tasks.registry:
+    _bind(_name)
+
+
+@setup_logging.connect
+def _setup_logging(**_):
+    # Connecting this signal stops Celery from configuring logging itself
+    configure_logging()
+
+
+@worker_process_init.connect
+def _init_process(**_):
+    global _loop
+    # Pooled connections inherited through fork belong to the parent
+    engine.sync_engine.dispose(close=False)
+    if read_engine is not engine:
+        read_engine.sync_engine.dispose(close=False)
+    _loop = None
+    if settings.PUBLISH_PIPELINE_ENABLED:
+        run_coroutine(schedule.start_publish_pipeline())
+
+
+@worker_process_shutdown.connect
+def _shutdown_process(**_):
+    if _loop is None:
+        return
+    try:
+        run_coroutine(schedule.publish_pipeline.stop(), timeout=10)
+        run_coroutine(engine.dispose(), timeout=10)
+    except Exception as e:
+        logger.exception("Worker shutdown failed: %s", e)
+
+
+@worker_ready.connect
+def _serve_metrics(**_):
+    if not settings.CELERY_METRICS_PORT:
+        return
+    registry = REGISTRY
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        # Prefork children write their samples to files; aggregate them here
+        from prometheus_client import CollectorRegistry, multiprocess
+
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    start_http_server(settings.CELERY_METRICS_PORT, registry=registry)
+    logger.info("Worker metrics on :%s", settings.CELERY_METRICS_PORT)
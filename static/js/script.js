@@ -13,6 +13,11 @@ function authHeaders() {
   };
 }
 
+// Posts currently rendered, kept so WebSocket events can be applied in place
+let postsCache = [];
+// Sequence number of the last WebSocket event applied
+let lastSeq = null;
+
 // Function to set up the WebSocket connection for real-time updates
 function setupWebSocket() {
     const token = localStorage.getItem("token");
@@ -22,8 +27,12 @@ function setupWebSocket() {
     }
 
     const wsProtocol = window.location.protocol === "https:" ? "wss:" : "ws:";
-    // Pass the authentication token as a query parameter
-    const wsUrl = `${wsProtocol}//${window.location.host}/ws/posts/?token=${token}`;
+    // Pass the authentication token as a query parameter, plus the last seen
+    // event so the server can replay what was missed while disconnected
+    let wsUrl = `${wsProtocol}//${window.location.host}/ws/posts/?token=${token}`;
+    if (lastSeq !== null) {
+        wsUrl += `&last_seq=${lastSeq}`;
+    }
 
     const websocket = new WebSocket(wsUrl);
 
@@ -32,10 +41,7 @@ function setupWebSocket() {
     };
 
     websocket.onmessage = (event) => {
-        console.log("Received a message from the server:", event.data);
-        // When a message is received, re-fetch all data to ensure the UI is up-to-date.
-        fetchAndDisplayPosts();
-        fetchAccounts();
+        handleServerEvent(JSON.parse(event.data));
     };
 
     websocket.onclose = (event) => {
@@ -54,12 +60,68 @@ function setupWebSocket() {
 }
 
 
-async function fetchAccounts() {
-  try {
-    const res = await fetch(`${API_BASE}/me`, { headers: authHeaders() });
-    if (!res.ok) throw new Error("Failed to fetch accounts");
-    const accountData = await res.json();
+// Apply one server event; only refetch when events were missed
+function handleServerEvent(event) {
+    if (event.type === "sync" || event.type === "resync") {
+        if (event.type === "resync") {
+            fetchAndDisplayPosts();
+            fetchAccounts();
+        }
+        lastSeq = event.seq;
+        return;
+    }
+
+    if (lastSeq !== null && event.seq <= lastSeq) return; // already applied
+    const gap = lastSeq !== null && event.seq > lastSeq + 1;
+    lastSeq = event.seq;
+    if (gap) {
+        fetchAndDisplayPosts();
+        fetchAccounts();
+        return;
+    }
+
+    switch (event.type) {
+        case "post.published":
+        case "post.scheduled":
+        case "post.queued":
+        case "post.failed":
+            applyPostChanges(event.posts);
+            break;
+        case "account.linked":
+        case "account.unlinked":
+        case "followers.synced":
+            fetchAccounts();
+            break;
+        default:
+            console.warn("Unknown server event:", event.type);
+    }
+}
 
+function applyPostChanges(changes) {
+    let missing = false;
+    for (const change of changes) {
+        const post = postsCache.find(p => p.id === change.id);
+        if (post) {
+            Object.assign(post, change);
+        } else if (change.text !== undefined) {
+            postsCache.unshift(change);
+        } else {
+            missing = true;
+        }
+    }
+    if (missing) {
+        fetchAndDisplayPosts();
+    } else {
+        renderPostsCache();
+    }
+}
+
+function renderPostsCache() {
+    renderPosts(postsCache.filter(p => p.status === "published" || p.status === "failed"), "feed");
+    renderPosts(postsCache.filter(p => p.status === "scheduled" || p.status === "queued"), "schedule");
+}
+
+function renderAccounts(accountData) {
     const accountsList = document.getElementById("accounts-list");
 
     const addAccountButton = `
@@ -76,7 +138,7 @@ async function fetchAccounts() {
             <li class="bg-gray-800 p-4 rounded-xl shadow border border-gray-700 flex justify-between items-center">
               <div>
                 <span>@${acc.username} (${acc.platform || "Unknown"})</span>
-                <span class="text-gray-400 text-sm block">${acc.followers_count} followers · ${acc.following_count} following</span>
+                <span class="text-gray-400 text-sm block">${acc.followers_count ?? "–"} followers · ${acc.following_count ?? "–"} following</span>
               </div>
              <button onclick="deleteAccount('${acc.username}', '${acc.platform}')"
                    class="text-red-500 hover:text-red-600 ml-4 font-bold">
@@ -94,6 +156,13 @@ async function fetchAccounts() {
         ${addAccountButton}
       `;
     }
+}
+
+async function fetchAccounts() {
+  try {
+    const res = await fetch(`${API_BASE}/me`, { headers: authHeaders() });
+    if (!res.ok) throw new Error("Failed to fetch accounts");
+    renderAccounts(await res.json());
   } catch (err) {
     document.getElementById("accounts-list").innerHTML = `
       <li class="bg-gray-800 p-4 rounded-xl shadow border border-gray-700 text-red-400">
@@ -168,13 +237,8 @@ async function fetchAndDisplayPosts() {
     try {
         const res = await fetch(`${API_BASE}/tweets`, { headers: authHeaders() });
         if (!res.ok) throw new Error("Failed to fetch posts");
-        const posts = await res.json();
-
-        const publishedPosts = posts.filter(p => p.status === "published");
-        const scheduledPosts = posts.filter(p => p.status === "scheduled");
-
-        renderPosts(publishedPosts, "feed");
-        renderPosts(scheduledPosts, "schedule");
+        postsCache = await res.json();
+        renderPostsCache();
 
     } catch (err) {
         // Handle error for both sections
@@ -218,8 +282,12 @@ function renderPosts(posts, sectionId) {
             .map(p => {
                 let statusText = p.status;
                 if (p.status === "scheduled") {
-                    const scheduledTime = new Date(p.created_at).toLocaleString();
+                    const scheduledTime = new Date(p.scheduled_time || p.created_at).toLocaleString();
                     statusText = `Scheduled (will post at ${scheduledTime})`;
+                } else if (p.status === "queued") {
+                    statusText = "Publishing…";
+                } else if (p.status === "failed") {
+                    statusText = "Failed to publish";
                 }
                return `
                    <div class="bg-gray-800 p-6 rounded-2xl shadow-lg border border-gray-700 mt-4">
@@ -236,12 +304,7 @@ function renderPosts(posts, sectionId) {
     }
 }
 
-async function fetchFollowers() {
-  try {
-    const res = await fetch(`${API_BASE}/followers`, { headers: authHeaders() });
-    if (!res.ok) throw new Error("Failed to fetch followers");
-    const followers = await res.json();
-
+function renderFollowers(followers) {
     const followersList = document.getElementById("followers-list");
 
     if (Array.isArray(followers) && followers.length > 0) {
@@ -257,7 +320,7 @@ async function fetchFollowers() {
                 </div>`
             }
             <div class="flex-grow">
-              <p class="text-gray-200 font-semibold">@${f.username || "Unknown"}</p>
+              <p class="text-gray-200 font-semibold">@${f.username || f.id || "Unknown"}</p>
               <p class="text-gray-400 text-sm">${f.name || ""}</p>
             </div>
           </div>
@@ -274,6 +337,13 @@ async function fetchFollowers() {
         </li>
       `;
     }
+}
+
+async function fetchFollowers() {
+  try {
+    const res = await fetch(`${API_BASE}/followers`, { headers: authHeaders() });
+    if (!res.ok) throw new Error("Failed to fetch followers");
+    renderFollowers(await res.json());
   } catch (err) {
     console.error("Error loading followers:", err);
     document.getElementById("followers-list").innerHTML = `
@@ -284,12 +354,7 @@ async function fetchFollowers() {
   }
 }
 
-async function fetchFollowing() {
-  try {
-    const res = await fetch(`${API_BASE}/following`, { headers: authHeaders() });
-    if (!res.ok) throw new Error("Failed to fetch following");
-    const following = await res.json();
-
+function renderFollowing(following) {
     const followingList = document.getElementById("following-list");
 
     if (Array.isArray(following) && following.length > 0) {
@@ -305,7 +370,7 @@ async function fetchFollowing() {
                 </div>`
             }
             <div>
-              <p class="text-gray-200 font-semibold">@${f.username || "Unknown"}</p>
+              <p class="text-gray-200 font-semibold">@${f.username || f.id || "Unknown"}</p>
               <p class="text-gray-400 text-sm">${f.name || ""}</p>
             </div>
           </div>
@@ -322,6 +387,13 @@ async function fetchFollowing() {
         </li>
       `;
     }
+}
+
+async function fetchFollowing() {
+  try {
+    const res = await fetch(`${API_BASE}/following`, { headers: authHeaders() });
+    if (!res.ok) throw new Error("Failed to fetch following");
+    renderFollowing(await res.json());
   } catch (err) {
     console.error("Error loading following:", err);
     document.getElementById("following-list").innerHTML = `
@@ -373,11 +445,51 @@ async function schedulePost() {
   }
 }
 
-// Auto-fetch data on load
-window.addEventListener("DOMContentLoaded", () => {
-    fetchAccounts();
-    fetchAndDisplayPosts();
-    fetchFollowers();
-    fetchFollowing();
+// Revoke the API token before ending the session
+const logoutLink = document.getElementById("logout-link");
+if (logoutLink) {
+  logoutLink.addEventListener("click", async (e) => {
+    e.preventDefault();
+    const href = logoutLink.href;
+    const token = localStorage.getItem("token");
+    if (token) {
+      try {
+        await fetch("/auth/api/logout", {
+          method: "POST",
+          headers: { "Authorization": `Bearer ${token}` }
+        });
+      } catch (err) {
+        console.error("Error revoking token:", err);
+      }
+      localStorage.removeItem("token");
+    }
+    window.location.href = href;
+  });
+}
+
+// Load every panel from one request, then connect the WebSocket from the
+// returned seq so events published in between are replayed, not lost
+async function loadDashboard() {
+    try {
+        const res = await fetch(`${API_BASE}/bootstrap`, { headers: authHeaders() });
+        if (!res.ok) throw new Error("Failed to load dashboard");
+        const data = await res.json();
+        lastSeq = data.seq;
+        renderAccounts(data.accounts);
+        const upcoming = data.scheduled.filter(s => !data.posts.some(p => p.id === s.id));
+        postsCache = data.posts.concat(upcoming);
+        renderPostsCache();
+        renderFollowers(data.followers.ids.map(id => ({ id })));
+        renderFollowing(data.following.ids.map(id => ({ id })));
+    } catch (err) {
+        console.error("Dashboard bootstrap failed, loading panels one by one:", err);
+        fetchAccounts();
+        fetchAndDisplayPosts();
+        fetchFollowers();
+        fetchFollowing();
+    }
     setupWebSocket(); // Start the WebSocket connection
-});
+}
+
+// Auto-fetch data on load
+window.addEventListener("DOMContentLoaded", loadDashboard);
@@ -0,0 +1,29 @@
+import asyncio
+import os
+import tempfile
+
+# Settings are read when app modules are imported, so point them at a
+# throwaway SQLite database before any test imports the app.
+_tmp = tempfile.mkdtemp(prefix="socialbot-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite+aiosqlite:///{_tmp}/test.db")
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("MEDIA_ROOT", f"{_tmp}/media")
+
+import pytest  # noqa: E402
+
+
+@pytest.fixture
+def database():
+    """Fresh tables in the test database; yields the engine."""
+    from app.database import Base, engine
+    import app.models  # noqa: F401  (registers every table)
+
+    async def reset():
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.drop_all)
+            await conn.run_sync(Base.metadata.create_all)
+        await engine.dispose()
+
+    asyncio.run(reset())
+    yield engine
+    asyncio.run(engine.dispose())
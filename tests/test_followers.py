@@ -0,0 +1,79 @@
+import random
+from array import array
+import pytest
+from sqlalchemy import insert
+from app.database import async_session
+from app.models.account import Account, Platform
+from app.utils.followers import (
+    FakeFollowerSource,
+    diff_sorted,
+    merge_runs,
+    pack,
+    read_page,
+    sync_graph,
+    unpack,
+)
+
+EDGES = 1_000_000
+CHURN = 0.01
+
+
+def test_pack_round_trip():
+    ids = array("q", [-(2**63), -1, 0, 1, 2**63 - 1])
+    assert unpack(pack(ids)) == ids
+    assert len(pack(ids)) == 8 * len(ids)
+    assert unpack(None) == array("q")
+
+
+def test_merge_runs_sorts_and_drops_duplicates():
+    runs = [array("q", [1, 4, 9]), array("q", [2, 4, 10]), array("q"), array("q", [9])]
+    assert merge_runs(runs) == array("q", [1, 2, 4, 9, 10])
+
+
+def test_diff_sorted_small():
+    gained, lost = diff_sorted(array("q", [1, 2, 3, 7]), array("q", [2, 3, 5, 8, 9]))
+    assert gained == array("q", [5, 8, 9])
+    assert lost == array("q", [1, 7])
+    assert diff_sorted(array("q"), array("q", [1])) == (array("q", [1]), array("q"))
+    assert diff_sorted(array("q", [1]), array("q")) == (array("q"), array("q", [1]))
+
+
+def test_diff_sorted_1m_matches_set_difference():
+    rng = random.Random(16)
+    old = set(rng.sample(range(10 * EDGES), EDGES))
+    new = set(rng.sample(sorted(old), EDGES - 5000)) | set(rng.sample(range(10 * EDGES, 11 * EDGES), 7000))
+    gained, lost = diff_sorted(array("q", sorted(old)), array("q", sorted(new)))
+    assert gained.tolist() == sorted(new - old)
+    assert lost.tolist() == sorted(old - new)
+    assert (len(gained), len(lost)) == (7000, 5000)
+
+
+@pytest.mark.asyncio
+async def test_sync_graph_1m_edges_and_read_page(database):
+    async with async_session() as db:
+        await db.execute(insert(Account), [{"id": 1, "platform": Platform.twitter, "username": "big", "user_id": 1}])
+        await db.commit()
+    # The fake graph is ids [start, start + EDGES), sliding by CHURN * EDGES per sync
+    source = FakeFollowerSource(lambda account, direction: EDGES, churn=CHURN, page_size=1000)
+    shift = int(EDGES * CHURN)
+    start = 1 * 10**9
+
+    first = await sync_graph(async_session, source, 1, "followers")
+    assert (first.total, first.gained, first.lost) == (EDGES, 0, 0)
+
+    second = await sync_graph(async_session, source, 1, "followers")
+    assert (second.total, second.gained, second.lost) == (EDGES, shift, shift)
+
+    current = range(start + shift, start + shift + EDGES)
+    async with async_session() as db:
+        for offset, limit in [(0, 50), (123_457, 1000), (EDGES - 10, 50), (EDGES, 50)]:
+            page = await read_page(db, 1, "followers", offset, limit)
+            assert page["total"] == EDGES
+            assert page["ids"] == list(current[offset:offset + limit])
+        gained = await read_page(db, 1, "followers", shift - 3, 10, column="gained")
+        assert gained["total"] == shift
+        assert gained["ids"] == list(range(start + EDGES + shift - 3, start + EDGES + shift))
+        lost = await read_page(db, 1, "followers", 0, 3, column="lost")
+        assert lost["ids"] == [start, start + 1, start + 2]
+        assert await read_page(db, 1, "following", 0, 50) is None
+        assert await read_page(db, 2, "followers", 0, 50) is None
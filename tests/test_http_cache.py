@@ -0,0 +1,76 @@
+import pytest
+from app.database import async_read_session, async_session, get_read_db, read_from_primary
+from app.models.user import User
+from app.utils.http_cache import HttpCache, HttpCacheMiddleware, MemoryResponseCache, ResponseCache
+from app.utils.user_version import bump_user_versions, read_user_version
+
+
+async def add_user(user_id: int):
+    async with async_session() as db:
+        db.add(User(id=user_id, username=f"u{user_id}", email=f"u{user_id}@example.com", hashed_password="x"))
+        await db.commit()
+
+
+@pytest.mark.asyncio
+async def test_version_moves_with_the_commit_only(database):
+    await add_user(1)
+    await add_user(2)
+    assert await read_user_version(1) == "0"
+
+    async with async_session() as db:
+        await bump_user_versions(db, [1, 2, 1])
+        assert await read_user_version(1) == "0"  # not visible before the commit
+        await db.commit()
+    assert await read_user_version(1) == "1"
+    assert await read_user_version(2) == "1"
+
+    async with async_session() as db:
+        await bump_user_versions(db, [1])
+        await db.rollback()
+    assert await read_user_version(1) == "1"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("revalidate", [True, False])
+async def test_revalidations_read_from_the_primary(database, revalidate):
+    await add_user(1)
+    seen = []
+
+    async def version(user_id, primary):
+        seen.append(("version", primary))
+        return await read_user_version(user_id, primary)
+
+    async def handler(scope, receive, send):
+        # What a route depending on get_read_db would get
+        dependency = get_read_db()
+        session = await dependency.__anext__()
+        seen.append(("body", read_from_primary.get(), session.bind))
+        await dependency.aclose()
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"application/json")]})
+        await send({"type": "http.response.body", "body": b"{}"})
+
+    http_cache = HttpCache(version, lambda token: {"sub": "1"}, ["/cached"], cache=MemoryResponseCache())
+    app = HttpCacheMiddleware(handler, http_cache)
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        sent.append(message)
+
+    headers = [(b"authorization", b"Bearer t")]
+    if revalidate:
+        headers.append((b"if-none-match", b'"stale"'))
+    scope = {"type": "http", "method": "GET", "path": "/cached", "query_string": b"", "headers": headers}
+    await app(scope, receive, send)
+
+    bind = async_session.kw["bind"] if revalidate else async_read_session.kw["bind"]
+    assert seen == [("version", revalidate), ("body", revalidate, bind)]
+    assert read_from_primary.get() is False
+    assert sent[0]["status"] == 200 and any(k == b"etag" for k, _ in sent[0]["headers"])
+
+
+def test_response_cache_is_abstract():
+    with pytest.raises(TypeError):
+        ResponseCache()
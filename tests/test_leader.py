@@ -0,0 +1,91 @@
+import pytest
+from app.utils.leader import FileLockBackend, InMemoryLockBackend, LeaderElector, build_lock_backend
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class FailingBackend(InMemoryLockBackend):
+    async def acquire(self, name, owner, ttl):
+        raise ConnectionError("lock store down")
+
+
+@pytest.mark.asyncio
+async def test_one_leader_until_the_lease_expires():
+    clock = FakeClock()
+    backend = InMemoryLockBackend(clock)
+    a = LeaderElector(backend, "job", ttl=30, owner="a")
+    b = LeaderElector(backend, "job", ttl=30, owner="b")
+
+    assert await a.ensure_leader()
+    assert not await b.ensure_leader()
+
+    clock.now = 20
+    assert await a.ensure_leader()  # renewed until 50
+    clock.now = 45
+    assert not await b.ensure_leader()
+
+    # a stops renewing (crashed); b takes over once the lease runs out
+    clock.now = 51
+    assert await b.ensure_leader()
+    assert not await a.ensure_leader()
+    assert not a.is_leader and b.is_leader
+
+
+@pytest.mark.asyncio
+async def test_resign_hands_over_immediately():
+    backend = InMemoryLockBackend(FakeClock())
+    a = LeaderElector(backend, "job", ttl=30, owner="a")
+    b = LeaderElector(backend, "job", ttl=30, owner="b")
+    await a.ensure_leader()
+    await a.resign()
+    assert not a.is_leader
+    assert await b.ensure_leader()
+
+
+@pytest.mark.asyncio
+async def test_run_if_leader_only_runs_on_the_leader():
+    backend = InMemoryLockBackend(FakeClock())
+    runs = []
+
+    async def job():
+        runs.append(1)
+
+    assert await LeaderElector(backend, "job", ttl=30, owner="a").run_if_leader(job)
+    assert not await LeaderElector(backend, "job", ttl=30, owner="b").run_if_leader(job)
+    assert runs == [1]
+
+
+@pytest.mark.asyncio
+async def test_backend_errors_step_down():
+    elector = LeaderElector(FailingBackend(), "job", ttl=30, owner="a")
+    elector.is_leader = True
+    assert not await elector.ensure_leader()
+    assert not elector.is_leader
+
+
+@pytest.mark.asyncio
+async def test_file_lock_excludes_other_holders(tmp_path):
+    # Separate backends stand in for separate worker processes
+    a = LeaderElector(FileLockBackend(str(tmp_path)), "job", ttl=30, owner="a")
+    b = LeaderElector(FileLockBackend(str(tmp_path)), "job", ttl=30, owner="b")
+
+    assert await a.ensure_leader()
+    assert await a.ensure_leader()
+    assert not await b.ensure_leader()
+
+    await a.resign()
+    assert await b.ensure_leader()
+    assert not await a.ensure_leader()
+    await b.resign()
+
+
+def test_auto_picks_a_cross_process_backend():
+    assert isinstance(build_lock_backend("auto", "sqlite+aiosqlite:///./app.db", "", None), FileLockBackend)
+    with pytest.raises(ValueError):
+        build_lock_backend("nope", "", "", None)
@@ -0,0 +1,237 @@
+import asyncio
+import random
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import func, insert
+from sqlalchemy.future import select
+from app.database import async_session
+from app.models.account import Account, Platform
+from app.models.outbox import PublishOutbox
+from app.models.post import Post
+from app.models.user import User
+from app.utils.publisher import (
+    FakePlatformClient,
+    PermanentPublishError,
+    PublishError,
+    PublishJob,
+    PublishPipeline,
+    claim_outbox,
+    enqueue_posts,
+)
+
+TWITTER = Platform.twitter.value
+
+
+class LostAnswerClient(FakePlatformClient):
+    """Publishes, then fails the first call as if the response timed out."""
+
+    async def publish(self, job):
+        external_id = await super().publish(job)
+        if self.calls == 1:
+            raise PublishError("Read timed out")
+        return external_id
+
+
+class RejectingClient(FakePlatformClient):
+    async def publish(self, job):
+        self.calls += 1
+        raise PermanentPublishError("Content rejected")
+
+
+async def queue_posts(count: int, now: datetime):
+    """User 1 with a Twitter account and `count` queued posts in the outbox; returns post ids."""
+    async with async_session() as db:
+        await db.execute(insert(User), [{"id": 1, "username": "u1", "email": "u1@example.com", "hashed_password": "x"}])
+        await db.execute(insert(Account), [{"id": 1, "platform": Platform.twitter, "username": "u1", "user_id": 1}])
+        result = await db.execute(
+            insert(Post).returning(Post.id),
+            [{"content": f"post {n}", "status": "queued", "user_id": 1, "account_id": 1} for n in range(count)],
+        )
+        post_ids = list(result.scalars())
+        await enqueue_posts(db, [(post_id, 1) for post_id in post_ids], now)
+        await db.commit()
+    return post_ids
+
+
+def pipeline_for(client, **kwargs):
+    kwargs.setdefault("workers_per_platform", 2)
+    kwargs.setdefault("retry_base", 0.001)
+    kwargs.setdefault("retry_max", 0.01)
+    kwargs.setdefault("poll_interval", 0.01)
+    # No rate limits unless a test is about them
+    kwargs.setdefault("account_rate_per_minute", 60000)
+    return PublishPipeline(async_session, {TWITTER: client}, **kwargs)
+
+
+async def run_until_settled(pipeline, timeout: float = 10.0):
+    """Run the pipeline until no outbox row is pending or in flight."""
+    pipeline.start()
+    try:
+        deadline = asyncio.get_running_loop().time() + timeout
+        while True:
+            await pipeline.drain()
+            async with async_session() as db:
+                open_rows = await db.scalar(
+                    select(func.count()).select_from(PublishOutbox)
+                    .filter(PublishOutbox.status.in_(("pending", "in_flight")))
+                )
+            if not open_rows:
+                return
+            assert asyncio.get_running_loop().time() < deadline, "outbox did not settle"
+            pipeline.wake()
+            await asyncio.sleep(0.01)
+    finally:
+        await pipeline.stop()
+
+
+async def outbox_rows():
+    async with async_session() as db:
+        return (await db.execute(select(PublishOutbox).order_by(PublishOutbox.id))).scalars().all()
+
+
+async def post_statuses():
+    async with async_session() as db:
+        return dict((await db.execute(select(Post.id, Post.status))).all())
+
+
+def job(attempts: int) -> PublishJob:
+    return PublishJob(
+        outbox_id=1, post_id=1, account_id=1, platform=TWITTER, idempotency_key="post:1",
+        attempts=attempts, user_id=1, content="hi", media_url=None, access_token=None, scheduled_time=None,
+    )
+
+
+def test_retry_delay_doubles_with_jitter_up_to_the_cap():
+    pipeline = PublishPipeline(async_session, {TWITTER: FakePlatformClient(latency=0)}, retry_base=2, retry_max=10)
+    random.seed(11)
+    for attempts, (low, high) in {1: (1, 2), 2: (2, 4), 3: (4, 8), 4: (5, 10), 9: (5, 10)}.items():
+        for _ in range(50):
+            assert low <= pipeline._retry_delay(attempts) <= high
+
+
+@pytest.mark.asyncio
+async def test_failed_call_retries_until_max_attempts():
+    pipeline = pipeline_for(FakePlatformClient(latency=0), max_attempts=3, retry_base=2, retry_max=10)
+    failing = FakePlatformClient(latency=0, failure_rate=1.0)
+
+    before = datetime.now(timezone.utc)
+    outcome = await pipeline._publish(failing, job(attempts=1))
+    assert outcome.status == "pending" and outcome.error == "Simulated platform error"
+    assert before + timedelta(seconds=1) <= outcome.next_attempt_at <= datetime.now(timezone.utc) + timedelta(seconds=2)
+
+    assert (await pipeline._publish(failing, job(attempts=3))).status == "dead"
+    # Permanent errors are not retried at all
+    assert (await pipeline._publish(RejectingClient(latency=0), job(attempts=1))).status == "dead"
+
+
+@pytest.mark.asyncio
+async def test_dead_letters_after_max_attempts(database):
+    now = datetime.now(timezone.utc)
+    post_ids = await queue_posts(3, now)
+    client = FakePlatformClient(latency=0, failure_rate=1.0)
+    failed = []
+
+    async def on_failed(jobs):
+        failed.extend(job.post_id for job in jobs)
+
+    pipeline = pipeline_for(client, max_attempts=3, on_failed=on_failed)
+    await run_until_settled(pipeline)
+
+    rows = await outbox_rows()
+    assert [(row.status, row.attempts, row.last_error) for row in rows] == [("dead", 3, "Simulated platform error")] * 3
+    assert client.calls == 9
+    assert sorted(failed) == post_ids
+    assert set((await post_statuses()).values()) == {"failed"}
+    assert pipeline.counts["retried"] == 6 and pipeline.counts["dead"] == 3
+
+
+@pytest.mark.asyncio
+async def test_flaky_platform_publishes_every_post_once(database):
+    now = datetime.now(timezone.utc)
+    post_ids = await queue_posts(20, now)
+    client = FakePlatformClient(latency=0, failure_rate=0.3, rng=random.Random(5))
+    published = []
+
+    async def on_published(jobs, at):
+        published.extend(job.post_id for job in jobs)
+
+    pipeline = pipeline_for(client, max_attempts=20, on_published=on_published)
+    await run_until_settled(pipeline)
+
+    rows = await outbox_rows()
+    assert {row.status for row in rows} == {"done"}
+    assert any(row.attempts > 1 for row in rows)
+    assert client.calls == sum(row.attempts for row in rows)
+    assert sorted(published) == post_ids
+    assert set((await post_statuses()).values()) == {"published"}
+
+
+@pytest.mark.asyncio
+async def test_retry_reuses_the_idempotency_key(database):
+    now = datetime.now(timezone.utc)
+    [post_id] = await queue_posts(1, now)
+    async with async_session() as db:
+        # Queuing the same post again is a no-op
+        await enqueue_posts(db, [(post_id, 1)], now)
+        await db.commit()
+
+    client = LostAnswerClient(latency=0)
+    await run_until_settled(pipeline_for(client))
+
+    [row] = await outbox_rows()
+    assert row.idempotency_key == f"post:{post_id}"
+    assert (row.status, row.attempts) == ("done", 2)
+    # The first call went through remotely; the retry got the same post back
+    assert client.calls == 2
+    assert client.published == {row.idempotency_key: row.external_id}
+
+
+@pytest.mark.asyncio
+async def test_deferred_rows_are_not_charged_an_attempt(database):
+    now = datetime.now(timezone.utc)
+    await queue_posts(3, now)
+    # One call per minute per account: the first row runs, the others wait
+    pipeline = pipeline_for(FakePlatformClient(latency=0), account_rate_per_minute=1)
+
+    async with async_session() as db:
+        jobs = await claim_outbox(db, TWITTER, now, 10, 300)
+        assert [job.attempts for job in jobs] == [1, 1, 1]
+        ready, deferred = await pipeline._admit(jobs)
+        await pipeline._defer(db, deferred, now)
+        await db.commit()
+
+    assert [job.outbox_id for job in ready] == [jobs[0].outbox_id]
+    # Spaced out one token apart instead of all coming back together
+    assert sorted(deferred) == [60, 120]
+    rows = await outbox_rows()
+    assert [(row.status, row.attempts) for row in rows] == [("in_flight", 1), ("pending", 0), ("pending", 0)]
+    waits = [row.next_attempt_at.replace(tzinfo=timezone.utc) - now for row in rows[1:]]
+    assert waits == [timedelta(seconds=60), timedelta(seconds=120)]
+
+
+@pytest.mark.asyncio
+async def test_claim_leases_rows_and_reclaims_expired_leases(database):
+    now = datetime.now(timezone.utc)
+    post_ids = await queue_posts(2, now)
+
+    async with async_session() as db:
+        first = await claim_outbox(db, TWITTER, now, 1, 300)
+        await db.commit()
+    assert [(job.post_id, job.attempts) for job in first] == [(post_ids[0], 1)]
+
+    async with async_session() as db:
+        # The leased row is not claimable again while its lease runs
+        during = await claim_outbox(db, TWITTER, now + timedelta(seconds=299), 10, 300)
+        await db.commit()
+        assert [job.post_id for job in during] == [post_ids[1]]
+        assert await claim_outbox(db, TWITTER, now + timedelta(seconds=299), 10, 300) == []
+        # ... nor for another platform
+        assert await claim_outbox(db, Platform.tiktok.value, now + timedelta(days=1), 10, 300) == []
+
+    async with async_session() as db:
+        # The worker holding it died: once the lease is over it is claimed again
+        again = await claim_outbox(db, TWITTER, now + timedelta(seconds=301), 10, 300)
+        await db.commit()
+    assert [(job.outbox_id, job.attempts) for job in again] == [(first[0].outbox_id, 2)]
+    rows = await outbox_rows()
+    assert {row.status for row in rows} == {"in_flight"}
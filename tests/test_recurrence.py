@@ -0,0 +1,168 @@
+from datetime import datetime, timedelta, timezone
+import pytest
+from sqlalchemy import insert, update
+from sqlalchemy.future import select
+from app.commad.backfill_stats import backfill
+from app.database import async_session
+from app.models.account import Account, Platform
+from app.models.post import Post
+from app.models.post_stats import PostStatsDaily
+from app.models.recurring_post import RecurringPost
+from app.models.user import User
+from app.routers.recurring import _drop_pending
+from app.utils.recurrence import RecurrenceError, Rule, _cron_weekdays, _expand, exdate_key, materialize, top_up
+
+UTC = timezone.utc
+DAILY_9AM = "FREQ=DAILY;BYHOUR=9;BYMINUTE=0;BYSECOND=0"
+
+
+def utc(*args) -> datetime:
+    return datetime(*args, tzinfo=UTC)
+
+
+def recurring_post(rule: str = DAILY_9AM, starts_at: datetime = utc(2026, 1, 1, 9), **kwargs) -> RecurringPost:
+    kwargs.setdefault("id", 1)
+    kwargs.setdefault("status", "active")
+    kwargs.setdefault("next_time", starts_at)
+    kwargs.setdefault("exdates", [])
+    return RecurringPost(
+        content="gm", rule=rule, timezone="UTC", starts_at=starts_at, user_id=1, account_id=1, **kwargs,
+    )
+
+
+def test_cron_weekdays_count_from_sunday():
+    assert _cron_weekdays("0") == "sun"
+    assert _cron_weekdays("7") == "sun"
+    assert _cron_weekdays("1-5") == "mon,tue,wed,thu,fri"
+    assert _cron_weekdays("5-7") == "fri,sat,sun"
+    assert _cron_weekdays("*") == "sun,mon,tue,wed,thu,fri,sat"
+    # Steps count from Sunday (or the start of the range), not from Monday
+    assert _cron_weekdays("*/2") == "sun,tue,thu,sat"
+    assert _cron_weekdays("1/2") == "mon,wed,fri"
+    assert _cron_weekdays("0,3,mon") == "sun,wed,mon"
+    with pytest.raises(RecurrenceError):
+        _cron_weekdays("8")
+    with pytest.raises(RecurrenceError):
+        _cron_weekdays("5-2")
+
+
+def test_cron_sunday_rule():
+    # 2026-01-04 is a Sunday
+    for field in ("0", "7"):
+        rule = Rule(f"0 9 * * {field}", utc(2026, 1, 1), "UTC")
+        assert rule.upcoming(utc(2026, 1, 1), 2) == [utc(2026, 1, 4, 9), utc(2026, 1, 11, 9)]
+
+
+@pytest.mark.parametrize("text", ["FREQ=WEEKLY;BYDAY=MO;BYHOUR=9;BYMINUTE=0;BYSECOND=0", "0 9 * * 1"])
+def test_wall_clock_time_survives_dst(text):
+    # Berlin moves from UTC+1 to UTC+2 on 2026-03-29 and back on 2026-10-25
+    rule = Rule(text, utc(2026, 3, 16), "Europe/Berlin")
+    assert rule.upcoming(utc(2026, 3, 16), 3) == [utc(2026, 3, 16, 8), utc(2026, 3, 23, 8), utc(2026, 3, 30, 7)]
+    assert rule.upcoming(utc(2026, 10, 17), 2) == [utc(2026, 10, 19, 7), utc(2026, 10, 26, 8)]
+
+
+def test_rule_rejects_bad_input():
+    for text, timezone_name in [("0 9 * *", "UTC"), ("FREQ=SOMETIMES", "UTC"), ("0 9 * * 1", "Mars/Olympus")]:
+        with pytest.raises(RecurrenceError):
+            Rule(text, utc(2026, 1, 1), timezone_name)
+    with pytest.raises(RecurrenceError):
+        Rule("* * * * *", utc(2026, 1, 1)).check_interval(300)
+
+
+def test_expand_skips_past_occurrences_and_exdates():
+    recurring = recurring_post(exdates=[exdate_key(utc(2026, 1, 12, 9))])
+    # Paused over the first ten days: those are not caught up
+    posts = _expand(recurring, utc(2026, 1, 10, 12), 3)
+    assert [p.scheduled_time for p in posts] == [utc(2026, 1, 11, 9), utc(2026, 1, 13, 9), utc(2026, 1, 14, 9)]
+    assert {(p.status, p.recurrence_id) for p in posts} == {("scheduled", 1)}
+    assert recurring.next_time == utc(2026, 1, 15, 9)
+
+    # Picks up from next_time, and does nothing when nothing is missing
+    assert [p.scheduled_time for p in _expand(recurring, utc(2026, 1, 10, 12), 1)] == [utc(2026, 1, 15, 9)]
+    assert _expand(recurring, utc(2026, 1, 10, 12), 0) == []
+    assert recurring.next_time == utc(2026, 1, 16, 9)
+
+
+def test_expand_finishes_when_the_rule_runs_out():
+    recurring = recurring_post(DAILY_9AM + ";COUNT=2")
+    assert len(_expand(recurring, utc(2026, 1, 1), 5)) == 2
+    assert (recurring.status, recurring.next_time) == ("finished", None)
+    assert _expand(recurring_post(status="paused"), utc(2026, 1, 1), 5) == []
+
+
+async def add_user_and_account():
+    async with async_session() as db:
+        await db.execute(insert(User), [{"id": 1, "username": "u1", "email": "u1@example.com", "hashed_password": "x"}])
+        await db.execute(insert(Account), [{"id": 1, "platform": Platform.twitter, "username": "u1", "user_id": 1}])
+        await db.commit()
+
+
+async def scheduled_count() -> int:
+    async with async_session() as db:
+        counts = (await db.execute(
+            select(PostStatsDaily.post_count).filter(PostStatsDaily.status == "scheduled")
+        )).scalars().all()
+    return sum(counts)
+
+
+@pytest.mark.asyncio
+async def test_top_up_stays_bounded(database):
+    await add_user_and_account()
+    now = datetime.now(UTC)
+    async with async_session() as db:
+        # A rule that has been running for 25 years costs the same as a new one
+        old = recurring_post(id=1, starts_at=utc(2001, 1, 1, 9))
+        paused = recurring_post(id=2, status="paused", next_time=now)
+        db.add_all([old, paused])
+        await db.flush()
+        first = await materialize(db, old, now, 3)
+        await db.commit()
+    assert len(first) == 3 and all(p.scheduled_time > now for p in first)
+
+    async with async_session() as db:
+        # Already topped up: nothing more, however often it is asked
+        assert await top_up(db, [1, 2, 1], now, 3) == []
+        # The dispatcher claimed one: exactly one replaces it
+        await db.execute(update(Post).where(Post.id == first[0].id).values(status="queued"))
+        added = await top_up(db, [1, 2], now, 3)
+        await db.commit()
+    assert [p.scheduled_time for p in added] == [first[-1].scheduled_time + timedelta(days=1)]
+    assert {p.recurrence_id for p in added} == {1}
+
+    async with async_session() as db:
+        pending = (await db.execute(select(Post).filter(Post.status == "scheduled"))).scalars().all()
+    assert len(pending) == 3
+    assert await scheduled_count() == 4
+
+
+@pytest.mark.asyncio
+async def test_drop_pending_takes_back_rollup_counts(database):
+    await add_user_and_account()
+    now = datetime.now(UTC)
+    async with async_session() as db:
+        recurring = recurring_post(starts_at=now)
+        db.add(recurring)
+        await db.flush()
+        posts = await materialize(db, recurring, now, 4)
+        await db.commit()
+    assert await scheduled_count() == 4
+
+    async with async_session() as db:
+        # Skipping one occurrence
+        recurring = await db.get(RecurringPost, 1)
+        removed = await _drop_pending(db, recurring, posts[1].scheduled_time)
+        await db.commit()
+    assert [p.id for p in removed] == [posts[1].id]
+    assert await scheduled_count() == 3
+    before = await scheduled_count()
+    await backfill()
+    assert await scheduled_count() == before
+
+    async with async_session() as db:
+        # Pausing: the one the dispatcher already claimed stays, and stays counted
+        await db.execute(update(Post).where(Post.id == posts[0].id).values(status="queued"))
+        recurring = await db.get(RecurringPost, 1)
+        removed = await _drop_pending(db, recurring)
+        await db.commit()
+    assert sorted(p.id for p in removed) == [posts[2].id, posts[3].id]
+    assert await scheduled_count() == 1